@@ -0,0 +1,283 @@
+# attack_coverage.py
+# Materialized ATT&CK coverage of the execution journal: per technique, tactic and host platform
+# the number of executions, outcomes, last success/failure and mean duration.
+#
+# The summary lives next to the journal in <journal>.coverage.json together with the journal
+# byte offset (watermark) and inode it covers. log_structured_event folds each event in as it is
+# appended; readers (the dashboard) only fold in lines appended after the watermark, so keeping
+# the summary current never requires rescanning the whole history. Several processes may append
+# to one journal: whoever saves last wins, and since every saved summary covers exactly the
+# journal prefix up to its watermark, the others just catch up from there.
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+
+from execution_store import status_category
+from journal import EXECUTION_LOG_JOURNAL
+
+COVERAGE_SUFFIX = ".coverage.json"
+COVERAGE_FORMAT_VERSION = 1
+SAVE_INTERVAL = 5.0     # Seconds between saves while events keep arriving
+OUTCOMES = {"Success": "success", "Failed": "failed", "DryRun": "dry_run", "Skipped": "skipped"}
+
+
+def _new_stats():
+    return {"executions": 0, "success": 0, "failed": 0, "dry_run": 0, "skipped": 0,
+            "duration_total": 0.0, "duration_count": 0,
+            "last_success": None, "last_failure": None, "last_seen": None}
+
+
+def _known(value):
+    return value if value and value != "N/A" else None
+
+
+def _fold(stats, event, outcome):
+    timestamp = event.get("timestamp")
+    stats["executions"] += 1
+    stats[outcome] += 1
+    duration = event.get("duration_seconds")
+    if isinstance(duration, (int, float)) and not isinstance(duration, bool):
+        stats["duration_total"] += duration
+        stats["duration_count"] += 1
+    # ISO timestamps compare chronologically as strings; concurrent workers may append out of order
+    if timestamp:
+        if outcome == "success" and (stats["last_success"] or "") < timestamp:
+            stats["last_success"] = timestamp
+        elif outcome == "failed" and (stats["last_failure"] or "") < timestamp:
+            stats["last_failure"] = timestamp
+        if (stats["last_seen"] or "") < timestamp:
+            stats["last_seen"] = timestamp
+
+
+def _merge(total, stats):
+    for field in ("executions", "success", "failed", "dry_run", "skipped", "duration_total", "duration_count"):
+        total[field] += stats[field]
+    for field in ("last_success", "last_failure", "last_seen"):
+        if (total[field] or "") < (stats[field] or ""):
+            total[field] = stats[field]
+
+
+class CoverageSummary:
+    """Incrementally maintained coverage aggregates for one journal. Safe to share between threads."""
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.path = journal_path + COVERAGE_SUFFIX
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self.inode = inode
+        self.watermark = 0
+        self.techniques = {}
+        self.platforms = {}
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != COVERAGE_FORMAT_VERSION:
+                return
+            self.inode, self.watermark = data["inode"], data["watermark"]
+            self.techniques, self.platforms = data["techniques"], data["platforms"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._reset(None)  # Missing or unreadable: rebuilt from the journal
+
+    def _add(self, event):
+        technique_id = event.get("id")
+        status = event.get("status")
+        outcome = OUTCOMES.get(status_category(status))
+        if outcome is None or not _known(technique_id) or str(technique_id).startswith("campaign:"):
+            return  # Campaign ticks and unknown statuses aren't technique executions
+        technique = self.techniques.get(technique_id)
+        if technique is None:
+            technique = self.techniques[technique_id] = {**_new_stats(), "name": None, "tactic": None}
+        technique["name"] = _known(event.get("name")) or technique["name"]
+        technique["tactic"] = _known(event.get("mitre_tactic")) or technique["tactic"]
+        platform = event.get("host_os") or _known(event.get("platform")) or "unknown"
+        _fold(technique, event, outcome)
+        _fold(self.platforms.setdefault(platform, _new_stats()), event, outcome)
+
+    def _catch_up(self):
+        """Folds in complete journal lines past the watermark (all of them for a new/compacted journal)."""
+        try:
+            journal_stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            if self.watermark:
+                self._reset(None)
+                self._dirty = True
+            return
+        if self.inode != journal_stat.st_ino or self.watermark > journal_stat.st_size:
+            self._reset(journal_stat.st_ino)
+            self._dirty = True
+        if journal_stat.st_size <= self.watermark:
+            return
+        position = self.watermark
+        with open(self.journal_path, 'rb') as journal:
+            journal.seek(position)
+            for line in journal:
+                if position + len(line) > journal_stat.st_size or not line.endswith(b"\n"):
+                    break  # Partial line still being written
+                position += len(line)
+                try:
+                    event = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue  # Torn/corrupt line
+                if isinstance(event, dict):
+                    self._add(event)
+        self.watermark = position
+        self._dirty = True
+
+    def add(self, event, start, end):
+        """Folds in an event just appended to the journal at bytes [start, end)."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._catch_up()  # Verifies the saved summary belongs to this journal; covers this event
+            elif start == self.watermark:
+                self._add(event)
+                self.watermark = end
+                self._dirty = True
+            else:
+                self._catch_up()  # Other writers appended in between; the range includes this event
+            if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+                self._save()
+
+    def refresh(self):
+        """Catches up with lines appended by other processes and saves. Cost grows with new lines only."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._catch_up()
+            self._save()
+        return self
+
+    def _save(self):
+        self._last_save = time.monotonic()
+        if not self._dirty:
+            return
+        data = {"version": COVERAGE_FORMAT_VERSION, "inode": self.inode, "watermark": self.watermark,
+                "updated": time.time(), "techniques": self.techniques, "platforms": self.platforms}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)  # Atomic: readers never see a half-written summary
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️ Warning: Could not write coverage summary {self.path}: {e}")
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    # --- Views (mean duration and success rate derived from the sums) ---
+
+    @staticmethod
+    def _row(key_name, key, stats):
+        attempted = stats["success"] + stats["failed"]
+        return {
+            key_name: key,
+            **{field: stats.get(field) for field in ("name", "tactic") if field in stats},
+            "executions": stats["executions"],
+            "success": stats["success"],
+            "failed": stats["failed"],
+            "dry_run": stats["dry_run"],
+            "skipped": stats["skipped"],
+            "success_rate": round(stats["success"] / attempted, 3) if attempted else None,
+            "mean_duration_seconds": (round(stats["duration_total"] / stats["duration_count"], 3)
+                                      if stats["duration_count"] else None),
+            "last_success": stats["last_success"],
+            "last_failure": stats["last_failure"],
+        }
+
+    def technique_rows(self):
+        with self._lock:
+            return [self._row("id", key, stats) for key, stats in sorted(self.techniques.items())]
+
+    def tactic_rows(self):
+        # Summed from the techniques, so a tactic learned later (e.g. enrichment turned on) applies to all runs
+        tactics = {}
+        with self._lock:
+            for stats in self.techniques.values():
+                _merge(tactics.setdefault(stats["tactic"] or "unknown", _new_stats()), stats)
+        return [self._row("tactic", key, stats) for key, stats in sorted(tactics.items())]
+
+    def platform_rows(self):
+        with self._lock:
+            return [self._row("platform", key, stats) for key, stats in sorted(self.platforms.items())]
+
+
+def coverage_matrix(technique_rows, attack_mapping):
+    """Per ATT&CK tactic: techniques in the mapping vs. exercised / succeeded ones.
+
+    Sub-techniques count towards their own entry; executed IDs missing from the mapping are
+    reported under the tactic recorded with their events.
+    """
+    executed = {row["id"]: row for row in technique_rows}
+    tactics = {}
+    for technique_id, entry in attack_mapping.items():
+        cell = tactics.setdefault(entry.get("tactic") or "unknown", {"techniques": 0, "exercised": 0, "succeeded": 0})
+        cell["techniques"] += 1
+        row = executed.get(technique_id)
+        if row is not None:
+            cell["exercised"] += 1
+            cell["succeeded"] += 1 if row["success"] else 0
+    for technique_id, row in executed.items():
+        if technique_id not in attack_mapping:
+            cell = tactics.setdefault(row.get("tactic") or "unknown", {"techniques": 0, "exercised": 0, "succeeded": 0})
+            cell["exercised"] += 1
+            cell["succeeded"] += 1 if row["success"] else 0
+    return [{"tactic": tactic, **cell,
+             "coverage": round(cell["exercised"] / cell["techniques"], 3) if cell["techniques"] else None}
+            for tactic, cell in sorted(tactics.items())]
+
+
+# --- Process-wide registry (one summary per journal, like the journals themselves) ---
+_summaries = {}
+_summaries_lock = threading.Lock()
+
+
+def get_coverage(journal_path):
+    key = os.path.abspath(journal_path)
+    with _summaries_lock:
+        summary = _summaries.get(key)
+        if summary is None:
+            summary = _summaries[key] = CoverageSummary(journal_path)
+        return summary
+
+
+def save_all_coverage():
+    with _summaries_lock:
+        summaries = list(_summaries.values())
+    for summary in summaries:
+        # The journal's directory may be gone by exit time (e.g. a removed temporary log dir)
+        if os.path.isdir(os.path.dirname(summary.path) or "."):
+            summary.save()
+
+
+def close_all_coverage():
+    """Saves every summary and forgets them, e.g. before their log directory is removed."""
+    save_all_coverage()
+    with _summaries_lock:
+        _summaries.clear()
+
+
+atexit.register(save_all_coverage)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the coverage summary up to date and print it")
+    parser.add_argument("journal", nargs="?", default=os.path.join("logs", EXECUTION_LOG_JOURNAL))
+    args = parser.parse_args()
+    coverage = get_coverage(args.journal).refresh()
+    for row in coverage.tactic_rows():
+        print(f"{row['tactic']:<24} {row['executions']:>7} runs  {row['success']:>6} ok  {row['failed']:>6} failed")
+    print(f"📊 {len(coverage.techniques)} techniques exercised; summary in {coverage.path}")
@@ -0,0 +1,164 @@
+# attack_index.py
+# Precompiled, on-disk index of the MITRE ATT&CK STIX bundle.
+# Parsing attack_dataset.json (~27 MB) is only paid once per dataset version; afterwards
+# the technique mapping and the attack-pattern list are loaded from a pickle in milliseconds.
+import hashlib
+import os
+import pickle
+import threading
+
+from stix_reader import load_attack_patterns
+
+CACHE_DIR = ".cache"
+INDEX_FORMAT_VERSION = 2
+
+
+def _file_stat(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Hex SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_cache_path(dataset, cache_dir=CACHE_DIR):
+    """Location of the compiled index for a dataset file (enterprise, mobile, ICS, ...)."""
+    # Short hash of the absolute path keeps same-named bundles in different folders apart
+    path_key = hashlib.sha1(os.path.abspath(dataset).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{os.path.basename(dataset)}.{path_key}.index.pickle")
+
+
+def build_attack_index(dataset):
+    """Streams the STIX bundle and returns the technique mapping plus the attack-pattern list."""
+    # Only attack-patterns (projected to the keys the bot/dashboard use) are ever held in memory
+    attack_patterns = load_attack_patterns(dataset)
+    id_to_technique = {}
+    for obj in attack_patterns:
+        for ref in obj.get('external_references', []):
+            if ref.get('source_name') == 'mitre-attack' and 'external_id' in ref:
+                id_to_technique[ref['external_id']] = {
+                    'name': obj.get('name'),
+                    'description': obj.get('description', ''),
+                    'tactic': obj.get('kill_chain_phases', [{}])[0].get('phase_name', 'unknown'),
+                    'url': ref.get('url', '')
+                }
+    return {"mapping": id_to_technique, "attack_patterns": attack_patterns}
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != INDEX_FORMAT_VERSION:
+        return None
+    return cached
+
+
+def _write_cache(cache_path, cached):
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)  # Atomic: readers never see a half-written index
+    except OSError as e:
+        print(f"⚠️ Warning: Could not write ATT&CK index cache {cache_path}: {e}")
+
+
+def load_attack_index(dataset, cache_dir=CACHE_DIR):
+    """Returns {'mapping': ..., 'attack_patterns': ...} for a dataset, using the on-disk cache.
+
+    The cache is keyed on the dataset's size and mtime; if those changed but the content hash
+    did not (e.g. a fresh checkout), the cache is re-stamped instead of rebuilt.
+    """
+    size, mtime_ns = _file_stat(dataset)
+    cache_path = index_cache_path(dataset, cache_dir)
+    cached = _read_cache(cache_path)
+
+    if cached is not None and cached["size"] == size and cached["mtime_ns"] == mtime_ns:
+        return cached["index"]
+
+    digest = file_sha256(dataset)
+    if cached is not None and cached["sha256"] == digest:
+        cached["size"], cached["mtime_ns"] = size, mtime_ns
+        _write_cache(cache_path, cached)
+        return cached["index"]
+
+    index = build_attack_index(dataset)
+    _write_cache(cache_path, {
+        "version": INDEX_FORMAT_VERSION,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "sha256": digest,
+        "index": index,
+    })
+    return index
+
+
+class AttackEnricher:
+    """Lazy, memoized ATT&CK lookups used to enrich structured events.
+
+    The mapping is only loaded on the first lookup that actually needs it, so runs whose TTPs
+    already carry their MITRE fields (or that disable enrichment) never touch the dataset.
+    """
+
+    def __init__(self, dataset="attack_dataset.json", mapping=None):
+        self.dataset = dataset
+        self._mapping = mapping
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._mapping is not None
+
+    def _get_mapping(self):
+        with self._lock:
+            if self._mapping is None:
+                try:
+                    self._mapping = load_attack_index(self.dataset)['mapping']
+                except Exception as e:
+                    print(f"⚠️ Warning: ATT&CK enrichment unavailable ({self.dataset}): {e}")
+                    self._mapping = {}  # Don't retry on every lookup
+            return self._mapping
+
+    def preload(self):
+        """Loads the mapping now instead of on the first lookup (e.g. to keep a daemon warm)."""
+        self._get_mapping()
+        return self
+
+    def lookup(self, technique_id):
+        """Returns the mapping entry for a technique ID, falling back to the parent technique."""
+        if technique_id in self._memo:
+            return self._memo[technique_id]
+        mapping = self._get_mapping()
+        entry = mapping.get(technique_id)
+        if entry is None and technique_id and '.' in technique_id:
+            entry = mapping.get(technique_id.split('.', 1)[0])  # T1059.001 -> T1059
+        self._memo[technique_id] = entry
+        return entry
+
+    def enrich(self, ttp):
+        """Returns mitre_tactic / mitre_technique / mitre_url for a TTP.
+
+        Values defined on the TTP itself win; the dataset is consulted only for missing ones.
+        """
+        fields = {
+            "mitre_tactic": ttp.get("mitre_tactic") or ttp.get("tactic"),
+            "mitre_technique": ttp.get("mitre_technique"),
+            "mitre_url": ttp.get("mitre_url") or ttp.get("url"),
+        }
+        if not all(fields.values()):
+            entry = self.lookup(ttp.get("id")) or {}
+            fields["mitre_tactic"] = fields["mitre_tactic"] or entry.get("tactic")
+            fields["mitre_technique"] = fields["mitre_technique"] or entry.get("name")
+            fields["mitre_url"] = fields["mitre_url"] or entry.get("url")
+        return {key: value or "N/A" for key, value in fields.items()}
@@ -0,0 +1,371 @@
+# benchmark.py
+# Offline benchmark harness. Generates synthetic TTP libraries, scenario files and STIX
+# bundles in a temporary directory, then times the hot paths of threat_bot.py and the
+# dashboard's loaders. Results are written as JSON so runs can be compared:
+#
+#   python benchmark.py --sizes 1000 10000 --output bench_results.json
+#   python benchmark.py --sizes 1000 10000 --compare bench_results.json
+#
+# Nothing is executed for real: every TTP runs in dry-run mode and no network is used.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform as plat
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import threat_bot
+from attack_coverage import COVERAGE_SUFFIX, CoverageSummary, close_all_coverage
+from attack_index import index_cache_path
+from compiled_library import CompiledLibrary
+from execution_engine import build_independent_plan, build_scenario_plan, run_plan
+from execution_history import ExecutionHistory
+from journal import EXECUTION_LOG_JOURNAL, close_all_journals
+from run_logger import get_run_logger
+from telemetry import compile_templates, generate
+from ttp_search import TTPSearchIndex
+from utils import load_attack_mapping
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_STIX_PATTERNS = 2000
+DEFAULT_SCENARIOS = 200
+DEFAULT_REPEATS = 3
+DEFAULT_DRY_RUN_STEPS = 500
+DEFAULT_JOURNAL_EVENTS = 10000
+DEFAULT_TELEMETRY_EVENTS = 200000
+REGRESSION_THRESHOLD = 1.25  # --compare flags results this much slower than the baseline
+
+PLATFORMS = ["all", "linux", "windows", "darwin"]
+TACTICS = ["discovery", "execution", "persistence", "collection", "command-and-control"]
+MITRE_PLATFORMS = ["Windows", "Linux", "macOS", "Network", "Containers"]
+
+
+# --- Synthetic data ---
+
+def generate_library(path, count, rng):
+    """Writes a ttp_library.json-style list of `count` TTPs."""
+    ttps = []
+    for i in range(count):
+        ttp = {
+            "id": f"T{1000 + i // 10}.{i % 10:03d}",
+            "name": f"Synthetic Technique {i}",
+            "description": f"Synthetic TTP {i} used for benchmarking. " * 3,
+            "tactic": rng.choice(TACTICS),
+            "platform": rng.choice(PLATFORMS),
+            "command": f"echo synthetic-{i}",
+        }
+        if i % 4 == 0:
+            ttp["expected_logs"] = {"sysmon": [f"EventID=1 Image=/bin/echo CommandLine=echo synthetic-{i}"]}
+        ttps.append(ttp)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(ttps, f, indent=2)
+    return ttps
+
+
+def generate_scenarios(path, ttps, count, rng):
+    """Writes a scenario file mixing ordered lists, parallel stages and dependency graphs."""
+    ids = [ttp["id"] for ttp in ttps]
+    scenarios = {}
+    for i in range(count):
+        steps = rng.sample(ids, min(len(ids), rng.randint(3, 12)))
+        kind = i % 3
+        if kind == 0:
+            scenario = steps
+        elif kind == 1:
+            middle = max(2, len(steps) // 2)
+            scenario = [steps[0], steps[1:middle], *steps[middle:]]
+        else:
+            scenario = {"steps": [
+                {"id": ttp_id, "step": f"s{n}", "depends_on": [f"s{n - 1}"] if n else []}
+                for n, ttp_id in enumerate(steps)
+            ]}
+        scenarios[f"Synthetic Scenario {i}"] = scenario
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(scenarios, f, indent=2)
+    return scenarios
+
+
+def generate_stix_bundle(path, patterns, rng, noise_per_pattern=3):
+    """Writes a STIX 2 bundle of attack-patterns plus relationship objects as parsing noise."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "bundle", "id": "bundle--synthetic", "spec_version": "2.0", "objects": [\n')
+        first = True
+        for i in range(patterns):
+            external_id = f"T{1000 + i // 10}.{i % 10:03d}"
+            objects = [{
+                "type": "attack-pattern",
+                "id": f"attack-pattern--{i:08d}",
+                "name": f"Synthetic Technique {i}",
+                "description": "Synthetic attack-pattern description. " * 20,
+                "x_mitre_platforms": rng.sample(MITRE_PLATFORMS, 2),
+                "kill_chain_phases": [{"kill_chain_name": "mitre-attack", "phase_name": rng.choice(TACTICS)}],
+                "external_references": [{"source_name": "mitre-attack", "external_id": external_id,
+                                         "url": f"https://attack.mitre.org/techniques/{external_id.replace('.', '/')}"}],
+            }]
+            objects += [{
+                "type": "relationship",
+                "id": f"relationship--{i:08d}-{n}",
+                "description": "Synthetic relationship. " * 30,
+                "source_ref": f"intrusion-set--{n}",
+                "target_ref": f"attack-pattern--{i:08d}",
+            } for n in range(noise_per_pattern)]
+            for obj in objects:
+                f.write(("" if first else ",\n") + json.dumps(obj, indent=4))
+                first = False
+        f.write("\n]}\n")
+
+
+def synthetic_event(i, rng):
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "status": rng.choice(["Success", "DryRun", "Failed (Code: 1)", "Skipped (Platform)"]),
+        "id": f"T{1000 + i % 500}",
+        "name": f"Synthetic Technique {i}",
+        "command": f"echo synthetic-{i}",
+        "dry_run": True,
+        "platform": "all",
+        "output": None,
+        "error": None,
+        "exit_code": None,
+        "run_id": "benchmark",
+        "host_os": "linux",
+    }
+
+
+# --- Timing ---
+
+def measure(name, size, repeats, func, setup=None):
+    """Runs func `repeats` times (setup before each, untimed) and returns a result record."""
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):  # threat_bot prints per TTP
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    result = {
+        "name": name,
+        "size": size,
+        "repeats": repeats,
+        "min_seconds": round(min(timings), 6),
+        "median_seconds": round(median, 6),
+        "mean_seconds": round(statistics.mean(timings), 6),
+        "items_per_second": round(size / median, 1) if median > 0 else None,
+    }
+    print(f"  {name:<32} n={size:<8} median {median * 1000:10.2f} ms")
+    return result
+
+
+def _remove(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def bench_library(work_dir, size, args, rng):
+    results = []
+    library_path = os.path.join(work_dir, f"library_{size}.json")
+    ttps = generate_library(library_path, size, rng)
+    current_os = plat.system().lower()
+
+    results.append(measure("load_ttps", size, args.repeats, lambda: threat_bot.load_ttps(library_path)))
+    results.append(measure("is_compatible", size, args.repeats,
+                           lambda: [t for t in ttps if threat_bot.is_compatible(t, current_os)]))
+    results.append(measure("compile_library", size, args.repeats, lambda: CompiledLibrary(ttps)))
+    library = CompiledLibrary(ttps)
+    results.append(measure("compiled_compatible", size, args.repeats,
+                           lambda: library.compatible(current_os),
+                           setup=library._compatible.clear))  # Time the bucket merge, not the per-OS cache
+    compatible = [record.ttp for record in library.compatible(current_os)]
+    picks = min(len(compatible), max(1, size // 10))
+    results.append(measure("random_selection", picks, args.repeats,
+                           lambda: build_independent_plan([r.ttp for r in library.sample(current_os, picks, rng)])))
+    results.append(measure("search_index_build", size, args.repeats, lambda: TTPSearchIndex(ttps)))
+    index = TTPSearchIndex(ttps)
+    results.append(measure("search_query", size, args.repeats, lambda: index.search("synthetic disc")))
+
+    scenario_path = os.path.join(work_dir, f"scenarios_{size}.json")
+    scenarios = generate_scenarios(scenario_path, ttps, args.scenarios, rng)
+    results.append(measure("scenario_plans", len(scenarios), args.repeats,
+                           lambda: [build_scenario_plan(s) for s in scenarios.values()]))
+
+    # Dry-run throughput through the same plan runner and execute_ttp as threat_bot.main
+    steps = min(len(compatible), args.dry_run_steps)
+    log_dir = os.path.join(work_dir, f"dry_run_{size}")
+    os.makedirs(log_dir, exist_ok=True)
+    base = os.path.join(log_dir, "threat_bot_benchmark")
+    journal_path = os.path.join(log_dir, EXECUTION_LOG_JOURNAL)
+
+    def dry_run():
+        plan = build_independent_plan(rng.sample(compatible, steps))
+        run_plan(plan, lambda step, position: threat_bot.execute_ttp(
+            step.ttp, True, f"{base}.log", None, base, journal_path), args.workers)
+        get_run_logger().close_files(base)
+
+    results.append(measure(f"dry_run_execute[workers={args.workers}]", steps, args.repeats, dry_run))
+    return results
+
+
+def bench_stix(work_dir, args, rng):
+    results = []
+    bundle_path = os.path.join(work_dir, "attack_bundle.json")
+    generate_stix_bundle(bundle_path, args.stix_patterns, rng)
+    cache_path = index_cache_path(bundle_path)
+    results.append(measure("load_attack_mapping[cold]", args.stix_patterns, args.repeats,
+                           lambda: load_attack_mapping(bundle_path), setup=lambda: _remove(cache_path)))
+    results.append(measure("load_attack_mapping[cached]", args.stix_patterns, args.repeats,
+                           lambda: load_attack_mapping(bundle_path)))
+    results.append(measure("load_ttps[stix]", args.stix_patterns, args.repeats,
+                           lambda: threat_bot.load_ttps(bundle_path)))
+    return results
+
+
+def bench_journal(work_dir, args, rng):
+    results = []
+    journal_path = os.path.join(work_dir, "journal", EXECUTION_LOG_JOURNAL)
+    events = [synthetic_event(i, rng) for i in range(args.journal_events)]
+
+    def write_events():
+        for event in events:
+            threat_bot.log_structured_event(event, journal_path)
+        close_all_journals()
+
+    def reset():
+        _remove(journal_path)
+        _remove(journal_path + ".idx")
+        _remove(journal_path + COVERAGE_SUFFIX)
+
+    results.append(measure("log_structured_event", len(events), args.repeats, write_events, setup=reset))
+    history = ExecutionHistory(journal_path)
+    results.append(measure("history_index_build", len(events), args.repeats,
+                           lambda: history.page(1, 10), setup=lambda: _remove(journal_path + ".idx")))
+    results.append(measure("history_page[filtered]", len(events), args.repeats,
+                           lambda: history.page(3, 25, status="Failed")))
+    # Full rebuild of the coverage summary (what incremental updates avoid) vs. an up-to-date refresh
+    results.append(measure("coverage_rebuild", len(events), args.repeats,
+                           lambda: CoverageSummary(journal_path).refresh(),
+                           setup=lambda: _remove(journal_path + COVERAGE_SUFFIX)))
+    results.append(measure("coverage_refresh[current]", len(events), args.repeats,
+                           lambda: CoverageSummary(journal_path).refresh()))
+    return results
+
+
+class _NullSink:
+    def write(self, _tool, _text):
+        pass
+
+
+def bench_telemetry(args, rng):
+    ttps = [{
+        "id": f"T{1000 + i}",
+        "expected_logs": {
+            "sysmon": [
+                f"Sysmon EventID 1: Process Create: UtcTime: 2025-04-18 11:15:01.123Z ProcessGuid: {{xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx}} ProcessId: 1234 Image: C:\\Windows\\synthetic{i}.exe ParentProcessGuid: {{yyyyyyyy-yyyy-yyyy-yyyy-yyyyyyyyyyyy}} ParentProcessId: 5678",
+                "Sysmon EventID 3: Network Connection: UtcTime: 2025-04-18 11:15:02.456Z ProcessGuid: {xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx} ProcessId: 1234 SourceIp: 192.168.1.100 SourcePort: 51234 DestinationIp: 10.0.0.5 DestinationPort: 443",
+            ],
+            "wazuh": [f"Wazuh Alert 1678886101.12345 {60000 + i}: synthetic alert {i}"],
+        },
+    } for i in range(20)]
+    results = [measure("telemetry_compile", len(ttps), args.repeats, lambda: compile_templates(ttps))]
+    templates = compile_templates(ttps)
+    results.append(measure("telemetry_generate", args.telemetry_events, args.repeats,
+                           lambda: generate(templates, _NullSink(), rate=0, duration=None, report_interval=0,
+                                            seed=rng.random(), max_events=args.telemetry_events)))
+    return results
+
+
+# --- Reporting ---
+
+def compare_results(results, baseline_path, threshold=REGRESSION_THRESHOLD):
+    """Prints median ratios against a previous results file. Returns the number of regressions."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f).get("results", [])}
+    regressions = 0
+    print(f"\n📊 Comparison with {baseline_path} (ratio = current / baseline median):")
+    for result in results:
+        previous = baseline.get((result["name"], result["size"]))
+        if not previous or not previous["median_seconds"]:
+            continue
+        ratio = result["median_seconds"] / previous["median_seconds"]
+        flag = "⚠️ slower" if ratio > threshold else ""
+        regressions += ratio > threshold
+        print(f"  {result['name']:<32} n={result['size']:<8} x{ratio:5.2f} {flag}")
+    return regressions
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    output_path = os.path.abspath(args.output) if args.output else None
+    started = datetime.now()
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="threat_bot_bench_") as work_dir:
+        os.chdir(work_dir)  # Keeps the attack index cache (.cache/) inside the temp dir
+        try:
+            for size in args.sizes:
+                print(f"📚 Library benchmarks ({size} TTPs)")
+                results += bench_library(work_dir, size, args, rng)
+            print(f"🧬 STIX bundle benchmarks ({args.stix_patterns} attack-patterns)")
+            results += bench_stix(work_dir, args, rng)
+            print(f"📓 Journal benchmarks ({args.journal_events} events)")
+            results += bench_journal(work_dir, args, rng)
+            print(f"📡 Telemetry benchmarks ({args.telemetry_events} events)")
+            results += bench_telemetry(args, rng)
+        finally:
+            os.chdir(cwd)
+            # Release journals and coverage summaries while their directory still exists
+            close_all_journals()
+            close_all_coverage()
+
+    report = {
+        "meta": {
+            "started": started.isoformat(),
+            "python": plat.python_version(),
+            "platform": plat.platform(),
+            "cpu_count": os.cpu_count(),
+            "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "results": results,
+    }
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {output_path}")
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        return compare_results(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the threat emulator")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Synthetic TTP library sizes to benchmark (e.g. 1000 10000 100000)")
+    parser.add_argument("--stix-patterns", type=int, default=DEFAULT_STIX_PATTERNS,
+                        help="Attack-patterns in the synthetic STIX bundle")
+    parser.add_argument("--scenarios", type=int, default=DEFAULT_SCENARIOS,
+                        help="Scenarios in each synthetic scenario file")
+    parser.add_argument("--dry-run-steps", type=int, default=DEFAULT_DRY_RUN_STEPS,
+                        help="TTPs executed (dry-run) per repetition of the execution benchmark")
+    parser.add_argument("--journal-events", type=int, default=DEFAULT_JOURNAL_EVENTS,
+                        help="Structured events written per repetition of the journal benchmark")
+    parser.add_argument("--telemetry-events", type=int, default=DEFAULT_TELEMETRY_EVENTS,
+                        help="Synthetic telemetry lines generated per repetition of the telemetry benchmark")
+    parser.add_argument("--workers", type=int, default=1, help="Workers for the dry-run execution benchmark")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="Repetitions per benchmark")
+    parser.add_argument("--seed", type=int, default=1337, help="Seed for the synthetic data")
+    parser.add_argument("--output", help="Write JSON results to this file (printed to stdout otherwise)")
+    parser.add_argument("--compare", help="Previous results file to compare medians against")
+
+    args = parser.parse_args()
+    regressions = main(args)
+    if regressions:
+        print(f"⚠️ {regressions} benchmark(s) slower than {REGRESSION_THRESHOLD}x the baseline.")
+        exit(1)
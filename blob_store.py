@@ -0,0 +1,193 @@
+# blob_store.py
+# Content-addressed storage for captured command output.
+# Instead of inlining stdout/stderr into every journal record, outputs above a small size are
+# written once to <log dir>/blobs/<sha256[:2]>/<sha256>[.gz] and the record keeps a reference
+# {"sha256", "bytes", "preview"}. Repeated techniques (whoami, service listings, ...) producing
+# the same text share one blob, and the journal stays small and fast to parse. The dashboard
+# loads the full output only when asked to.
+#
+#   python blob_store.py migrate logs/execution_log.jsonl   # Move inline outputs of old records
+#   python blob_store.py gc logs/execution_log.jsonl        # Delete blobs no record refers to
+import argparse
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from journal import EXECUTION_LOG_JOURNAL, compact_journal, read_events
+
+BLOB_DIR = "blobs"                  # Next to the journal
+GZIP_SUFFIX = ".gz"
+DEFAULT_INLINE_BYTES = 256          # Outputs up to this size stay inline in the record
+COMPRESS_MIN_BYTES = 1024           # Smaller blobs aren't worth a gzip header
+PREVIEW_CHARS = 200
+GC_GRACE_SECONDS = 3600             # Fresh (or freshly reused) blobs may belong to a record being written
+OUTPUT_FIELDS = ("output", "error")
+
+
+def blob_dir_for(journal_path):
+    return os.path.join(os.path.dirname(journal_path), BLOB_DIR)
+
+
+class BlobStore:
+    """Write-once, hash-keyed text blobs, gzip-compressed when that saves space. Thread-safe."""
+
+    def __init__(self, root, inline_bytes=DEFAULT_INLINE_BYTES):
+        self.root = root
+        self.inline_bytes = inline_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _existing_path(self, digest):
+        for path in (self._path(digest) + GZIP_SUFFIX, self._path(digest)):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, text):
+        """Stores `text` (if not stored yet) and returns its reference."""
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            # Always ask the disk: gc may have deleted the blob since this process last stored it
+            path = self._existing_path(digest)
+            if path is not None:
+                try:
+                    # Reused blobs get a fresh mtime, so gc's grace period covers the record about
+                    # to refer to them even if gc read the journal before that record was appended
+                    os.utime(path)
+                except FileNotFoundError:
+                    path = None  # Deleted by gc just now
+            if path is None:
+                self._write(digest, data)
+        return {"sha256": digest, "bytes": len(data), "preview": text[:PREVIEW_CHARS]}
+
+    def _write(self, digest, data):
+        path = self._path(digest)
+        if len(data) >= COMPRESS_MIN_BYTES:
+            compressed = gzip.compress(data, compresslevel=6, mtime=0)
+            if len(compressed) < len(data):
+                path, data = path + GZIP_SUFFIX, compressed
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # Atomic: a reader never sees a partial blob
+
+    def get(self, digest):
+        """The stored text for a hash, or None if the blob is missing."""
+        path = self._existing_path(digest) if len(digest) == 64 and digest.isalnum() else None
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.endswith(GZIP_SUFFIX):
+            data = gzip.decompress(data)
+        return data.decode('utf-8', errors='replace')
+
+    def externalize(self, event):
+        """Returns a copy of `event` with large outputs replaced by <field>_ref references."""
+        slim = None
+        for field in OUTPUT_FIELDS:
+            text = event.get(field)
+            if isinstance(text, str) and len(text) > self.inline_bytes:
+                slim = slim if slim is not None else dict(event)
+                slim[field] = None
+                slim[f"{field}_ref"] = self.put(text)
+        return event if slim is None else slim
+
+
+def resolve_output(event, field, store):
+    """Full text of an event's output/error field, whether inline or stored as a blob.
+
+    A blob that has gone missing yields its preview with a marker, never the preview alone.
+    """
+    ref = event.get(f"{field}_ref")
+    if not ref:
+        return event.get(field)
+    text = store.get(ref.get("sha256", ""))
+    if text is not None:
+        return text
+    return (f"{ref.get('preview', '')}\n[blob {ref.get('sha256', '?')} missing from {store.root}: "
+            f"only the first {PREVIEW_CHARS} of {ref.get('bytes', '?')} bytes are available]")
+
+
+# --- Process-wide registry ---
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(root):
+    key = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BlobStore(root)
+        return store
+
+
+# --- Maintenance ---
+
+def migrate_journal(journal_path):
+    """Rewrites the journal with inline outputs moved into the blob store. Returns records rewritten."""
+    store = get_blob_store(blob_dir_for(journal_path))
+    rewritten = 0
+
+    def externalize(event):
+        nonlocal rewritten
+        slim = store.externalize(event)
+        rewritten += slim is not event
+        return slim
+
+    compact_journal(journal_path, transform=externalize)
+    return rewritten
+
+
+def collect_garbage(journal_path, grace_seconds=GC_GRACE_SECONDS):
+    """Deletes blobs no journal record refers to (older than the grace period). Returns (deleted, bytes)."""
+    referenced = set()
+    for event in read_events(journal_path):
+        for field in OUTPUT_FIELDS:
+            ref = event.get(f"{field}_ref")
+            if isinstance(ref, dict) and ref.get("sha256"):
+                referenced.add(ref["sha256"])
+    deleted = freed = 0
+    cutoff = time.time() - grace_seconds
+    for directory, _dirs, files in os.walk(blob_dir_for(journal_path)):
+        for name in files:
+            path = os.path.join(directory, name)
+            digest = name[:-len(GZIP_SUFFIX)] if name.endswith(GZIP_SUFFIX) else name
+            try:
+                stat = os.stat(path)
+                if digest not in referenced and stat.st_mtime < cutoff:
+                    os.remove(path)
+                    deleted += 1
+                    freed += stat.st_size
+            except OSError as e:
+                print(f"⚠️ Warning: Could not remove blob {path}: {e}")
+    return deleted, freed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed output store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="Move inline outputs of existing records into the blob store")
+    migrate_parser.add_argument("journal", nargs="?", default=os.path.join("logs", EXECUTION_LOG_JOURNAL))
+    gc_parser = subparsers.add_parser("gc", help="Delete blobs that no journal record refers to")
+    gc_parser.add_argument("journal", nargs="?", default=os.path.join("logs", EXECUTION_LOG_JOURNAL))
+    gc_parser.add_argument("--grace-seconds", type=float, default=GC_GRACE_SECONDS,
+                           help="Keep unreferenced blobs younger than this")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        before = os.path.getsize(args.journal) if os.path.exists(args.journal) else 0
+        count = migrate_journal(args.journal)
+        after = os.path.getsize(args.journal) if os.path.exists(args.journal) else 0
+        print(f"📦 Moved outputs of {count} records into {blob_dir_for(args.journal)}; "
+              f"journal {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    elif args.command == "gc":
+        deleted, freed = collect_garbage(args.journal, args.grace_seconds)
+        print(f"🧹 Deleted {deleted} unreferenced blobs, freed {freed / 1e6:.1f} MB")
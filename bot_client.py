@@ -0,0 +1,103 @@
+# bot_client.py
+# Thin client for the threat_bot.py daemon (`python threat_bot.py --daemon`). Takes the same
+# arguments as threat_bot.py, hands them to the daemon together with its stdout/stderr (and the
+# dashboard's --progress-fd pipe), waits for the run and exits with its exit code. Signals are
+# forwarded to the worker, so cancelling the client cancels the run.
+# Without a daemon listening it simply runs threat_bot.py itself. Only the standard library is
+# imported here, so starting the client costs next to nothing.
+#
+#   python bot_client.py --iterations 5 --dry-run
+import json
+import os
+import signal
+import socket
+import sys
+
+SOCKET_NAME = "threat_bot.sock"
+SOCKET_ENV = "THREAT_BOT_SOCKET"
+THREAT_BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "threat_bot.py")
+
+
+def _take_option(argv, name):
+    """Removes `name VALUE` / `name=VALUE` from argv; returns (value or None, remaining argv)."""
+    value = None
+    remaining = []
+    args = iter(argv)
+    for arg in args:
+        if arg == name:
+            value = next(args, None)
+        elif arg.startswith(name + "="):
+            value = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+    return value, remaining
+
+
+def socket_path_for(argv):
+    """Same default as the daemon: --daemon-socket, $THREAT_BOT_SOCKET or <log-dir>/threat_bot.sock."""
+    explicit, _ = _take_option(argv, "--daemon-socket")
+    log_dir, _ = _take_option(argv, "--log-dir")
+    return explicit or os.environ.get(SOCKET_ENV) or os.path.join(log_dir or "logs", SOCKET_NAME)
+
+
+def run_directly(argv):
+    """No daemon: replace this process with a regular threat_bot.py run (fds, incl. progress, are kept)."""
+    os.execv(sys.executable, [sys.executable, THREAT_BOT_SCRIPT] + argv)
+
+
+def main(argv):
+    path = socket_path_for(argv)
+    _, argv = _take_option(argv, "--daemon-socket")
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        run_directly(argv)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        print(f"ℹ️ No threat_bot daemon answering on {path}; running directly.", file=sys.stderr)
+        run_directly(argv)
+
+    progress_fd, request_argv = _take_option(argv, "--progress-fd")
+    fds = [sys.stdout.fileno(), sys.stderr.fileno()]
+    if progress_fd is not None:
+        fds.append(int(progress_fd))
+    request = {"argv": request_argv, "cwd": os.getcwd(), "progress": progress_fd is not None}
+    sys.stdout.flush()
+    socket.send_fds(sock, [(json.dumps(request) + "\n").encode('utf-8')], fds)
+    if progress_fd is not None:
+        os.close(int(progress_fd))  # The worker holds the write end now; EOF still means the run ended
+
+    worker_pid = None
+
+    def forward(signum, frame):
+        if worker_pid is not None:
+            try:
+                os.kill(worker_pid, signum)
+            except OSError:
+                pass
+        elif signum != signal.SIGINT:
+            sys.exit(128 + signum)  # Not started yet: closing the connection is enough
+        else:
+            raise KeyboardInterrupt
+
+    for name in ("SIGTERM", "SIGINT", "SIGHUP"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), forward)
+
+    with sock, sock.makefile('r', encoding='utf-8') as replies:
+        for line in replies:
+            message = json.loads(line)
+            if message.get("type") == "started":
+                worker_pid = message.get("pid")
+            elif message.get("type") == "exit":
+                return message.get("code", 1)
+            elif message.get("type") == "error":
+                print(f"❌ Daemon rejected the run: {message.get('message')}", file=sys.stderr)
+                return 1
+    print("❌ The daemon worker exited without reporting a result.", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
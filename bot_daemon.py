@@ -0,0 +1,215 @@
+# bot_daemon.py
+# Warm daemon behind `python threat_bot.py --daemon`. The TTP libraries, compiled scenarios and
+# the ATT&CK mapping stay loaded in this process (reloaded when their files change), and every
+# run request arriving on a local Unix socket is served by a forked worker that starts from that
+# warm state, so a run reaches its first command in milliseconds instead of re-importing and
+# re-parsing everything. Requests come from bot_client.py (also used by the dashboard).
+#
+# Protocol: the client sends one JSON line {"argv", "cwd", "progress"} together with its stdout,
+# stderr and (optionally) progress pipe fds (SCM_RIGHTS). The worker writes the run's output
+# straight to those fds and answers {"type": "started", "pid"} and {"type": "exit", "code"}.
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+
+import threat_bot
+from attack_coverage import save_all_coverage
+from execution_store import close_all_stores
+from journal import close_all_journals
+from run_logger import get_run_logger
+
+SOCKET_NAME = "threat_bot.sock"
+SOCKET_ENV = "THREAT_BOT_SOCKET"
+MAX_REQUEST_BYTES = 1024 * 1024
+MAX_REQUEST_FDS = 3              # stdout, stderr, progress pipe
+REQUEST_TIMEOUT = 5              # Seconds a client has to send its request
+ACCEPT_POLL_INTERVAL = 1.0       # Seconds between checks for finished workers
+
+
+def default_socket_path(log_dir=threat_bot.LOG_DIR):
+    return os.environ.get(SOCKET_ENV) or os.path.join(log_dir, SOCKET_NAME)
+
+
+def _send(conn, message):
+    conn.sendall((json.dumps(message) + "\n").encode('utf-8'))
+
+
+def _read_request(conn):
+    """Returns (request dict, received fds)."""
+    conn.settimeout(REQUEST_TIMEOUT)
+    data, fds, _flags, _addr = socket.recv_fds(conn, MAX_REQUEST_BYTES, MAX_REQUEST_FDS)
+    while data and not data.endswith(b"\n") and len(data) < MAX_REQUEST_BYTES:
+        chunk = conn.recv(MAX_REQUEST_BYTES)
+        if not chunk:
+            break
+        data += chunk
+    conn.settimeout(None)
+    return json.loads(data.decode('utf-8')), fds
+
+
+def _run_worker(conn, request, fds):
+    """Forked child: runs one request with the client's fds as stdout/stderr. Never returns."""
+    code = 1
+    finished = threading.Event()
+    try:
+        os.setsid()  # Own process group: the daemon's signals don't reach it, the client's forwarding does
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1] if len(fds) > 1 else fds[0], 2)
+        argv = list(request.get("argv", []))
+        if request.get("progress") and len(fds) > 2:
+            argv += ["--progress-fd", str(fds[2])]
+        for fd in fds[:2]:
+            os.close(fd)
+        sys.stdout.reconfigure(line_buffering=True)  # Output reaches the client's file as it happens
+        sys.stderr.reconfigure(line_buffering=True)
+        _send(conn, {"type": "started", "pid": os.getpid()})
+
+        def watch_client():
+            # The client went away (e.g. killed by a dashboard cancel): stop the run like a SIGTERM would
+            with contextlib.suppress(OSError):
+                while conn.recv(1024):
+                    pass
+            if not finished.is_set():
+                os.kill(os.getpid(), signal.SIGTERM)
+        threading.Thread(target=watch_client, name="client-watch", daemon=True).start()
+
+        args = threat_bot.build_arg_parser().parse_args(argv)
+        if args.daemon:
+            print("❌ Error: --daemon can't be requested from a daemon client.")
+        else:
+            code = threat_bot.run(args)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except KeyboardInterrupt:
+        code = 130
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        # No more signal-driven exits from here on: nothing may unwind into the daemon's loop
+        finished.set()
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # os._exit skips atexit, so flush what a normal exit would have flushed
+        with contextlib.suppress(Exception):
+            get_run_logger().close()
+            close_all_journals()
+            save_all_coverage()
+            close_all_stores()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        with contextlib.suppress(OSError):
+            _send(conn, {"type": "exit", "code": code})
+        os._exit(code)
+
+
+def _reap(workers):
+    for pid in list(workers):
+        try:
+            done, _status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done = pid
+        if done:
+            workers.discard(pid)
+
+
+def _bind(socket_path):
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            raise RuntimeError(f"a daemon is already listening on {socket_path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)  # Stale socket left by a daemon that didn't shut down cleanly
+        finally:
+            probe.close()
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)  # Running commands on request: owner only
+    server.listen(64)
+    server.settimeout(ACCEPT_POLL_INTERVAL)
+    return server
+
+
+def serve(socket_path=None, log_dir=threat_bot.LOG_DIR):
+    """Serves run requests until SIGTERM/SIGINT. Returns the exit code."""
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        print("❌ Error: Daemon mode needs Unix sockets and fork(); run threat_bot.py directly on this platform.")
+        return 1
+    socket_path = os.path.abspath(socket_path or default_socket_path(log_dir))
+    try:
+        server = _bind(socket_path)
+    except (OSError, RuntimeError) as e:
+        print(f"❌ Error: Could not listen on {socket_path}: {e}")
+        return 1
+    socket_inode = os.stat(socket_path).st_ino
+
+    started = time.perf_counter()
+    threat_bot.warm_resources(threat_bot.build_arg_parser().parse_args([]))
+    print(f"🔥 Warmed default library and ATT&CK mapping in {time.perf_counter() - started:.2f}s")
+    print(f"🛰️ threat_bot daemon listening on {socket_path} (pid {os.getpid()})")
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    daemon_cwd = os.getcwd()
+    workers = set()
+    try:
+        while True:
+            _reap(workers)
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            fds = []
+            try:
+                request, fds = _read_request(conn)
+                if not fds:
+                    raise ValueError("request carried no output fds")
+                os.chdir(request.get("cwd") or daemon_cwd)  # Relative paths resolve like the client's
+                # Reload anything whose files changed before forking; parse errors are left to the worker
+                with contextlib.suppress(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                    threat_bot.warm_resources(threat_bot.build_arg_parser().parse_args(request.get("argv", [])))
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        server.close()
+                        _run_worker(conn, request, fds)
+                    finally:
+                        os._exit(1)  # The worker must never return into the daemon's loop
+                workers.add(pid)
+                print(f"▶️ Run {pid}: {' '.join(request.get('argv', [])) or '(defaults)'}", flush=True)
+            except Exception as e:
+                print(f"⚠️ Rejected request: {e}")
+                with contextlib.suppress(OSError):
+                    _send(conn, {"type": "error", "message": str(e)})
+            finally:
+                for fd in fds:
+                    with contextlib.suppress(OSError):
+                        os.close(fd)
+                conn.close()
+                os.chdir(daemon_cwd)
+    except KeyboardInterrupt:
+        print("\n🛑 Daemon stopping; running workers finish on their own.")
+    finally:
+        server.close()
+        with contextlib.suppress(OSError):
+            if os.stat(socket_path).st_ino == socket_inode:  # Not replaced by a newer daemon
+                os.unlink(socket_path)
+    return 0
@@ -0,0 +1,293 @@
+# campaign_scheduler.py
+# Recurring emulation campaigns in one long-running process instead of cron starting
+# threat_bot.py over and over. Every job of a campaign file (library or scenario, iterations,
+# interval, jitter, allowed time windows) sits in one heap ordered by its next due time; a single
+# loop sleeps until the earliest job is due and runs it in-process through threat_bot.run(), so
+# libraries, compiled scenarios and the ATT&CK mapping stay loaded between runs (they are only
+# reloaded when their files change). Runs never overlap: a job that became due while another
+# one was running starts right after it, and missed intervals are counted, not replayed.
+# Each tick is recorded in the structured journal as a "Campaign (...)" event.
+#
+#   python campaign_scheduler.py --campaigns campaigns.json --log-dir logs
+#   python campaign_scheduler.py --campaigns campaigns.json --list
+import argparse
+import heapq
+import json
+import os
+import random
+import re
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import threat_bot
+from command_runner import kill_active_commands
+from journal import EXECUTION_LOG_JOURNAL
+from run_logger import install_signal_handlers
+
+CAMPAIGNS_FILE = "campaigns.json"
+MAX_IDLE_SLEEP = 60.0    # Upper bound for one sleep, so clock changes are noticed
+WINDOW_SEARCH_DAYS = 8   # A weekly window always opens within this many days
+
+DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def parse_duration(value):
+    """Seconds from a number or a string like "90", "45s", "15m", "2h", "1d"."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+    else:
+        match = DURATION_RE.match(str(value))
+        if not match:
+            raise ValueError(f"invalid duration {value!r} (use e.g. 90, '15m', '2h', '1d')")
+        seconds = float(match.group(1)) * DURATION_UNITS[match.group(2)]
+    if seconds < 0:
+        raise ValueError(f"negative duration {value!r}")
+    return seconds
+
+
+def _parse_clock(value):
+    hours, _, minutes = str(value).partition(":")
+    total = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= total <= 24 * 60:
+        raise ValueError(f"invalid time of day {value!r} (use HH:MM)")
+    return total
+
+
+class TimeWindow:
+    """Weekly window like {"days": ["mon", "fri"], "start": "09:00", "end": "17:00"} (local time).
+
+    An end at or before the start wraps past midnight (e.g. 22:00-06:00).
+    """
+
+    def __init__(self, spec):
+        days = spec.get("days") or WEEKDAYS
+        try:
+            self.days = {WEEKDAYS.index(str(day).lower()[:3]) for day in days}
+        except ValueError:
+            raise ValueError(f"invalid day in window {spec!r} (use mon..sun)")
+        self.start = _parse_clock(spec.get("start", "00:00"))
+        self.end = _parse_clock(spec.get("end", "24:00"))
+
+    def contains(self, moment):
+        minute = moment.hour * 60 + moment.minute + moment.second / 60
+        if self.start < self.end:
+            return moment.weekday() in self.days and self.start <= minute < self.end
+        # Wraps past midnight: the evening part belongs to today, the morning part to yesterday
+        return ((moment.weekday() in self.days and minute >= self.start)
+                or ((moment.weekday() - 1) % 7 in self.days and minute < self.end))
+
+    def next_open(self, moment):
+        """Start of the next occurrence of this window after `moment`, or None."""
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        for offset in range(WINDOW_SEARCH_DAYS):
+            day = midnight + timedelta(days=offset)
+            opens = day + timedelta(minutes=self.start)
+            if day.weekday() in self.days and opens > moment:
+                return opens
+        return None
+
+
+class CampaignJob:
+    """One recurring job: threat_bot.py arguments plus its schedule."""
+
+    def __init__(self, spec, log_dir, force_dry_run=False):
+        self.name = str(spec.get("name") or "").strip()
+        if not self.name:
+            raise ValueError(f"job without a name: {spec!r}")
+        self.interval = parse_duration(spec.get("every", "1h"))
+        if self.interval < 1:
+            raise ValueError(f"job '{self.name}': 'every' must be at least 1 second")
+        self.jitter = parse_duration(spec.get("jitter", 0))
+        self.windows = [TimeWindow(window) for window in spec.get("windows", [])]
+        self.max_runs = spec.get("max_runs")
+        self.enabled = spec.get("enabled", True)
+        self.runs = 0
+
+        argv = ["--ttp-set", str(spec.get("ttp_set", "ttp_library.json")),
+                "--iterations", str(spec.get("iterations", 1)),
+                "--workers", str(spec.get("workers", 1)),
+                "--log-dir", log_dir,
+                "--run-label", self.name]
+        for key, flag in (("base_library", "--base-library"), ("scenario_file", "--scenario-file")):
+            if spec.get(key):
+                argv += [flag, str(spec[key])]
+        if spec.get("dry_run") or force_dry_run:
+            argv.append("--dry-run")
+        if spec.get("no_enrich"):
+            argv.append("--no-enrich")
+        argv += [str(arg) for arg in spec.get("args", [])]  # Any other threat_bot.py option
+        try:
+            self.args = threat_bot.build_arg_parser().parse_args(argv)
+        except SystemExit:
+            raise ValueError(f"job '{self.name}': invalid threat_bot arguments {argv!r}")
+        if self.args.daemon or self.args.validate_scenarios:
+            raise ValueError(f"job '{self.name}': --daemon/--validate-scenarios can't be scheduled")
+
+    def in_window(self, moment):
+        return not self.windows or any(window.contains(moment) for window in self.windows)
+
+    def window_open(self, timestamp):
+        """`timestamp` if it lies in an allowed window, else the next window opening (or None)."""
+        moment = datetime.fromtimestamp(timestamp)
+        if self.in_window(moment):
+            return timestamp
+        opens = [o for o in (window.next_open(moment) for window in self.windows) if o is not None]
+        return min(opens).timestamp() if opens else None
+
+    def next_due(self, after, rng):
+        """Next run time: one interval (plus random jitter) after `after`, moved into a window."""
+        due = self.window_open(after + self.interval)
+        return None if due is None else due + rng.uniform(0, self.jitter)
+
+    def first_due(self, now, rng):
+        # Jitter also spreads the first runs, so a campaign start doesn't fire every job at once
+        due = self.window_open(now)
+        return None if due is None else due + rng.uniform(0, self.jitter)
+
+
+def load_campaigns(path, log_dir=threat_bot.LOG_DIR, force_dry_run=False):
+    """Reads a campaign file ({"jobs": [...]} or a plain list of jobs). Raises ValueError."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"could not decode JSON from {path}: {e}")
+    specs = data.get("jobs", []) if isinstance(data, dict) else data
+    if not isinstance(specs, list):
+        raise ValueError(f"{path} must contain a list of jobs")
+    jobs = [CampaignJob(spec, log_dir, force_dry_run) for spec in specs]
+    names = [job.name for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate job names in {path}: {', '.join(duplicates)}")
+    return [job for job in jobs if job.enabled]
+
+
+class CampaignScheduler:
+    """Runs campaign jobs one at a time, in due-time order, in this process."""
+
+    def __init__(self, jobs, log_dir=threat_bot.LOG_DIR, seed=None):
+        self.log_dir = log_dir
+        self.journal_path = os.path.join(log_dir, EXECUTION_LOG_JOURNAL)
+        self.rng = random.Random(seed)
+        self._queue = []   # (due timestamp, sequence, job)
+        self._sequence = 0
+        now = time.time()
+        for job in jobs:
+            self._push(job, job.first_due(now, self.rng))
+
+    def _push(self, job, due):
+        if due is None:
+            print(f"⚠️ Warning: Job '{job.name}' has no upcoming time window; not scheduled again.")
+            return
+        self._sequence += 1
+        heapq.heappush(self._queue, (due, self._sequence, job))
+
+    def upcoming(self):
+        """[(due timestamp, job)] in the order they will run."""
+        return [(due, job) for due, _, job in sorted(self._queue)]
+
+    def warm(self):
+        """Loads every job's libraries/scenarios and the ATT&CK mapping up front."""
+        for _, _, job in self._queue:
+            try:
+                threat_bot.warm_resources(job.args)
+            except Exception as e:
+                print(f"⚠️ Warning: Could not preload job '{job.name}': {e}")
+
+    def run_forever(self, max_ticks=None):
+        """Runs due jobs until no job is left (or after `max_ticks` runs). Returns the tick count."""
+        ticks = 0
+        while self._queue and (max_ticks is None or ticks < max_ticks):
+            due, _, job = self._queue[0]
+            wait = due - time.time()
+            if wait > 0:
+                time.sleep(min(wait, MAX_IDLE_SLEEP))
+                continue
+            heapq.heappop(self._queue)
+            started = time.time()
+            if not job.in_window(datetime.fromtimestamp(started)):
+                # Became due inside its window but started after it closed (a long run before it)
+                self._push(job, job.window_open(started))
+                continue
+            self.tick(job, due, started)
+            ticks += 1
+            job.runs += 1
+            if job.max_runs is None or job.runs < job.max_runs:
+                # Counted from the actual start, so a late run isn't followed by a burst of catch-ups
+                self._push(job, job.next_due(started, self.rng))
+        return ticks
+
+    def tick(self, job, due, started):
+        """Runs one job now and records the tick in the journal."""
+        missed = int((started - due) // job.interval)
+        print(f"\n⏰ Campaign job '{job.name}' (run {job.runs + 1}"
+              f"{f', {missed} interval(s) missed while busy' if missed else ''})")
+        exit_code, error = None, None
+        # Chosen here rather than read back from latest.json, which still names the previous
+        # run if this one fails before writing its pointer
+        base_filename = threat_bot.new_run_base(job.args)
+        try:
+            exit_code = threat_bot.run(job.args, base_filename)
+        except Exception as e:
+            traceback.print_exc()
+            error = str(e)
+        status = ("Campaign (Completed)" if exit_code == 0 else
+                  f"Campaign (Failed: Code {exit_code})" if exit_code is not None else "Campaign (Failed: Exception)")
+        threat_bot.log_structured_event({
+            "timestamp": datetime.now().isoformat(),
+            "status": status,
+            "id": f"campaign:{job.name}",
+            "name": job.name,
+            "command": " ".join(["threat_bot.py", "--ttp-set", job.args.ttp_set, "--iterations", str(job.args.iterations)]
+                                + (["--dry-run"] if job.args.dry_run else [])),
+            "dry_run": job.args.dry_run,
+            "platform": None,
+            "output": None,
+            "error": error,
+            "exit_code": exit_code,
+            "duration_seconds": round(time.time() - started, 3),
+            "scheduled_for": datetime.fromtimestamp(due).isoformat(),
+            "missed_intervals": missed,
+            "campaign_run": job.runs + 1,
+            "run_id": os.path.basename(base_filename),
+        }, self.journal_path)
+        print(f"{'✅' if exit_code == 0 else '❌'} Campaign job '{job.name}': {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run recurring emulation campaigns in one process")
+    parser.add_argument("--campaigns", default=CAMPAIGNS_FILE, help="Campaign definition file")
+    parser.add_argument("--log-dir", default=threat_bot.LOG_DIR, help="Directory for run logs and the journal")
+    parser.add_argument("--dry-run", action="store_true", help="Force --dry-run for every job")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for jitter (reproducible schedules)")
+    parser.add_argument("--max-ticks", type=int, default=None, help="Stop after this many job runs")
+    parser.add_argument("--list", action="store_true", help="Print the upcoming schedule and exit")
+    args = parser.parse_args()
+
+    try:
+        jobs = load_campaigns(args.campaigns, args.log_dir, args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error loading campaigns from {args.campaigns}: {e}")
+        exit(1)
+    scheduler = CampaignScheduler(jobs, args.log_dir, args.seed)
+    if args.list:
+        for due, job in scheduler.upcoming():
+            print(f"{datetime.fromtimestamp(due):%Y-%m-%d %H:%M:%S}  {job.name}  (every {job.interval:g}s, "
+                  f"jitter {job.jitter:g}s, {job.args.ttp_set})")
+        exit(0)
+
+    # Kill running commands and flush buffered logs if the scheduler is terminated mid-run
+    install_signal_handlers(on_terminate=kill_active_commands)
+    started = time.perf_counter()
+    scheduler.warm()
+    print(f"🔥 Preloaded {len(jobs)} job(s) in {time.perf_counter() - started:.2f}s")
+    print(f"🗓️ Campaign scheduler running {len(jobs)} job(s) from {args.campaigns}; Ctrl-C to stop.")
+    try:
+        ticks = scheduler.run_forever(args.max_ticks)
+        print(f"🏁 Campaign finished after {ticks} run(s).")
+    except KeyboardInterrupt:
+        print("\n🛑 Campaign scheduler stopped.")
@@ -0,0 +1,211 @@
+# command_runner.py
+# Asyncio-based command runner used by execute_ttp.
+# Output is streamed line by line to a callback as it arrives (so the run log fills live),
+# only a bounded head + tail of each stream is retained, and on timeout the whole process
+# group is killed rather than just the shell.
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+DEFAULT_TIMEOUT = 60               # Seconds, overridable per TTP via "timeout" in the library
+DEFAULT_HEAD_BYTES = 16 * 1024     # Retained from the start of each stream...
+DEFAULT_TAIL_BYTES = 48 * 1024     # ...and from its end; everything in between is elided
+READ_CHUNK_SIZE = 64 * 1024
+MAX_LINE_BYTES = 64 * 1024         # Longer "lines" are emitted in pieces
+KILL_DRAIN_TIMEOUT = 5             # Seconds to wait for pipes to close after a kill
+
+# Commands currently running in this process, so they can be killed on shutdown
+_active_processes = set()
+_active_lock = threading.Lock()
+
+
+class BoundedCapture:
+    """Keeps the first head_bytes and last tail_bytes of a stream, counting what was dropped."""
+
+    def __init__(self, head_bytes=DEFAULT_HEAD_BYTES, tail_bytes=DEFAULT_TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self._head = []
+        self._head_size = 0
+        self._tail = deque()
+        self._tail_size = 0
+        self.total_bytes = 0
+        self.elided_bytes = 0
+        self.elided_lines = 0
+
+    def append(self, line):
+        size = len(line)
+        self.total_bytes += size
+        if not self._tail and self._head_size + size <= self.head_bytes:
+            self._head.append(line)
+            self._head_size += size
+            return
+        # Ring buffer for the tail: the oldest lines fall off once the budget is exceeded
+        self._tail.append(line)
+        self._tail_size += size
+        while self._tail_size > self.tail_bytes and len(self._tail) > 1:
+            dropped = self._tail.popleft()
+            self._tail_size -= len(dropped)
+            self.elided_bytes += len(dropped)
+            self.elided_lines += 1
+        if self._tail_size > self.tail_bytes:
+            # A single line larger than the whole tail budget: keep only its end
+            cut = self._tail_size - self.tail_bytes
+            self._tail[0] = self._tail[0][cut:]
+            self._tail_size -= cut
+            self.elided_bytes += cut
+
+    @property
+    def truncated(self):
+        return self.elided_bytes > 0
+
+    def text(self):
+        head = b"".join(self._head).decode('utf-8', errors='ignore')
+        tail = b"".join(self._tail).decode('utf-8', errors='ignore')
+        if not self.truncated:
+            return head + tail
+        marker = f"\n... [{self.elided_bytes} bytes / {self.elided_lines} lines elided] ...\n"
+        return head + marker + tail
+
+
+class CommandResult:
+    __slots__ = ("returncode", "stdout", "stderr", "timed_out", "duration", "spawn_duration",
+                 "stdout_bytes", "stderr_bytes", "truncated")
+
+    def __init__(self, returncode, stdout, stderr, timed_out, duration, stdout_bytes, stderr_bytes, truncated,
+                 spawn_duration=0.0):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+        self.duration = duration
+        self.spawn_duration = spawn_duration  # Part of duration spent starting the shell
+        self.stdout_bytes = stdout_bytes
+        self.stderr_bytes = stderr_bytes
+        self.truncated = truncated
+
+
+async def _pump(stream, name, capture, on_line):
+    pending = b""
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        if len(pending) > MAX_LINE_BYTES:
+            lines.append(pending)
+            pending = b""
+        for line in lines:
+            capture.append(line + b"\n")
+            if on_line:
+                on_line(name, line.decode('utf-8', errors='ignore').rstrip("\r"))
+    if pending:
+        capture.append(pending)
+        if on_line:
+            on_line(name, pending.decode('utf-8', errors='ignore').rstrip("\r"))
+
+
+def _kill_process_group(proc):
+    """Kills the shell and everything it spawned."""
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)  # pid == pgid thanks to start_new_session
+            return
+    except OSError:
+        pass
+    # Fallback for the shell alone. Not used after a successful killpg: Popen.kill() polls
+    # (and may reap) the child behind the asyncio child watcher's back.
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def _run(command, timeout, on_line, head_bytes, tail_bytes):
+    if os.name == 'nt':
+        group_kwargs = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        group_kwargs = {"start_new_session": True}  # New process group we can kill as a whole
+
+    started = time.monotonic()
+    proc = await asyncio.create_subprocess_shell(
+        command,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        **group_kwargs
+    )
+    spawned = time.monotonic()
+    with _active_lock:
+        _active_processes.add(proc)
+    stdout_capture = BoundedCapture(head_bytes, tail_bytes)
+    stderr_capture = BoundedCapture(head_bytes, tail_bytes)
+    pumps = asyncio.gather(
+        _pump(proc.stdout, "stdout", stdout_capture, on_line),
+        _pump(proc.stderr, "stderr", stderr_capture, on_line),
+    )
+
+    finished = asyncio.gather(pumps, proc.wait())
+    timed_out = False
+    try:
+        await asyncio.wait_for(asyncio.shield(finished), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill_process_group(proc)
+        try:
+            # Processes that escaped the group could keep the pipes open; don't wait forever
+            await asyncio.wait_for(finished, KILL_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    except asyncio.CancelledError:
+        # The loop is shutting down (e.g. SystemExit from a termination signal): reap the command first
+        _kill_process_group(proc)
+        try:
+            await asyncio.wait_for(finished, KILL_DRAIN_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        raise
+    finally:
+        with _active_lock:
+            _active_processes.discard(proc)
+
+    return CommandResult(
+        returncode=proc.returncode,
+        stdout=stdout_capture.text(),
+        stderr=stderr_capture.text(),
+        timed_out=timed_out,
+        duration=time.monotonic() - started,
+        stdout_bytes=stdout_capture.total_bytes,
+        stderr_bytes=stderr_capture.total_bytes,
+        truncated=stdout_capture.truncated or stderr_capture.truncated,
+        spawn_duration=spawned - started,
+    )
+
+
+def run_command(command, timeout=DEFAULT_TIMEOUT, on_line=None,
+                head_bytes=DEFAULT_HEAD_BYTES, tail_bytes=DEFAULT_TAIL_BYTES):
+    """Runs a shell command, streaming on_line(stream_name, line) as output arrives.
+
+    Safe to call from worker threads: each call runs its own event loop.
+    Returns a CommandResult; result.timed_out is set (and the process group killed) on timeout.
+    """
+    return asyncio.run(_run(command, timeout, on_line, head_bytes, tail_bytes))
+
+
+def kill_active_commands():
+    """Kills the process groups of all commands still running (e.g. when the bot is terminated).
+
+    Lock-free so it is safe in a signal handler: set.copy() is atomic under the GIL.
+    """
+    for proc in _active_processes.copy():
+        if proc.returncode is None:
+            _kill_process_group(proc)
@@ -0,0 +1,104 @@
+# compiled_library.py
+# Compiled form of a loaded TTP library (ttp_library.json or the ATT&CK attack-patterns).
+# Each TTP becomes a compact record with its platforms normalized once, and records are
+# bucketed by platform so compatibility filtering and random selection only touch the
+# buckets for the host OS instead of re-checking every TTP.
+import random
+from heapq import merge
+
+# Map platform.system() names to the platform terms used in TTP definitions.
+# MITRE uses: Linux, macOS, Windows, Azure AD, Office 365, SaaS, IaaS, Google Workspace, PRE, Network, Containers
+OS_PLATFORM_MAPPING = {
+    'windows': 'windows',
+    'linux': 'linux',
+    'darwin': 'macos',  # Map macOS from plat.system() to MITRE's term
+    # Add other mappings if needed (e.g., 'freebsd': 'linux' if desired)
+}
+ALL_PLATFORMS = 'all'
+
+
+def normalize_platforms(ttp):
+    """Lowercased platform set from 'platform' (or MITRE's 'x_mitre_platforms').
+
+    Returns None when the TTP has no platform info or it has an unexpected format;
+    such TTPs are treated as incompatible everywhere.
+    """
+    platform_info = ttp.get('platform')
+    if platform_info is None:
+        platform_info = ttp.get('x_mitre_platforms')
+    if isinstance(platform_info, str):
+        return frozenset([platform_info.lower()])
+    if isinstance(platform_info, list):
+        return frozenset(p.lower() for p in platform_info if isinstance(p, str))
+    return None
+
+
+def platforms_match(platforms, current_os):
+    """True if a normalized platform set allows running on `current_os` (platform.system().lower())."""
+    if not platforms:
+        return False
+    if ALL_PLATFORMS in platforms:
+        return True
+    mapped_os = OS_PLATFORM_MAPPING.get(current_os)
+    return mapped_os is not None and mapped_os in platforms
+
+
+class TTPRecord:
+    """One compiled TTP. `ttp` is the original definition, passed on unchanged to execute_ttp."""
+    __slots__ = ("ttp", "ttp_id", "name", "platforms", "position")
+
+    def __init__(self, ttp, position):
+        self.ttp = ttp
+        self.ttp_id = ttp.get('id')
+        self.name = ttp.get('name', 'N/A')
+        self.platforms = normalize_platforms(ttp)
+        self.position = position
+
+    def compatible(self, current_os):
+        return platforms_match(self.platforms, current_os)
+
+
+class CompiledLibrary:
+    """TTP records plus an ID index and a platform -> record positions index."""
+
+    def __init__(self, ttps):
+        self.records = []
+        self.by_id = {}
+        self._buckets = {}      # platform -> ascending record positions
+        self._compatible = {}   # current_os -> compatible records (library order), built on demand
+        for ttp in ttps:
+            if not isinstance(ttp, dict):
+                continue
+            record = TTPRecord(ttp, len(self.records))
+            self.records.append(record)
+            if record.ttp_id is not None:
+                self.by_id[record.ttp_id] = record  # Later duplicates win, as with a plain dict
+            for platform_name in record.platforms or ():
+                self._buckets.setdefault(platform_name, []).append(record.position)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, ttp_id):
+        return self.by_id.get(ttp_id)
+
+    def compatible(self, current_os):
+        """Records runnable on `current_os`, in library order: the 'all' bucket merged with the OS bucket."""
+        cached = self._compatible.get(current_os)
+        if cached is None:
+            buckets = [self._buckets.get(ALL_PLATFORMS, [])]
+            mapped_os = OS_PLATFORM_MAPPING.get(current_os)
+            if mapped_os is not None and mapped_os != ALL_PLATFORMS:
+                buckets.append(self._buckets.get(mapped_os, []))
+            positions = []
+            for position in merge(*buckets):
+                if not positions or positions[-1] != position:  # TTP listed under both buckets
+                    positions.append(position)
+            cached = [self.records[p] for p in positions]
+            self._compatible[current_os] = cached
+        return cached
+
+    def sample(self, current_os, count, rng=random):
+        """Up to `count` distinct random records compatible with `current_os`."""
+        compatible = self.compatible(current_os)
+        return rng.sample(compatible, min(count, len(compatible)))
@@ -1,17 +1,36 @@
 import os
-import subprocess
-import glob
 import time
 import streamlit as st
 import json
-from utils import load_attack_mapping
+from datetime import datetime
+from utils import file_signature, load_attack_mapping
+from library_shards import is_sharded_library, library_exists, library_signature, load_library_shards
+from attack_index import load_attack_index
+from stix_reader import is_stix_bundle
+from ttp_search import TTPSearchIndex, paginate
+from log_tail import IncrementalTail, read_latest_pointer
+from log_rotation import list_runs, run_log_files
+from journal import EXECUTION_LOG_JSON, EXECUTION_LOG_JOURNAL
+from execution_history import STATUS_CATEGORIES, ExecutionHistory
+from attack_coverage import CoverageSummary, coverage_matrix
+from blob_store import BLOB_DIR, BlobStore, resolve_output
+from execution_store import EXECUTION_STORE_DB, ExecutionStore
+from run_manager import DEFAULT_MAX_CONCURRENT_RUNS, RunLimitError, RunManager
+from metrics import read_metrics_summary
+from scenario_compiler import load_compiled_scenarios
 
 # Constants
 TTP_LIBRARY_FILE = "ttp_library.json"
+TTP_LIBRARY_SHARDS = "ttp_library.d" # Optional directory of library shards, offered when it exists
 ATTACK_DATASET_FILE = "attack_dataset.json"
 SCENARIO_FILE = "attack_scenarios.json"
 LOG_DIR = "logs"
-EXECUTION_LOG_JSON = "execution_log.json"
+EXECUTION_LOG_PATH = os.path.join(LOG_DIR, EXECUTION_LOG_JOURNAL)
+EXECUTION_STORE_PATH = os.path.join(LOG_DIR, EXECUTION_STORE_DB)
+BLOB_STORE_PATH = os.path.join(LOG_DIR, BLOB_DIR)
+CACHE_MAX_ENTRIES = 8 # Per loader; least recently used entries are evicted
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+RUN_PROGRESS_REFRESH = 2 # Seconds between live progress updates of active runs
 
 # --- Helper Functions ---
 
@@ -19,19 +38,24 @@ EXECUTION_LOG_JSON = "execution_log.json"
 def load_ttps(filepath):
     """Loads TTP definitions from a JSON file, handling different formats."""
     try:
+        # A directory or glob of library shards is merged into one library
+        if is_sharded_library(filepath):
+            library = load_library_shards(filepath)
+            for problem in library.problems():
+                st.warning(problem)
+            return library.ttps
+        # Handle specific structure of MITRE ATT&CK dataset
+        if filepath == ATTACK_DATASET_FILE or is_stix_bundle(filepath):
+            try:
+                # Attack-patterns come precompiled from the index cache instead of a full parse
+                return load_attack_index(filepath)["attack_patterns"]
+            except ValueError as e:
+                st.error(f"Error: {e}")
+                return []
         with open(filepath, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            # Handle specific structure of MITRE ATT&CK dataset
-            if filepath == ATTACK_DATASET_FILE:
-                 # Ensure it's a dict and has 'objects' key which is a list
-                if isinstance(data, dict) and isinstance(data.get("objects"), list):
-                    # Filter for attack-patterns only, as the dataset contains other object types
-                    return [obj for obj in data["objects"] if obj.get("type") == "attack-pattern"]
-                else:
-                    st.error(f"Error: Unexpected format in {ATTACK_DATASET_FILE}. Expected a dict with an 'objects' list.")
-                    return []
             # Assume other files contain a list of TTPs directly
-            elif isinstance(data, list):
+            if isinstance(data, list):
                 return data
             else:
                  st.error(f"Error: Unexpected format in {filepath}. Expected a JSON list.")
@@ -46,36 +70,98 @@ def load_ttps(filepath):
         st.error(f"An unexpected error occurred loading {filepath}: {e}")
         return []
 
-def load_executions(filepath=EXECUTION_LOG_JSON):
-    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
-        return []
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        st.error(f"Error: Could not decode execution log {filepath}. It might be corrupted.")
-        return []
-    except Exception as e:
-        st.error(f"An error occurred loading execution log: {e}")
-        return []
-
-def load_scenario_names(filepath=SCENARIO_FILE):
-    scenario_names = []
+def load_scenarios(filepath=SCENARIO_FILE):
+    scenarios = {}
     if os.path.exists(filepath):
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
-                scenarios = json.load(f)
-                if isinstance(scenarios, dict):
-                    scenario_names = list(scenarios.keys())
+                data = json.load(f)
+                if isinstance(data, dict):
+                    scenarios = data
                 else:
                     st.sidebar.warning(f"{filepath} is not a valid scenario format (expected dictionary).")
         except json.JSONDecodeError:
             st.sidebar.error(f"Error decoding {filepath}. Ensure it's valid JSON.")
         except Exception as e:
             st.sidebar.error(f"Error loading scenarios from {filepath}: {e}")
-    else:
-        pass
-    return scenario_names
+    return scenarios
+
+def load_scenario_names(filepath=SCENARIO_FILE):
+    return list(cached_load_scenarios(filepath).keys())
+
+# --- Cached Loaders ---
+# Streamlit reruns this whole script on every interaction. The loaders above are cached per
+# server process (shared by all sessions) and keyed on path + (size, mtime), so a file is only
+# re-read after it changes on disk. Cached objects are shared: never mutate them.
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _load_ttps_cached(filepath, signature):
+    return load_ttps(filepath)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _load_attack_mapping_cached(dataset, signature):
+    return load_attack_mapping(dataset)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _load_scenarios_cached(filepath, signature):
+    return load_scenarios(filepath)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner="Indexing TTPs...")
+def _search_index_cached(filepath, signature, dataset_signature):
+    return TTPSearchIndex(cached_load_ttps(filepath), cached_load_attack_mapping())
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _compiled_scenarios_cached(scenario_file, base_library, signature, library_signature):
+    return load_compiled_scenarios(scenario_file, base_library, load_ttps)
+
+def cached_compiled_scenarios(scenario_file=SCENARIO_FILE, base_library=TTP_LIBRARY_FILE):
+    return _compiled_scenarios_cached(scenario_file, base_library,
+                                      file_signature(scenario_file), library_signature(base_library))
+
+def cached_search_index(filepath):
+    return _search_index_cached(filepath, library_signature(filepath), file_signature(ATTACK_DATASET_FILE))
+
+@st.cache_resource(show_spinner=False)
+def cached_execution_history(journal_path):
+    # One shared reader per journal; it catches its offset index up on every page request
+    return ExecutionHistory(journal_path)
+
+@st.cache_resource(show_spinner=False)
+def cached_blob_store(root):
+    return BlobStore(root)
+
+@st.cache_resource(show_spinner=False)
+def cached_coverage(journal_path):
+    # One shared summary per journal; each rerun only folds in lines appended since the last one
+    return CoverageSummary(journal_path)
+
+@st.cache_resource(show_spinner=False)
+def cached_execution_store(db_path):
+    # One shared connection per server process; WAL lets it read while threat_bot.py writes
+    return ExecutionStore(db_path)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _list_runs_cached(log_dir, signature):
+    return [run["base"] for run in list_runs(log_dir)]
+
+def cached_run_bases(log_dir=LOG_DIR):
+    # The directory's mtime changes whenever a run's files are created, rotated or removed
+    return _list_runs_cached(log_dir, file_signature(log_dir))
+
+@st.cache_resource(show_spinner=False)
+def get_run_manager():
+    # Shared by all sessions so the concurrency limit covers every launched run
+    return RunManager(output_dir=os.path.join(LOG_DIR, "jobs"))
+
+def cached_load_ttps(filepath):
+    # Sharded libraries are keyed on every shard, so editing one shard invalidates the merged library
+    return _load_ttps_cached(filepath, library_signature(filepath))
+
+def cached_load_attack_mapping(dataset=ATTACK_DATASET_FILE):
+    return _load_attack_mapping_cached(dataset, file_signature(dataset))
+
+def cached_load_scenarios(filepath=SCENARIO_FILE):
+    return _load_scenarios_cached(filepath, file_signature(filepath))
 
 # --- Dashboard UI ---
 st.set_page_config(page_title="Threat Emulation Dashboard", layout="wide")
@@ -84,13 +170,14 @@ st.title("🚨 Threat Emulation Live Dashboard")
 # --- Sidebar ---
 st.sidebar.header("⚙️ Emulation Control")
 
-ttp_options = [TTP_LIBRARY_FILE, ATTACK_DATASET_FILE]
+ttp_options = [TTP_LIBRARY_FILE] + ([TTP_LIBRARY_SHARDS] if os.path.isdir(TTP_LIBRARY_SHARDS) else []) + [ATTACK_DATASET_FILE]
 scenario_names = load_scenario_names()
 scenario_options = [f"scenario:{name}" for name in scenario_names]
 
 all_options = ttp_options + scenario_options
 display_options = {
     TTP_LIBRARY_FILE: "Standard TTP Library",
+    TTP_LIBRARY_SHARDS: f"Sharded TTP Library ({TTP_LIBRARY_SHARDS}/)",
     ATTACK_DATASET_FILE: "MITRE ATT&CK Dataset (All)",
     **{f"scenario:{name}": f"Scenario: {name}" for name in scenario_names}
 }
@@ -112,6 +199,26 @@ iterations = st.sidebar.slider(
     help="Only used when a TTP library is selected. Determines how many random TTPs are run."
 )
 dry_run = st.sidebar.checkbox("Dry Run Mode", value=True)
+workers = st.sidebar.number_input(
+    "Parallel Workers:",
+    min_value=1,
+    max_value=16,
+    value=1,
+    help="TTPs executed concurrently. Scenario steps still wait for the steps they depend on."
+)
+sqlite_store = st.sidebar.checkbox(
+    "Record in SQLite Store",
+    value=os.path.exists(EXECUTION_STORE_PATH),
+    help=f"Also write structured events to {EXECUTION_STORE_PATH} for fast filtered queries."
+)
+run_manager = get_run_manager()
+run_manager.max_concurrent = st.sidebar.number_input(
+    "Max Concurrent Runs:",
+    min_value=1,
+    max_value=10,
+    value=DEFAULT_MAX_CONCURRENT_RUNS,
+    help="Further runs are refused while this many are still active."
+)
 
 # --- Execution Control ---
 st.markdown("---")
@@ -134,18 +241,58 @@ dry_run = st.checkbox("🌵 Dry Run (Print commands instead of executing)", valu
 if st.button("▶️ Run threat_bot.py", disabled=disable_run_button):
     st.sidebar.info(f"Executing threat_bot.py with {selected_option}...")
     try:
-        cmd = ["python", "threat_bot.py", "--ttp-set", selected_option]
+        # Served by a warm `threat_bot.py --daemon` when one is running, else runs threat_bot.py directly
+        cmd = ["python", "bot_client.py", "--ttp-set", selected_option]
         if not is_scenario and selected_option != ATTACK_DATASET_FILE:
             cmd.extend(["--iterations", str(iterations)])
+        if workers > 1:
+            cmd.extend(["--workers", str(workers)])
         if dry_run:
             cmd.append("--dry-run")
-        subprocess.Popen(cmd)  
-        st.sidebar.success("Execution started!")
+        if sqlite_store:
+            cmd.append("--sqlite-store")
+        job = run_manager.start(cmd)
+        st.sidebar.success(f"Execution started! (run {job.job_id}, PID {job.pid})")
+    except RunLimitError as e:
+        st.sidebar.warning(f"Run not started: {e}. Wait for a run to finish or cancel one.")
     except FileNotFoundError:
         st.sidebar.error("Error: 'python' command not found. Is Python installed and in PATH?")
     except Exception as e:
         st.sidebar.error(f"Failed to run: {e}")
 
+def render_runs():
+    jobs = run_manager.jobs()
+    if not jobs:
+        st.caption("No runs launched from this dashboard yet.")
+        return
+    for job in jobs:
+        with st.container(border=True):
+            info_col, cancel_col = st.columns([5, 1])
+            with info_col:
+                st.write(f"**Run {job.job_id}** — {job.state} — PID {job.pid}, started {job.started.strftime('%H:%M:%S')}")
+                st.caption(" ".join(job.command))
+            with cancel_col:
+                if job.active and st.button("⏹️ Cancel", key=f"cancel_{job.job_id}"):
+                    run_manager.cancel(job.job_id)
+            if job.total:
+                st.progress(min(1.0, job.completed / job.total),
+                            text=f"{job.completed}/{job.total} steps ({job.failed_steps} failed)")
+            if job.current:
+                st.write(f"Running: {', '.join(str(ttp_id) for ttp_id in job.current)}")
+            if job.steps:
+                last = job.steps[-1]
+                st.caption(f"Last step: {last.get('id')} - {last.get('name')} ({'ok' if last.get('ok') else 'failed'})")
+            if not job.active:
+                st.caption(f"Exit code: {job.returncode}. Console output: `{job.output_path}`")
+
+st.subheader("🏃 Runs")
+# Progress re-renders on its own while the rest of the page stays put (older Streamlit: manual refresh)
+if hasattr(st, "fragment"):
+    st.fragment(run_every=RUN_PROGRESS_REFRESH)(render_runs)()
+else:
+    st.button("🔄 Refresh Runs")  # Any click reruns the script
+    render_runs()
+
 # --- Main Area ---
 
 st.header("📄 Selected TTPs / Scenario Steps")
@@ -158,26 +305,31 @@ if is_scenario:
     scenario_name = selected_option.split(":", 1)[1]
     st.write(f"Running Scenario: **{scenario_name}**")
     if os.path.exists(SCENARIO_FILE):
-         try:
-            with open(SCENARIO_FILE, 'r', encoding='utf-8') as f:
-                all_scenarios = json.load(f)
-                scenario_details = all_scenarios.get(scenario_name)
-                if scenario_details:
-                     st.write("Steps (TTP IDs):")
-                     st.json(scenario_details) 
-                     # Note: We don't load the TTP details here, the bot does that
-                else:
-                     st.error(f"Scenario '{scenario_name}' not found in {SCENARIO_FILE}")
-         except Exception as e:
-            st.error(f"Error reading scenario file: {e}")
+        scenario_details = cached_load_scenarios().get(scenario_name)
+        if scenario_details:
+             st.write("Steps (TTP IDs):")
+             st.json(scenario_details) 
+             # Same compiled plans threat_bot.py runs from: problems show up before launching
+             try:
+                 compiled_scenario = cached_compiled_scenarios().get(scenario_name)
+             except Exception as e:
+                 compiled_scenario = None
+                 st.warning(f"Could not compile scenarios: {e}")
+             if compiled_scenario is not None and compiled_scenario.error:
+                 st.error(f"Scenario is invalid: {compiled_scenario.error}")
+             elif compiled_scenario is not None and compiled_scenario.missing:
+                 st.warning(f"Not in {TTP_LIBRARY_FILE} (will be skipped): {', '.join(compiled_scenario.missing)}")
+             # Note: We don't load the TTP details here, the bot does that
+        else:
+             st.error(f"Scenario '{scenario_name}' not found in {SCENARIO_FILE}")
     else:
         st.error(f"{SCENARIO_FILE} not found.")
 # Check if the selected option is an existing file (TTP library)
-elif os.path.exists(selected_option): 
+elif library_exists(selected_option): 
     current_library_path = selected_option # Store the path
     # Load TTPs if a library file is selected
     st.write(f"Using TTP Library: **{display_options.get(selected_option, selected_option)}** (`{selected_option}`)")
-    selected_ttps = load_ttps(selected_option)
+    selected_ttps = cached_load_ttps(selected_option)
     if selected_ttps:
         st.write(f"Loaded {len(selected_ttps)} TTPs from the library.")
         # Optional: Display loaded TTP names/IDs if needed (can be long)
@@ -195,70 +347,43 @@ else:
 # Display TTP Details (only if a library was loaded and TTPs exist)
 st.subheader("🔍 Browse Loaded TTPs")
 if selected_ttps:
-    attack_map = load_attack_mapping() # Load mapping once
+    # Index (IDs, enrichment, tokens) is built once per library + dataset version
+    search_index = cached_search_index(current_library_path)
     
     # Add simple text search for browsing
-    search_term = st.text_input("Search loaded TTPs by ID or Name:").lower()
-    
-    filtered_ttps = []
-    if search_term:
-        for ttp in selected_ttps:
-            # Standardize ID extraction for search
-            ttp_id_search = ttp.get('id')
-            if not ttp_id_search and current_library_path == ATTACK_DATASET_FILE:
-                 ext_refs = ttp.get('external_references', [])
-                 for ref in ext_refs:
-                     if ref.get('source_name') == 'mitre-attack':
-                         ttp_id_search = ref.get('external_id')
-                         break
-            # Fallback if no ID found after checking ext refs
-            ttp_id_search = ttp_id_search or ""
-            ttp_name_search = ttp.get('name', '').lower()
-            
-            if search_term in ttp_id_search.lower() or search_term in ttp_name_search:
-                filtered_ttps.append(ttp)
-        if not filtered_ttps:
-             st.caption("No TTPs match your search term.")
-    else:
-        filtered_ttps = selected_ttps # Show all if no search term
-        
-    # Display the filtered TTPs
-    for ttp in filtered_ttps:
-        ttp_id = ttp.get('id') # Safely get ID for display/lookup
-        ttp_name = ttp.get('name', 'Unknown TTP') # Safely get name
-        
-        # For MITRE data, the ID might be inside external_references
-        # Extract the proper ID for display and enrichment lookup
-        if not ttp_id and current_library_path == ATTACK_DATASET_FILE:
-             ext_refs = ttp.get('external_references', [])
-             for ref in ext_refs:
-                 if ref.get('source_name') == 'mitre-attack':
-                     ttp_id = ref.get('external_id')
-                     break # Found the MITRE ID
+    search_term = st.text_input("Search loaded TTPs by ID, name, tactic, platform or description:")
+    filtered_entries = search_index.search(search_term)
+    if search_term and not filtered_entries:
+         st.caption("No TTPs match your search term.")
+
+    # Only the current page is rendered, not one expander per match
+    col_size, col_page = st.columns(2)
+    with col_size:
+        page_size = st.selectbox("TTPs per page:", options=PAGE_SIZE_OPTIONS, index=1)
+    page_count = max(1, -(-len(filtered_entries) // page_size))
+    with col_page:
+        page = st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, value=1, step=1)
+    page_entries, page, page_count = paginate(filtered_entries, int(page), page_size)
+    if filtered_entries:
+        first = (page - 1) * page_size + 1
+        st.caption(f"Showing {first}–{first + len(page_entries) - 1} of {len(filtered_entries)} TTPs")
         
+    # Display the TTPs on this page
+    for entry in page_entries:
+        ttp = entry.ttp
         # Define a fallback ID if absolutely necessary (should be rare)
-        display_id = ttp_id if ttp_id else f"(No ID Found - {ttp_name[:20]}...)" 
-
-        # Use the extracted/default ttp_id for enrichment lookup if available
-        enrich = attack_map.get(ttp_id) if ttp_id else None 
+        display_id = entry.ttp_id if entry.ttp_id else f"(No ID Found - {entry.name[:20]}...)" 
         
-        with st.expander(f"{display_id} - {ttp_name}"): # Use display_id and ttp_name
+        with st.expander(f"{display_id} - {entry.name}"): # Use display_id and ttp_name
             st.write(f"**Description:** {ttp.get('description', 'N/A')}") # Use .get()
-            if enrich:
-                st.write(f"- **Tactic:** {enrich.get('tactic', 'N/A')}") # Use .get()
-                # Ensure URL exists before creating markdown link
-                if enrich.get('url'):
-                     st.markdown(f"- **More Info:** [{enrich.get('url')}]({enrich.get('url')})") 
-            
-            # Platform info might be in 'x_mitre_platforms' for ATT&CK data
-            platforms = ttp.get('platform') # Check standard key first
-            if not platforms and current_library_path == ATTACK_DATASET_FILE:
-                 platforms = ttp.get('x_mitre_platforms') # MITRE specific key
+            if entry.tactic:
+                st.write(f"- **Tactic:** {entry.tactic}")
+            # Ensure URL exists before creating markdown link
+            if entry.url:
+                 st.markdown(f"- **More Info:** [{entry.url}]({entry.url})") 
             
-            if platforms:
-                 # If platforms is a list, join it; otherwise, display as is
-                 platform_str = ", ".join(platforms) if isinstance(platforms, list) else str(platforms)
-                 st.write(f"- **Platform(s):** {platform_str}")
+            if entry.platforms:
+                 st.write(f"- **Platform(s):** {', '.join(entry.platforms)}")
                  
             # Show raw command only if available (likely only in ttp_library.json format)
             if ttp.get('command'):
@@ -271,54 +396,187 @@ elif current_library_path:
 
 st.markdown("## 📜 Recently Executed TTPs")
 
-executed_ttps = load_executions()
+# Pages are served from the journal's offset index; only the shown records are decoded
+history = cached_execution_history(EXECUTION_LOG_PATH)
+
+filter_cols = st.columns(4)
+with filter_cols[0]:
+    history_status = st.selectbox("Status:", options=["All"] + STATUS_CATEGORIES)
+with filter_cols[1]:
+    history_ttp_id = st.text_input("TTP ID:", key="history_ttp_id").strip()
+with filter_cols[2]:
+    history_since = st.date_input("From:", value=None, key="history_since")
+with filter_cols[3]:
+    history_until = st.date_input("To:", value=None, key="history_until")
+
+page_cols = st.columns(2)
+with page_cols[0]:
+    history_page_size = st.selectbox("Records per page:", options=PAGE_SIZE_OPTIONS, index=0, key="history_page_size")
+with page_cols[1]:
+    history_page = st.number_input("History page:", min_value=1, value=1, step=1, key="history_page")
+
+try:
+    executed_ttps, history_total, history_has_next = history.page(
+        int(history_page),
+        history_page_size,
+        status=None if history_status == "All" else history_status,
+        ttp_id=history_ttp_id or None,
+        since=datetime.combine(history_since, datetime.min.time()).timestamp() if history_since else None,
+        until=datetime.combine(history_until, datetime.max.time()).timestamp() if history_until else None,
+    )
+except Exception as e:
+    st.error(f"An error occurred loading execution log {EXECUTION_LOG_PATH}: {e}")
+    executed_ttps, history_total, history_has_next = [], 0, False
+
+if os.path.exists(EXECUTION_LOG_JSON):
+    st.caption(f"Legacy `{EXECUTION_LOG_JSON}` found; its records are imported into the journal on the next run.")
 
 if executed_ttps:
-    for ttp in reversed(executed_ttps[-10:]):  
+    if history_total is not None:
+        st.caption(f"{history_total} executions recorded in total.")
+    elif history_has_next:
+        st.caption("More matching executions on the next page.")
+    for ttp in executed_ttps:
         with st.expander(f"{ttp['timestamp']} — {ttp['id']} ({ttp['name']})"):
+            st.write(f"**Status:** {ttp.get('status', 'N/A')}")
             st.write(f"**Command:** `{ttp['command']}`")
             st.write(f"**Platform:** {ttp['platform']}")
             st.write(f"**Dry Run:** {ttp['dry_run']}")
-            if ttp.get("output"):
-                st.code(ttp["output"], language="bash")
-            if ttp.get("error"):
-                st.error(ttp["error"])
+            for field in ("output", "error"):
+                ref = ttp.get(f"{field}_ref")
+                if ref:
+                    # Stored in the blob store: preview now, full text only when asked for
+                    load_key = f"load_{field}_{ref['sha256']}_{ttp['timestamp']}"
+                    if st.button(f"Load full {field} ({ref['bytes']:,} bytes)", key=load_key):
+                        text = resolve_output(ttp, field, cached_blob_store(BLOB_STORE_PATH))
+                    else:
+                        text = ref.get("preview", "") + " …"
+                else:
+                    text = ttp.get(field)
+                if text and field == "output":
+                    st.code(text, language="bash")
+                elif text:
+                    st.error(text)
+elif int(history_page) > 1:
+    st.write("No executions on this page.")
 else:
     st.write("No TTPs executed yet.")
 
+# Indexed queries across all runs, e.g. "which techniques failed on Linux last week"
+if os.path.exists(EXECUTION_STORE_PATH):
+    st.subheader("🔎 Query Execution Store")
+    store = cached_execution_store(EXECUTION_STORE_PATH)
+    query_cols = st.columns(3)
+    with query_cols[0]:
+        query_status = st.selectbox("Status:", options=STATUS_CATEGORIES, index=1, key="store_status")
+    with query_cols[1]:
+        query_host_os = st.selectbox("Host OS:", options=["All"] + store.host_os_values(), key="store_host_os")
+    with query_cols[2]:
+        query_days = st.number_input("Last N days:", min_value=1, value=7, step=1, key="store_days")
+    try:
+        summary = store.technique_summary(
+            status=query_status,
+            host_os=None if query_host_os == "All" else query_host_os,
+            since=time.time() - int(query_days) * 86400,
+        )
+    except Exception as e:
+        st.error(f"An error occurred querying {EXECUTION_STORE_PATH}: {e}")
+        summary = []
+    if summary:
+        st.dataframe(summary, use_container_width=True)
+    else:
+        st.write("No matching executions in the store.")
+
+# Coverage comes from the summary maintained next to the journal, not from a scan of the history
+st.subheader("🗺️ ATT&CK Coverage")
+coverage = cached_coverage(EXECUTION_LOG_PATH)
+try:
+    coverage.refresh()
+    technique_rows = coverage.technique_rows()
+except Exception as e:
+    st.error(f"An error occurred updating the coverage summary {coverage.path}: {e}")
+    technique_rows = []
+
+if technique_rows:
+    attack_mapping = cached_load_attack_mapping()
+    matrix = coverage_matrix(technique_rows, attack_mapping)
+    st.caption(f"{len(technique_rows)} techniques exercised. Coverage = exercised / ATT&CK techniques per tactic.")
+    st.bar_chart(matrix, x="tactic", y=["exercised", "succeeded"])
+    st.dataframe(matrix, use_container_width=True)
+    technique_tab, tactic_tab, platform_tab = st.tabs(["Techniques", "Tactics", "Platforms"])
+    with technique_tab:
+        st.dataframe([{**row, "attack_name": attack_mapping.get(row["id"], {}).get("name"),
+                       "url": attack_mapping.get(row["id"], {}).get("url")} for row in technique_rows],
+                     use_container_width=True)
+    with tactic_tab:
+        st.dataframe(coverage.tactic_rows(), use_container_width=True)
+    with platform_tab:
+        st.dataframe(coverage.platform_rows(), use_container_width=True)
+else:
+    st.write("No techniques executed yet.")
+
 st.markdown("---")
-st.subheader("📜 Execution Logs (Latest Run)")
+st.subheader("📜 Execution Logs")
 
 def get_latest_run_base_filename():
-    main_log_files = glob.glob(os.path.join(LOG_DIR, "threat_bot_*.log"))
-    if not main_log_files:
-        return None
-    latest_main_log = max(main_log_files, key=os.path.getctime)
-    base_filename = os.path.basename(latest_main_log)[:-4] 
-    return base_filename
+    # threat_bot.py maintains logs/latest.json, so no directory scan is needed
+    base_filename, _ = read_latest_pointer(LOG_DIR)
+    if base_filename:
+        return base_filename
+    # Fallback for log directories written by older versions
+    run_bases = cached_run_bases()
+    return run_bases[0] if run_bases else None
+
+def get_run_log_files(base_filename):
+    pointer_base, pointer_files = read_latest_pointer(LOG_DIR)
+    if pointer_base == base_filename and pointer_files and all(os.path.exists(f) for f in pointer_files):
+        return pointer_files
+    # Older runs, compressed (.gz) or rolled-over (.log.N) logs
+    return run_log_files(LOG_DIR, base_filename)
 
 latest_run_base = get_latest_run_base_filename()
 
 if latest_run_base:
-    st.caption(f"Displaying logs for run: `{latest_run_base}`")
-    run_log_files = glob.glob(os.path.join(LOG_DIR, f"{latest_run_base}*"))
+    # Earlier runs (including compressed ones) can be browsed too; the latest run is the default
+    run_bases = [latest_run_base] + [b for b in cached_run_bases() if b != latest_run_base]
+    selected_run_base = st.selectbox("Run:", run_bases, index=0)
+    st.caption(f"Displaying logs for run: `{selected_run_base}`")
+    run_log_files = get_run_log_files(selected_run_base)
+    tail_line_count = st.number_input("Lines to show per log:", min_value=5, max_value=1000, value=20, step=5)
+
+    # Byte offsets per file live in the session, so a refresh only reads newly appended bytes
+    log_tail = st.session_state.get("log_tail")
+    if log_tail is None or log_tail.max_lines != tail_line_count:
+        log_tail = IncrementalTail(int(tail_line_count))
+        st.session_state["log_tail"] = log_tail
+    log_tail.forget_missing()
 
     if run_log_files:
         log_tabs = st.tabs([os.path.basename(f) for f in sorted(run_log_files)])
 
         for i, log_file_path in enumerate(sorted(run_log_files)):
             with log_tabs[i]:
-                st.caption(f"Showing last 20 lines of `{os.path.basename(log_file_path)}`")
+                st.caption(f"Showing last {tail_line_count} lines of `{os.path.basename(log_file_path)}`")
                 try:
-                    with open(log_file_path, "r", encoding='utf-8') as f:
-                        lines = f.readlines()
-                        last_lines = lines[-20:] 
-                        st.text("".join(last_lines))
+                    st.text("\n".join(log_tail.read(log_file_path)))
                 except Exception as e:
                     st.error(f"Could not read log file {os.path.basename(log_file_path)}: {e}")
         st.caption("⏱️ Refresh page to update logs for the latest run.")
     else:
-        st.warning(f"Found latest run '{latest_run_base}' but no associated log files.")
+        st.warning(f"Found run '{selected_run_base}' but no associated log files.")
+
+    # Per-phase timings written by threat_bot.py at the end of the run
+    run_metrics = read_metrics_summary(os.path.join(LOG_DIR, selected_run_base))
+    with st.expander("⏱️ Phase Breakdown"):
+        if run_metrics and run_metrics.get("phases"):
+            st.write(f"**Run duration:** {run_metrics.get('duration_seconds', 0):.2f}s")
+            phase_rows = [{"phase": phase, "total_seconds": stats["total_seconds"], "count": stats["count"],
+                           "max_seconds": stats["max_seconds"]}
+                          for phase, stats in run_metrics["phases"].items()]
+            st.bar_chart(phase_rows, x="phase", y="total_seconds")
+            st.dataframe(phase_rows, use_container_width=True)
+        else:
+            st.caption("No metrics yet; they are written when the run finishes.")
 else:
     st.warning("No log files found in the `logs/` directory.")
 
@@ -0,0 +1,554 @@
+# distributed.py
+# Controller/agent mode: one controller fans TTPs (random picks or scenario steps) out to agents
+# on other hosts and collects their structured events into its own journal.
+#
+# Protocol: TCP, one JSON object per line.
+#   agent -> controller  {"type": "hello", "agent_id", "os", "hostname", "capacity", "nonce"}
+#   controller -> agent  {"type": "challenge", "nonce", "proof"}   proof = HMAC(token, controller|agent nonce|own nonce)
+#   agent -> controller  {"type": "auth", "proof"}                 proof = HMAC(token, agent|controller nonce|own nonce)
+#   controller -> agent  {"type": "welcome"} or {"type": "error", "message"}
+#   controller -> agent  {"type": "task", "task_id", "ttp", "dry_run"}
+#   agent -> controller  {"type": "result", "task_id", "ok", "event"}
+#   controller -> agent  {"type": "bye"}  (campaign finished)
+# Both sides must share a token and prove it to each other without sending it; after the
+# handshake every controller message carries a "mac" under a per-connection session key, and
+# agents ignore anything unauthenticated, so only the real controller can make them run commands.
+# The channel is not encrypted: commands and outputs are readable on the network.
+# Each step goes to an idle agent whose OS the TTP is compatible with (same rules as
+# is_compatible). If an agent disconnects, its in-flight steps are requeued on another agent.
+#
+#   python distributed.py controller --listen 127.0.0.1:9700 --ttp-set ttp_library.json --iterations 5 --min-agents 2
+#   python distributed.py agent --controller 127.0.0.1:9700 --log-dir logs/agent-1
+import argparse
+import atexit
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import platform as plat
+import random
+import secrets
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+
+import threat_bot
+from attack_index import AttackEnricher
+from compiled_library import CompiledLibrary, platforms_match, normalize_platforms
+from execution_engine import build_independent_plan, prune_plan, run_plan
+from journal import EXECUTION_LOG_JOURNAL
+from log_rotation import mark_run_closed
+from run_logger import get_run_logger, install_signal_handlers
+from command_runner import kill_active_commands
+from scenario_compiler import load_compiled_scenarios
+
+DEFAULT_PORT = 9700
+DEFAULT_AGENT_WAIT = 30        # Seconds the controller waits for --min-agents to connect
+DEFAULT_MAX_ATTEMPTS = 3       # Agents a step is tried on before it is given up
+RECONNECT_INTERVAL = 5         # Seconds between agent reconnect attempts
+HANDSHAKE_TIMEOUT = 10
+TOKEN_ENV = "THREAT_BOT_AGENT_TOKEN"
+
+
+class AuthenticationError(Exception):
+    """The other side of a controller/agent connection failed the token challenge."""
+
+
+def _proof(token, role, *nonces):
+    message = "|".join((role,) + nonces).encode('utf-8')
+    return hmac.new(token.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def _session_key(token, agent_nonce, controller_nonce):
+    return hmac.new(token.encode('utf-8'), f"session|{agent_nonce}|{controller_nonce}".encode('utf-8'),
+                    hashlib.sha256).digest()
+
+
+def _mac(key, message):
+    body = json.dumps({k: v for k, v in message.items() if k != "mac"},
+                      ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hmac.new(key, body.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def _verify_mac(key, message):
+    return hmac.compare_digest(str(message.get("mac", "")), _mac(key, message))
+
+
+class AgentDisconnected(Exception):
+    """The agent running a step went away before reporting its result."""
+
+
+def _send(writer, lock, message):
+    line = json.dumps(message, ensure_ascii=False, separators=(',', ':')) + "\n"
+    with lock:
+        writer.write(line)
+        writer.flush()
+
+
+def _parse_address(address, default_host="127.0.0.1"):
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port or DEFAULT_PORT)
+
+
+# --- Controller ---
+
+class AgentConnection:
+    """Controller-side state of one connected agent."""
+
+    def __init__(self, sock, hello):
+        self.sock = sock
+        self.writer = sock.makefile('w', encoding='utf-8', newline='\n')
+        self.send_lock = threading.Lock()
+        self.agent_id = str(hello.get("agent_id") or uuid.uuid4().hex[:8])
+        self.os = str(hello.get("os", "")).lower()
+        self.hostname = hello.get("hostname", "unknown")
+        self.capacity = max(1, int(hello.get("capacity", 1)))
+        self.in_flight = {}  # task_id -> Future
+        self.alive = True
+        self.session_key = None  # Set once the agent passed the challenge; signs every message
+
+    def send(self, message):
+        if self.session_key is not None:
+            message = dict(message, mac=_mac(self.session_key, message))
+        _send(self.writer, self.send_lock, message)
+
+
+class AgentPool:
+    """Connected agents plus compatibility-aware slot allocation."""
+
+    def __init__(self):
+        self._agents = {}
+        self._cond = threading.Condition()
+
+    def add(self, agent):
+        with self._cond:
+            previous = self._agents.get(agent.agent_id)
+            if previous is not None and previous.alive:
+                raise ValueError(f"agent ID '{agent.agent_id}' is already connected")
+            self._agents[agent.agent_id] = agent
+            self._cond.notify_all()
+
+    def remove(self, agent):
+        with self._cond:
+            agent.alive = False
+            if self._agents.get(agent.agent_id) is agent:
+                del self._agents[agent.agent_id]
+            in_flight, agent.in_flight = agent.in_flight, {}
+            self._cond.notify_all()
+        for future in in_flight.values():
+            if not future.done():
+                future.set_exception(AgentDisconnected(f"agent {agent.agent_id} disconnected"))
+
+    def agents(self):
+        with self._cond:
+            return list(self._agents.values())
+
+    def wait_for_agents(self, count, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._agents) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return len(self._agents)
+
+    def dispatch(self, platforms, task, exclude=()):
+        """Sends `task` to an idle compatible agent, waiting for a free slot.
+
+        Returns (agent, future), or (None, None) when no connected agent is compatible.
+        """
+        with self._cond:
+            while True:
+                compatible = [a for a in self._agents.values()
+                              if a.alive and a not in exclude and platforms_match(platforms, a.os)]
+                if not compatible:
+                    return None, None
+                idle = [a for a in compatible if len(a.in_flight) < a.capacity]
+                if idle:
+                    agent = min(idle, key=lambda a: len(a.in_flight) / a.capacity)
+                    future = Future()
+                    agent.in_flight[task["task_id"]] = future
+                    break
+                self._cond.wait()
+        try:
+            agent.send(task)
+        except OSError:
+            self.remove(agent)  # Fails the future with AgentDisconnected
+        return agent, future
+
+    def complete(self, agent, task_id, result):
+        with self._cond:
+            future = agent.in_flight.pop(task_id, None)
+            self._cond.notify_all()
+        if future is not None and not future.done():
+            future.set_result(result)
+
+
+class Controller:
+    """Accepts agents and runs a plan across them."""
+
+    def __init__(self, listen, token):
+        self.host, self.port = _parse_address(listen)
+        self.token = token
+        self.pool = AgentPool()
+        self._server = None
+        self._task_ids = itertools.count(1)
+
+    def start(self):
+        self._server = socket.create_server((self.host, self.port), reuse_port=False)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept_loop, name="controller-accept", daemon=True).start()
+        print(f"🛰️ Controller listening on {self.host}:{self.port}")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return  # Server socket closed
+            threading.Thread(target=self._serve_agent, args=(sock, address), daemon=True).start()
+
+    def _serve_agent(self, sock, address):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.settimeout(HANDSHAKE_TIMEOUT)
+        reader = sock.makefile('r', encoding='utf-8', newline='\n')
+        try:
+            hello = json.loads(reader.readline() or "{}")
+        except (OSError, json.JSONDecodeError):
+            sock.close()
+            return
+        agent = AgentConnection(sock, hello)
+        try:
+            if hello.get("type") != "hello" or not hello.get("nonce"):
+                raise ValueError("expected hello")
+            # Mutual challenge: prove the token to the agent, then make it prove the token back
+            agent_nonce, controller_nonce = str(hello["nonce"]), secrets.token_hex(16)
+            agent.send({"type": "challenge", "nonce": controller_nonce,
+                        "proof": _proof(self.token, "controller", agent_nonce, controller_nonce)})
+            try:
+                auth = json.loads(reader.readline() or "{}")
+            except (OSError, json.JSONDecodeError):
+                auth = {}
+            expected = _proof(self.token, "agent", controller_nonce, agent_nonce)
+            if auth.get("type") != "auth" or not hmac.compare_digest(str(auth.get("proof", "")), expected):
+                raise ValueError("invalid token")
+            sock.settimeout(None)
+            agent.session_key = _session_key(self.token, agent_nonce, controller_nonce)
+            self.pool.add(agent)
+        except ValueError as e:
+            print(f"⚠️ Rejected agent from {address[0]}: {e}")
+            try:
+                agent.send({"type": "error", "message": str(e)})
+            except OSError:
+                pass
+            sock.close()
+            return
+        agent.send({"type": "welcome"})
+        print(f"🤝 Agent {agent.agent_id} connected from {address[0]} ({agent.hostname}, {agent.os}, capacity {agent.capacity})")
+
+        try:
+            for line in reader:
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if message.get("type") == "result":
+                    self.pool.complete(agent, message.get("task_id"), message)
+        except OSError:
+            pass
+        finally:
+            if agent.alive:
+                print(f"⚠️ Agent {agent.agent_id} disconnected.")
+            self.pool.remove(agent)
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def run_step(self, ttp, dry_run, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Runs one TTP on a compatible agent, retrying on others if agents disconnect.
+
+        Returns (ok, event, agent). event is None if the step never produced a result: agent is
+        then None if no compatible agent was available, or the last agent tried if every attempt
+        ended with that agent disconnecting.
+        """
+        platforms = normalize_platforms(ttp)
+        tried = []
+        for _ in range(max_attempts):
+            task = {"type": "task", "task_id": f"t{next(self._task_ids)}", "ttp": ttp, "dry_run": dry_run}
+            agent, future = self.pool.dispatch(platforms, task, exclude=tried)
+            if agent is None:
+                break
+            try:
+                result = future.result()
+            except AgentDisconnected:
+                tried.append(agent)
+                print(f"🔁 Requeueing {ttp.get('id', 'N/A')}: agent {agent.agent_id} disconnected.")
+                continue
+            return bool(result.get("ok")), result.get("event"), agent
+        return False, None, (tried[-1] if tried else None)
+
+    def close(self):
+        for agent in self.pool.agents():
+            try:
+                agent.send({"type": "bye"})
+            except OSError:
+                pass
+        if self._server is not None:
+            self._server.close()
+
+
+def build_controller_plan(args, agent_oses, log_filename):
+    """Random picks (compatible with any connected agent) or a scenario's resolved steps."""
+    if args.ttp_set.startswith("scenario:"):
+        scenario_name = args.ttp_set.split(":", 1)[1]
+        print(f"🚀 Running Scenario: {scenario_name}")
+        compiled_scenarios = load_compiled_scenarios(args.scenario_file, args.base_library, threat_bot.load_ttps)
+        scenario = compiled_scenarios.get(scenario_name)
+        if scenario is None:
+            raise ValueError(f"Scenario '{scenario_name}' not found in {args.scenario_file}")
+        if scenario.error:
+            raise ValueError(f"Scenario '{scenario_name}' in {args.scenario_file} is invalid: {scenario.error}")
+        for ttp_id in scenario.missing:
+            warning_msg = f"⚠️ Warning: TTP ID '{ttp_id}' from scenario '{scenario_name}' not found in base library '{args.base_library}'. Skipping step."
+            print(warning_msg)
+            threat_bot.log_to_file(log_filename, warning_msg)
+        # Platform checks happen per agent at dispatch time
+        return prune_plan(scenario.steps, {step.key for step in scenario.steps if step.ttp is not None})
+
+    print(f"📖 Loading TTPs from: {args.ttp_set}")
+    library = CompiledLibrary(threat_bot.load_ttps(args.ttp_set))
+    runnable = {}
+    for agent_os in agent_oses:
+        for compiled in library.compatible(agent_os):
+            runnable[compiled.position] = compiled
+    candidates = [runnable[p] for p in sorted(runnable)]
+    print(f"✅ Found {len(candidates)} TTPs runnable on the connected agents ({', '.join(sorted(agent_oses))}) out of {len(library)} total.")
+    picks = random.sample(candidates, min(args.iterations, len(candidates)))
+    return build_independent_plan([compiled.ttp for compiled in picks])
+
+
+def run_controller(args):
+    if not args.token:
+        print(f"❌ Error: A shared token is required (--token or ${TOKEN_ENV}); agents only accept an authenticated controller.")
+        return 1
+    controller = Controller(args.listen, args.token)
+    controller.start()
+
+    Path(args.log_dir).mkdir(parents=True, exist_ok=True)
+    base_log_filename = os.path.join(args.log_dir, f"controller_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    log_filename = f"{base_log_filename}.log"
+    execution_log_path = os.path.join(args.log_dir, EXECUTION_LOG_JOURNAL)
+    run_id = os.path.basename(base_log_filename)
+    print(f"📝 Logging controller details to: {log_filename}")
+    print(f"📊 Structured execution log: {execution_log_path}")
+
+    print(f"⏳ Waiting up to {args.agent_wait}s for {args.min_agents} agent(s)...")
+    connected = controller.pool.wait_for_agents(args.min_agents, args.agent_wait)
+    if connected == 0:
+        print("❌ No agents connected. Exiting.")
+        controller.close()
+        return 1
+    if connected < args.min_agents:
+        print(f"⚠️ Only {connected} of {args.min_agents} agents connected; continuing.")
+
+    try:
+        plan = build_controller_plan(args, {a.os for a in controller.pool.agents()}, log_filename)
+    except (ValueError, OSError) as e:
+        print(f"❌ Error: {e}")
+        controller.close()
+        return 1
+
+    if not plan:
+        print("🚫 No TTPs selected or found to execute.")
+    else:
+        print(f"\n--- Starting Distributed Emulation ({len(plan)} TTPs across {connected} agent(s)) ---")
+
+        def run_step(step, position):
+            ttp = step.ttp
+            ttp_id = ttp.get("id", "N/A")
+            print(f"📤 Step {position}/{len(plan)}: {ttp_id} - {ttp.get('name', 'N/A')}")
+            ok, event, agent = controller.run_step(ttp, args.dry_run, args.max_attempts)
+            if event is None:
+                status = "Skipped (No Compatible Agent)" if agent is None else "Failed (Agent Disconnected)"
+                event = {
+                    "timestamp": datetime.now().isoformat(),
+                    "status": status,
+                    "id": ttp_id,
+                    "name": ttp.get("name", "N/A"),
+                    "command": ttp.get("command", ""),
+                    "dry_run": args.dry_run,
+                    "platform": ttp.get("platform", "N/A"),
+                    "output": None,
+                    "error": None,
+                    "exit_code": None,
+                }
+                if agent is not None:
+                    event.update(agent_id=agent.agent_id, agent_host=agent.hostname)  # Last agent it was tried on
+            else:
+                event = dict(event, agent_id=agent.agent_id, agent_host=agent.hostname)
+            event["run_id"] = run_id  # One run in the controller's journal, whichever agent ran it
+            threat_bot.log_structured_event(event, execution_log_path)
+            where = f"on {agent.agent_id}" if agent else "nowhere"
+            message = f"[{datetime.now().isoformat()}] TTP: {ttp_id} - {event['status']} ({where})"
+            print(f"   -> {event['status']} ({where})")
+            threat_bot.log_to_file(log_filename, message)
+            return ok
+
+        # Every connected agent slot can be busy at once; dependencies still order scenario steps
+        workers = max(1, sum(a.capacity for a in controller.pool.agents()))
+        run_plan(plan, run_step, workers)
+
+    controller.close()
+    get_run_logger().close_files(base_log_filename)
+    mark_run_closed(base_log_filename)  # Lets log rotation compress this run from now on
+    print("\n--- Distributed Emulation Finished ---")
+    return 0
+
+
+# --- Agent ---
+
+def _agent_handshake(reader, writer, send_lock, token, hello):
+    """Authenticates the controller and answers its challenge. Returns the session key."""
+    agent_nonce = secrets.token_hex(16)
+    _send(writer, send_lock, dict(hello, nonce=agent_nonce))
+    challenge = json.loads(reader.readline() or "{}")
+    if challenge.get("type") == "error":
+        raise AuthenticationError(f"controller rejected agent: {challenge.get('message')}")
+    controller_nonce = str(challenge.get("nonce", ""))
+    expected = _proof(token, "controller", agent_nonce, controller_nonce)
+    if (challenge.get("type") != "challenge" or not controller_nonce
+            or not hmac.compare_digest(str(challenge.get("proof", "")), expected)):
+        raise AuthenticationError("controller failed the token challenge; refusing its tasks")
+    _send(writer, send_lock, {"type": "auth", "proof": _proof(token, "agent", controller_nonce, agent_nonce)})
+    return _session_key(token, agent_nonce, controller_nonce)
+
+
+def run_agent(args):
+    if not args.token:
+        print(f"❌ Error: A shared token is required (--token or ${TOKEN_ENV}); agents never run unauthenticated commands.")
+        return 1
+    host, port = _parse_address(args.controller)
+    agent_id = args.agent_id or f"{plat.node()}-{uuid.uuid4().hex[:4]}"
+    current_os = plat.system().lower()
+    attack_map = None if args.no_enrich else AttackEnricher(threat_bot.ATTACK_DATASET_FILE)
+    Path(args.log_dir).mkdir(parents=True, exist_ok=True)
+    base_log_filename = os.path.join(args.log_dir, f"agent_{agent_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    log_filename = f"{base_log_filename}.log"
+    execution_log_path = os.path.join(args.log_dir, EXECUTION_LOG_JOURNAL)  # Local copy of this agent's events
+
+    def close_agent_run():
+        # The agent's log spans every session until the process exits (also via SIGTERM)
+        get_run_logger().close_files(base_log_filename)
+        mark_run_closed(base_log_filename)
+    atexit.register(close_agent_run)
+
+    while True:
+        try:
+            sock = socket.create_connection((host, port), timeout=HANDSHAKE_TIMEOUT)
+        except OSError as e:
+            print(f"⚠️ Could not reach controller {host}:{port}: {e}. Retrying in {RECONNECT_INTERVAL}s.")
+            time.sleep(RECONNECT_INTERVAL)
+            continue
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        reader = sock.makefile('r', encoding='utf-8', newline='\n')
+        writer = sock.makefile('w', encoding='utf-8', newline='\n')
+        send_lock = threading.Lock()
+        finished = False
+        try:
+            try:
+                session_key = _agent_handshake(reader, writer, send_lock, args.token, {
+                    "type": "hello", "agent_id": agent_id, "os": current_os, "hostname": plat.node(),
+                    "capacity": args.capacity,
+                })
+            except AuthenticationError as e:
+                print(f"❌ {e}")
+                return 1
+            sock.settimeout(None)
+            print(f"🛰️ Agent {agent_id} ({current_os}) connected to {host}:{port}")
+
+            def run_task(task):
+                events = []
+                ok = threat_bot.execute_ttp(task["ttp"], bool(task.get("dry_run")), log_filename, attack_map,
+                                            base_log_filename, execution_log_path, on_event=events.append)
+                try:
+                    _send(writer, send_lock, {"type": "result", "task_id": task["task_id"], "ok": ok,
+                                                 "event": events[-1] if events else None})
+                except (OSError, ValueError):
+                    pass  # Controller gone; it requeues the step elsewhere
+
+            for line in reader:
+                message = json.loads(line)
+                if message.get("type") == "error":
+                    print(f"❌ Controller rejected agent: {message.get('message')}")
+                    return 1
+                if not _verify_mac(session_key, message):
+                    # Not from the controller that passed the challenge: never execute it
+                    print("⚠️ Dropping connection: received a message without a valid MAC.")
+                    break
+                if message.get("type") == "task":
+                    threading.Thread(target=run_task, args=(message,), daemon=True).start()
+                elif message.get("type") == "bye":
+                    finished = True
+                    break
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Connection to controller lost: {e}")
+        finally:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        get_run_logger().flush()
+        if finished and args.once:
+            print("👋 Campaign finished; exiting (--once).")
+            return 0
+        print(f"🔌 Disconnected from controller; reconnecting in {RECONNECT_INTERVAL}s.")
+        time.sleep(RECONNECT_INTERVAL)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed threat emulation: controller and agents")
+    subparsers = parser.add_subparsers(dest="role", required=True)
+
+    controller_parser = subparsers.add_parser("controller", help="Distribute TTPs to connected agents")
+    controller_parser.add_argument("--listen", default=f"127.0.0.1:{DEFAULT_PORT}",
+                                   help="Address to accept agents on (HOST:PORT)")
+    controller_parser.add_argument("--ttp-set", default="ttp_library.json",
+                                   help="Path to TTP library JSON file OR scenario identifier (e.g., 'scenario:My Scenario')")
+    controller_parser.add_argument("--iterations", type=int, default=1,
+                                   help="Number of TTPs to execute randomly (ignored if a scenario is selected)")
+    controller_parser.add_argument("--dry-run", action="store_true", help="Agents print commands instead of executing them")
+    controller_parser.add_argument("--log-dir", default=threat_bot.LOG_DIR, help="Directory for the controller's logs and journal")
+    controller_parser.add_argument("--base-library", default="ttp_library.json",
+                                   help="Base TTP library used to look up TTP definitions for scenarios")
+    controller_parser.add_argument("--scenario-file", default="attack_scenarios.json",
+                                   help="Path to the attack scenario definition file")
+    controller_parser.add_argument("--min-agents", type=int, default=1, help="Agents to wait for before starting")
+    controller_parser.add_argument("--agent-wait", type=float, default=DEFAULT_AGENT_WAIT,
+                                   help="Seconds to wait for --min-agents to connect")
+    controller_parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                                   help="Agents a step is tried on if agents disconnect mid-step")
+    controller_parser.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                                   help=f"Shared secret (required) agents and controller prove to each other (default: ${TOKEN_ENV})")
+
+    agent_parser = subparsers.add_parser("agent", help="Execute TTPs sent by a controller")
+    agent_parser.add_argument("--controller", default=f"127.0.0.1:{DEFAULT_PORT}", help="Controller address (HOST:PORT)")
+    agent_parser.add_argument("--agent-id", default=None, help="Unique agent name (default: hostname + random suffix)")
+    agent_parser.add_argument("--capacity", type=int, default=1, help="TTPs this agent runs concurrently")
+    agent_parser.add_argument("--log-dir", default=threat_bot.LOG_DIR, help="Directory for this agent's local logs")
+    agent_parser.add_argument("--no-enrich", action="store_true",
+                              help="Don't look up MITRE ATT&CK tactic/technique/URL for structured events")
+    agent_parser.add_argument("--once", action="store_true", help="Exit when the controller finishes its campaign")
+    agent_parser.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                              help=f"Shared secret (required) agents and controller prove to each other (default: ${TOKEN_ENV})")
+
+    args = parser.parse_args()
+    # Kill running commands and flush buffered logs if terminated
+    install_signal_handlers(on_terminate=kill_active_commands)
+    exit(run_controller(args) if args.role == "controller" else run_agent(args))
@@ -0,0 +1,209 @@
+# execution_engine.py
+# Scenario execution plans (dependency graphs of TTP steps) and a worker-pool runner.
+#
+# Scenario formats accepted in attack_scenarios.json:
+#   Ordered chain (original format), each step waits for the previous one:
+#       ["T1007", "T1059"]
+#   Parallel stages: a nested list runs its members concurrently, the chain continues
+#   once all of them finished:
+#       ["T1033", ["T1046", "T1018"], "T1071"]
+#   Explicit graph: steps without "depends_on" start immediately; "step" gives a step a
+#   label other steps can depend on (defaults to the TTP ID):
+#       {"steps": [{"id": "T1033", "step": "owner"},
+#                  {"id": "T1046"},
+#                  {"id": "T1071", "depends_on": ["owner", "T1046"]}]}
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class PlanStep:
+    """One TTP execution in a plan. `ttp` is filled in once the ID is resolved against a library."""
+    __slots__ = ("key", "ttp_id", "depends_on", "ttp")
+
+    def __init__(self, key, ttp_id, depends_on=(), ttp=None):
+        self.key = key
+        self.ttp_id = ttp_id
+        self.depends_on = tuple(depends_on)
+        self.ttp = ttp
+
+    def __repr__(self):
+        return f"PlanStep({self.key!r}, {self.ttp_id!r}, depends_on={list(self.depends_on)!r})"
+
+
+def _unique_key(label, used):
+    key, n = label, 2
+    while key in used:
+        key = f"{label}#{n}"  # Same TTP used twice in one scenario
+        n += 1
+    used.add(key)
+    return key
+
+
+def _chain_steps(items, used, previous=()):
+    """Builds steps for an ordered list, where nested lists are parallel stages."""
+    steps = []
+    for item in items:
+        if isinstance(item, str):
+            step = PlanStep(_unique_key(item, used), item, previous)
+            steps.append(step)
+            previous = (step.key,)
+        elif isinstance(item, list):
+            if not item or not all(isinstance(i, str) for i in item):
+                raise ValueError(f"Parallel stage must be a non-empty list of TTP IDs, got {item!r}")
+            stage = [PlanStep(_unique_key(i, used), i, previous) for i in item]
+            steps.extend(stage)
+            previous = tuple(s.key for s in stage)
+        else:
+            raise ValueError(f"Unsupported scenario step {item!r}")
+    return steps
+
+
+def _graph_steps(step_defs, used):
+    steps = []
+    for step_def in step_defs:
+        if not isinstance(step_def, dict) or not isinstance(step_def.get("id"), str):
+            raise ValueError(f"Graph steps need an 'id' string, got {step_def!r}")
+        label = step_def.get("step", step_def["id"])
+        if label in used:
+            raise ValueError(f"Duplicate step label '{label}' (set a unique 'step' name)")
+        used.add(label)
+        depends_on = step_def.get("depends_on", [])
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        steps.append(PlanStep(label, step_def["id"], depends_on))
+    return steps
+
+
+def topological_order(steps):
+    """Returns steps in an executable order (stable w.r.t. plan order); raises on unknown deps or cycles."""
+    by_key = {s.key: s for s in steps}
+    for step in steps:
+        for dep in step.depends_on:
+            if dep not in by_key:
+                raise ValueError(f"Step '{step.key}' depends on unknown step '{dep}'")
+    remaining = {s.key: len(set(s.depends_on)) for s in steps}
+    dependents = {s.key: [] for s in steps}
+    for step in steps:
+        for dep in set(step.depends_on):
+            dependents[dep].append(step.key)
+
+    position = {s.key: i for i, s in enumerate(steps)}
+    ready = sorted((k for k, n in remaining.items() if n == 0), key=position.get)
+    ordered = []
+    while ready:
+        key = ready.pop(0)
+        ordered.append(by_key[key])
+        for child in dependents[key]:
+            remaining[child] -= 1
+            if remaining[child] == 0:
+                ready.append(child)
+        ready.sort(key=position.get)
+    if len(ordered) != len(steps):
+        cyclic = [k for k, n in remaining.items() if n > 0]
+        raise ValueError(f"Dependency cycle between steps: {', '.join(cyclic)}")
+    return ordered
+
+
+def build_scenario_plan(scenario):
+    """Turns a scenario definition (any supported format) into a validated list of PlanSteps."""
+    used = set()
+    if isinstance(scenario, list):
+        steps = _chain_steps(scenario, used)
+    elif isinstance(scenario, dict) and isinstance(scenario.get("steps"), list):
+        steps = _graph_steps(scenario["steps"], used)
+    else:
+        raise ValueError("Expected a list of TTP IDs/stages or a dict with a 'steps' list")
+    topological_order(steps)  # Validate references and cycles up front
+    return steps
+
+
+def build_independent_plan(ttps):
+    """Plan for TTPs with no ordering constraints (e.g. a random selection)."""
+    used = set()
+    return [PlanStep(_unique_key(t.get("id", "N/A"), used), t.get("id", "N/A"), (), t) for t in ttps]
+
+
+def prune_plan(steps, keep_keys):
+    """Drops steps not in keep_keys, re-wiring dependents onto the dropped steps' own dependencies.
+
+    This keeps ordering intact when a scenario step is skipped (missing or incompatible TTP).
+    """
+    by_key = {s.key: s for s in steps}
+    resolved = {}
+
+    def effective_deps(key):
+        if key in keep_keys:
+            return (key,)
+        if key not in resolved:
+            deps = []
+            for dep in by_key[key].depends_on:
+                deps.extend(effective_deps(dep))
+            resolved[key] = tuple(dict.fromkeys(deps))
+        return resolved[key]
+
+    pruned = []
+    for step in steps:
+        if step.key not in keep_keys:
+            continue
+        deps = []
+        for dep in step.depends_on:
+            deps.extend(effective_deps(dep))
+        pruned.append(PlanStep(step.key, step.ttp_id, dict.fromkeys(deps), step.ttp))
+    return pruned
+
+
+def _run_step_safely(run_step, step, position):
+    # A step raising is recorded as failed and the plan goes on, whatever the worker count
+    try:
+        return run_step(step, position)
+    except Exception as e:
+        print(f"❌ Step '{step.key}' raised an exception: {e}")
+        return False
+
+
+def run_plan(steps, run_step, workers=1):
+    """Runs run_step(step, position) for every step, honoring dependencies.
+
+    With workers > 1, independent steps run concurrently on a thread pool (the work is
+    subprocess-bound, so threads are enough). At most `workers` steps are handed to the pool
+    at a time, so nothing new starts once the run is interrupted (e.g. SystemExit from SIGTERM).
+    A step that fails or raises does not block its dependents; dependencies only constrain
+    ordering, as in the original sequential loop. Returns {step.key: result}.
+    """
+    ordered = topological_order(steps)
+    position = {s.key: i + 1 for i, s in enumerate(ordered)}
+    results = {}
+
+    if workers <= 1:
+        for step in ordered:
+            results[step.key] = _run_step_safely(run_step, step, position[step.key])
+        return results
+
+    waiting = {s.key: set(s.depends_on) for s in ordered}
+    dependents = {s.key: [] for s in ordered}
+    for step in ordered:
+        for dep in waiting[step.key]:
+            dependents[dep].append(step)
+    ready = [s for s in ordered if not waiting[s.key]]
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ttp-worker")
+    try:
+        running = {}
+        while ready or running:
+            while ready and len(running) < workers:
+                step = ready.pop(0)
+                running[pool.submit(_run_step_safely, run_step, step, position[step.key])] = step
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                results[step.key] = future.result()
+                for child in dependents[step.key]:
+                    waiting[child.key].discard(step.key)
+                    if not waiting[child.key]:
+                        ready.append(child)
+            ready.sort(key=lambda s: position[s.key])
+    except BaseException:
+        # Interrupted: don't start queued steps, don't wait for running ones (their commands get killed)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+    return results
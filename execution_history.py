@@ -0,0 +1,272 @@
+# execution_history.py
+# Paged access to the execution journal (logs/execution_log.jsonl) through a sidecar offset index.
+#
+# <journal>.idx holds one fixed-size record per journal line: byte offset, length, timestamp,
+# status and TTP ID. Pages and filters are answered from the index; only the records on the
+# requested page are decoded, straight out of an mmap of the journal. The index is caught up
+# incrementally from its watermark, so steady-state cost doesn't grow with the history.
+# Filters are served from in-memory posting lists (record numbers per status category, per TTP
+# ID and per day), kept up to date from the same index: a filtered page only visits the records
+# of the most selective list instead of walking the whole history.
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from datetime import datetime
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"TEJIDX02"
+_HEADER = struct.Struct("<8sQQ")        # magic, watermark (journal bytes indexed), journal inode
+_RECORD = struct.Struct("<QId24s64s")   # offset, length, timestamp, status, TTP ID
+STATUS_FIELD_SIZE = 24
+ID_FIELD_SIZE = 64                      # Longer IDs are stored truncated and re-checked on the record
+SCAN_BATCH = 4096                       # Index records read per step when updating the posting lists
+DAY_SECONDS = 86400
+
+# Status categories offered as filters; a record matches if its status starts with the category
+STATUS_CATEGORIES = ["Success", "Failed", "DryRun", "Skipped", "Campaign"]
+
+
+def _event_timestamp(event):
+    try:
+        return datetime.fromisoformat(event.get("timestamp", "")).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _fixed(text, size):
+    return str(text or "").encode('utf-8')[:size]
+
+
+def _unfixed(raw):
+    return raw.rstrip(b"\0").decode('utf-8', errors='ignore')
+
+
+class IndexEntry:
+    __slots__ = ("offset", "length", "timestamp", "status", "ttp_id")
+
+    def __init__(self, offset, length, timestamp, status, ttp_id):
+        self.offset = offset
+        self.length = length
+        self.timestamp = timestamp
+        self.status = status
+        self.ttp_id = ttp_id
+
+
+class ExecutionHistory:
+    """Offset-indexed, paged reader over an append-only execution journal."""
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.index_path = journal_path + INDEX_SUFFIX
+        self._lock = threading.Lock()
+        self._reset_postings(None)
+
+    def _reset_postings(self, inode):
+        self._posted = 0            # Index records already in the posting lists
+        self._posted_inode = inode
+        self._by_status = {category: array('I') for category in STATUS_CATEGORIES}
+        self._by_id = {}            # TTP ID (as stored in the index) -> record numbers
+        self._by_day = {}           # Days since the epoch -> record numbers
+
+    # --- Index maintenance ---
+
+    def _read_header(self, f):
+        f.seek(0)
+        raw = f.read(_HEADER.size)
+        if len(raw) < _HEADER.size:
+            return None
+        magic, watermark, inode = _HEADER.unpack(raw)
+        return (watermark, inode) if magic == INDEX_MAGIC else None
+
+    def _reset_index(self, f, inode):
+        f.seek(0)
+        f.truncate()
+        f.write(_HEADER.pack(INDEX_MAGIC, 0, inode))
+        return 0
+
+    def refresh(self):
+        """Indexes journal lines appended since the last call. Returns the number of indexed records."""
+        with self._lock:
+            if not os.path.exists(self.journal_path):
+                return 0
+            journal_stat = os.stat(self.journal_path)
+            mode = 'r+b' if os.path.exists(self.index_path) else 'w+b'
+            with open(self.index_path, mode) as idx:
+                header = self._read_header(idx)
+                if header is None or header[1] != journal_stat.st_ino or header[0] > journal_stat.st_size:
+                    # New, foreign or compacted journal: rebuild from scratch
+                    watermark = self._reset_index(idx, journal_stat.st_ino)
+                else:
+                    watermark = header[0]
+                    self._drop_records_past(idx, watermark)
+
+                if journal_stat.st_size > watermark:
+                    watermark = self._index_from(idx, watermark, journal_stat.st_size)
+                    idx.seek(0)
+                    idx.write(_HEADER.pack(INDEX_MAGIC, watermark, journal_stat.st_ino))
+                idx.seek(0, os.SEEK_END)
+                count = (idx.tell() - _HEADER.size) // _RECORD.size
+                self._update_postings(idx, count, journal_stat.st_ino)
+                return count
+
+    def _update_postings(self, idx, count, inode):
+        """Adds index records [posted, count) to the posting lists (rebuilt if the index was)."""
+        if inode != self._posted_inode or count < self._posted:
+            self._reset_postings(inode)
+        while self._posted < count:
+            upper = min(count, self._posted + SCAN_BATCH)
+            idx.seek(_HEADER.size + self._posted * _RECORD.size)
+            raw = idx.read((upper - self._posted) * _RECORD.size)
+            for number, (_offset, _length, timestamp, status, ttp_id) in enumerate(
+                    _RECORD.iter_unpack(raw), self._posted):
+                for category, numbers in self._by_status.items():
+                    if status.startswith(category.encode('utf-8')):
+                        numbers.append(number)
+                self._by_id.setdefault(ttp_id.rstrip(b"\0"), array('I')).append(number)
+                self._by_day.setdefault(int(timestamp // DAY_SECONDS), array('I')).append(number)
+            self._posted = upper
+
+    def _drop_records_past(self, idx, watermark):
+        # Records written after the last header update (e.g. a crash mid-refresh) are discarded
+        idx.seek(0, os.SEEK_END)
+        count = (idx.tell() - _HEADER.size) // _RECORD.size
+        while count > 0:
+            idx.seek(_HEADER.size + (count - 1) * _RECORD.size)
+            offset = _RECORD.unpack(idx.read(_RECORD.size))[0]
+            if offset < watermark:
+                break
+            count -= 1
+        idx.truncate(_HEADER.size + count * _RECORD.size)
+
+    def _index_from(self, idx, start, end):
+        """Indexes complete lines in journal[start:end]; returns the new watermark."""
+        idx.seek(0, os.SEEK_END)
+        position = start
+        with open(self.journal_path, 'rb') as journal:
+            journal.seek(start)
+            records = []
+            for line in journal:
+                if position + len(line) > end or not line.endswith(b"\n"):
+                    break  # Partial line still being written
+                stripped = line.strip()
+                if stripped:
+                    try:
+                        event = json.loads(stripped)
+                    except json.JSONDecodeError:
+                        event = None  # Torn/corrupt line: not indexed
+                    if isinstance(event, dict):
+                        records.append(_RECORD.pack(
+                            position, len(line.rstrip(b"\r\n")), _event_timestamp(event),
+                            _fixed(event.get("status"), STATUS_FIELD_SIZE),
+                            _fixed(event.get("id"), ID_FIELD_SIZE)))
+                        if len(records) >= SCAN_BATCH:
+                            idx.write(b"".join(records))
+                            records = []
+                position += len(line)
+            idx.write(b"".join(records))
+        return position
+
+    # --- Queries ---
+
+    def _candidates(self, count, status, id_raw, since, until):
+        """Record numbers that may match the filters, newest first, from the smallest posting list."""
+        with self._lock:
+            sources = []  # (size, newest-first iterator factory)
+            if status in self._by_status:
+                by_status = self._by_status[status]
+                sources.append((len(by_status), lambda: reversed(by_status)))
+            if id_raw is not None:
+                by_id = self._by_id.get(id_raw, array('I'))
+                sources.append((len(by_id), lambda: reversed(by_id)))
+            if since is not None or until is not None:
+                first = int(since // DAY_SECONDS) if since is not None else None
+                last = int(until // DAY_SECONDS) if until is not None else None
+                days = [numbers for day, numbers in self._by_day.items()
+                        if (first is None or day >= first) and (last is None or day <= last)]
+                sources.append((sum(len(numbers) for numbers in days),
+                                lambda: heapq.merge(*(reversed(numbers) for numbers in days), reverse=True)))
+        if not sources:
+            return reversed(range(count))  # A status outside STATUS_CATEGORIES: scan everything
+        numbers = min(sources, key=lambda source: source[0])[1]()
+        # Lists may have grown since refresh(); records past `count` belong to the next query
+        return (number for number in numbers if number < count)
+
+    def page(self, page=1, page_size=10, status=None, ttp_id=None, since=None, until=None):
+        """Returns (events, total, has_next) for one page, newest first.
+
+        status: a category from STATUS_CATEGORIES (prefix match); ttp_id: exact TTP ID;
+        since/until: epoch seconds. `total` is only known without filters (None otherwise),
+        since counting filtered matches would mean scanning the whole index.
+        """
+        count = self.refresh()
+        if count == 0:
+            return [], 0, False
+        filtered = any(v is not None for v in (status, ttp_id, since, until))
+        skip = (max(1, page) - 1) * page_size
+        status_raw = status.encode('utf-8') if status else None
+        id_raw = _fixed(ttp_id, ID_FIELD_SIZE) if ttp_id else None
+
+        selected = []
+        has_next = False
+        with open(self.index_path, 'rb') as idx_file, \
+                mmap.mmap(idx_file.fileno(), 0, access=mmap.ACCESS_READ) as mm_index:
+            if not filtered:
+                # Direct positional access: newest record is the last one in the index
+                upper = max(0, count - skip)
+                lower = max(0, upper - page_size)
+                has_next = lower > 0
+                start = _HEADER.size + lower * _RECORD.size
+                raw = mm_index[start:_HEADER.size + upper * _RECORD.size]
+                selected = [IndexEntry(*r) for r in _RECORD.iter_unpack(raw)][::-1]
+            else:
+                matched = 0
+                # The stored ID may be a truncated prefix of a longer one: confirm on the record
+                check_id = id_raw is not None and len(id_raw) >= ID_FIELD_SIZE
+                for number in self._candidates(count, status, id_raw, since, until):
+                    entry = IndexEntry(*_RECORD.unpack_from(mm_index, _HEADER.size + number * _RECORD.size))
+                    if since is not None and entry.timestamp < since:
+                        continue
+                    if until is not None and entry.timestamp > until:
+                        continue
+                    if status_raw is not None and not entry.status.startswith(status_raw):
+                        continue
+                    if id_raw is not None and entry.ttp_id.rstrip(b"\0") != id_raw:
+                        continue
+                    if check_id and [str(e.get("id")) for e in self._decode([entry])] != [str(ttp_id)]:
+                        continue
+                    matched += 1
+                    if matched > skip + page_size:
+                        has_next = True
+                        break
+                    if matched > skip:
+                        selected.append(entry)
+
+        return self._decode(selected), (None if filtered else count), has_next
+
+    def _decode(self, entries):
+        if not entries:
+            return []
+        events = []
+        with open(self.journal_path, 'rb') as journal, \
+                mmap.mmap(journal.fileno(), 0, access=mmap.ACCESS_READ) as mm_journal:
+            for entry in entries:
+                try:
+                    events.append(json.loads(mm_journal[entry.offset:entry.offset + entry.length]))
+                except (json.JSONDecodeError, ValueError):
+                    continue
+        return events
+
+    def latest(self, n=10):
+        return self.page(1, n)[0]
+
+
+def remove_index(journal_path):
+    """Deletes the sidecar index (it is rebuilt on the next read)."""
+    try:
+        os.remove(journal_path + INDEX_SUFFIX)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,248 @@
+# execution_store.py
+# Optional embedded SQLite store for structured execution events.
+# Events are inserted in batches into a WAL-mode database with indexes on the columns the
+# dashboard filters by, so questions like "which techniques failed on Linux last week" are
+# answered by an index lookup instead of a scan over the whole journal.
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from journal import EXECUTION_LOG_JOURNAL, read_events
+
+EXECUTION_STORE_DB = "executions.db"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    rowid INTEGER PRIMARY KEY,
+    event_hash TEXT NOT NULL UNIQUE,
+    timestamp TEXT,
+    ts REAL,
+    run_id TEXT,
+    ttp_id TEXT,
+    name TEXT,
+    status TEXT,
+    status_category TEXT,
+    platform TEXT,
+    host_os TEXT,
+    dry_run INTEGER,
+    exit_code INTEGER,
+    duration_seconds REAL,
+    mitre_tactic TEXT,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_executions_ts ON executions (ts);
+CREATE INDEX IF NOT EXISTS idx_executions_ttp_id ON executions (ttp_id, ts);
+CREATE INDEX IF NOT EXISTS idx_executions_status ON executions (status_category, ts);
+CREATE INDEX IF NOT EXISTS idx_executions_platform ON executions (platform, ts);
+CREATE INDEX IF NOT EXISTS idx_executions_host_os ON executions (host_os, status_category, ts);
+CREATE INDEX IF NOT EXISTS idx_executions_run_id ON executions (run_id);
+"""
+
+_INSERT = """
+INSERT OR IGNORE INTO executions (
+    event_hash, timestamp, ts, run_id, ttp_id, name, status, status_category, platform,
+    host_os, dry_run, exit_code, duration_seconds, mitre_tactic, event
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def status_category(status):
+    """'Failed (Code: 1)' -> 'Failed', 'Skipped (Platform)' -> 'Skipped'."""
+    return (status or "Unknown").split(" (", 1)[0]
+
+
+def _row(event):
+    payload = json.dumps(event, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    try:
+        ts = datetime.fromisoformat(event.get("timestamp", "")).timestamp()
+    except (TypeError, ValueError):
+        ts = None
+    return (
+        # Content hash makes re-imports and live + imported duplicates idempotent
+        hashlib.sha1(payload.encode('utf-8')).hexdigest(),
+        event.get("timestamp"),
+        ts,
+        event.get("run_id"),
+        event.get("id"),
+        event.get("name"),
+        event.get("status"),
+        status_category(event.get("status")),
+        event.get("platform"),
+        event.get("host_os"),
+        None if event.get("dry_run") is None else int(bool(event.get("dry_run"))),
+        event.get("exit_code"),
+        event.get("duration_seconds"),
+        event.get("mitre_tactic"),
+        payload,
+    )
+
+
+class ExecutionStore:
+    """Batched writer and query API over the SQLite execution store. Thread-safe."""
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")    # Readers (dashboard) don't block the bot
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, far fewer fsyncs
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    # --- Writes ---
+
+    def add(self, event):
+        """Queues one event; the batch is written once full or after flush_interval seconds."""
+        with self._lock:
+            self._pending.append(_row(event))
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush()
+
+    def _flush(self):
+        if self._pending:
+            with self._conn:  # One transaction per batch
+                self._conn.executemany(_INSERT, self._pending)
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def import_events(self, events):
+        """Bulk-inserts events (duplicates are ignored). Returns the number of new rows."""
+        with self._lock:
+            self._flush()
+            before = self._conn.total_changes
+            batch = []
+            for event in events:
+                if isinstance(event, dict):
+                    batch.append(_row(event))
+                if len(batch) >= 5000:
+                    with self._conn:
+                        self._conn.executemany(_INSERT, batch)
+                    batch = []
+            with self._conn:
+                self._conn.executemany(_INSERT, batch)
+            return self._conn.total_changes - before
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._conn.close()
+
+    # --- Queries ---
+
+    def query(self, status=None, ttp_id=None, platform=None, host_os=None, run_id=None,
+              since=None, until=None, limit=100, offset=0):
+        """Returns matching events newest first. status is a category ('Success', 'Failed', ...)."""
+        clauses, params = [], []
+        for column, value in (("status_category", status), ("ttp_id", ttp_id), ("platform", platform),
+                              ("host_os", host_os), ("run_id", run_id)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT event FROM executions {where} ORDER BY ts DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params + [limit, offset]).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def technique_summary(self, status="Failed", host_os=None, since=None, until=None, limit=100):
+        """Per-technique counts for one status category, e.g. failures on Linux in the last week."""
+        clauses, params = ["status_category = ?"], [status]
+        if host_os is not None:
+            clauses.append("host_os = ?")
+            params.append(host_os)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+        sql = f"""
+            SELECT ttp_id, MAX(name), COUNT(*), MAX(timestamp)
+            FROM executions WHERE {' AND '.join(clauses)}
+            GROUP BY ttp_id ORDER BY COUNT(*) DESC, ttp_id LIMIT ?
+        """
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [{"id": r[0], "name": r[1], "count": r[2], "last_seen": r[3]} for r in rows]
+
+    def host_os_values(self):
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT DISTINCT host_os FROM executions WHERE host_os IS NOT NULL ORDER BY host_os").fetchall()
+        return [r[0] for r in rows]
+
+
+# --- Process-wide store registry (one connection per database file) ---
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_execution_store(path):
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = ExecutionStore(path)
+            _stores[key] = store
+        return store
+
+
+def close_all_stores():
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+atexit.register(close_all_stores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite execution store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser(
+        "import", help="Import execution_log.json (legacy list) or execution_log.jsonl files")
+    import_parser.add_argument("logs", nargs="*", default=[os.path.join("logs", EXECUTION_LOG_JOURNAL)])
+    import_parser.add_argument("--db", default=os.path.join("logs", EXECUTION_STORE_DB))
+
+    args = parser.parse_args()
+    if args.command == "import":
+        store = get_execution_store(args.db)
+        for log_path in args.logs:
+            if not os.path.exists(log_path):
+                print(f"❌ Error: {log_path} not found.")
+                continue
+            try:
+                added = store.import_events(read_events(log_path))
+            except json.JSONDecodeError:
+                print(f"❌ Error: Could not decode JSON from {log_path}")
+                continue
+            print(f"📥 Imported {added} new executions from {log_path} into {args.db}")
@@ -0,0 +1,236 @@
+# journal.py
+# Append-only, newline-delimited JSON (JSONL) journal for structured execution events.
+# Replaces the old read-modify-write of a single JSON list in execution_log.json.
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+
+from execution_history import remove_index
+
+EXECUTION_LOG_JSON = "execution_log.json"      # Legacy JSON-list format
+EXECUTION_LOG_JOURNAL = "execution_log.jsonl"  # Append-only journal
+
+DEFAULT_FSYNC_EVERY = 20       # fsync after this many appended records...
+DEFAULT_FSYNC_INTERVAL = 2.0   # ...or after this many seconds, whichever comes first
+
+
+class ExecutionJournal:
+    """Append-only JSONL journal with batched fsync. Safe to share between threads."""
+
+    def __init__(self, path, fsync_every=DEFAULT_FSYNC_EVERY, fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._handle = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _open(self):
+        if self._handle is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._handle = open(self.path, 'a', encoding='utf-8')
+            # A crash mid-write can leave a torn last line; start on a fresh line so
+            # the next record is not glued onto it.
+            if self._handle.tell() > 0 and not _ends_with_newline(self.path):
+                self._handle.write('\n')
+        return self._handle
+
+    def append(self, event):
+        """Appends one event. The line is flushed immediately, fsync is batched.
+
+        Returns the (start, end) byte offsets the line was written at.
+        """
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            handle = self._open()
+            handle.write(line)
+            handle.flush()  # Visible to readers (dashboard) right away
+            # O_APPEND: the offset is the real end of file, even with other processes appending
+            end = os.lseek(handle.fileno(), 0, os.SEEK_CUR)
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+        return end - len(line.encode('utf-8')), end
+
+    def _sync(self):
+        if self._handle is not None and self._pending:
+            os.fsync(self._handle.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self._sync()
+                self._handle.close()
+                self._handle = None
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+# --- Process-wide journal registry ---
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal(path):
+    """Returns the shared journal for a path, opening it on first use."""
+    key = os.path.abspath(path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = ExecutionJournal(path)
+            _journals[key] = journal
+        return journal
+
+
+def close_all_journals():
+    with _journals_lock:
+        for journal in _journals.values():
+            journal.close()
+        _journals.clear()
+
+
+atexit.register(close_all_journals)
+
+
+# --- Readers ---
+
+def read_events(path):
+    """Yields events from a journal (JSONL) or a legacy JSON-list file. Corrupt lines are skipped."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '[':
+            # Legacy format: one JSON list written with indent=2
+            data = json.load(f)
+            if isinstance(data, list):
+                yield from data
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn or corrupted line, e.g. after a crash
+
+
+# --- Maintenance ---
+
+def migrate_legacy_log(legacy_path, journal_path, store_event=None):
+    """Moves records from a legacy JSON-list log into the journal.
+
+    `store_event(event)` writes one record; pass the same path live events take (blob store,
+    coverage) so migrated records look like any other. Defaults to a plain journal append.
+    The legacy file is renamed to '<name>.migrated' afterwards so it is only imported once.
+    Returns the number of migrated records.
+    """
+    if not os.path.exists(legacy_path) or os.path.getsize(legacy_path) == 0:
+        return 0
+    try:
+        with open(legacy_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError:
+        print(f"⚠️ Warning: Could not decode legacy log {legacy_path}. Leaving it untouched.")
+        return 0
+    if not isinstance(data, list):
+        print(f"⚠️ Warning: {legacy_path} does not contain a JSON list. Leaving it untouched.")
+        return 0
+
+    journal = get_journal(journal_path)
+    for event in data:
+        if store_event is not None:
+            store_event(event)
+        else:
+            journal.append(event)
+    journal.sync()
+    os.replace(legacy_path, legacy_path + ".migrated")
+    return len(data)
+
+
+def compact_journal(path, keep_last=None, transform=None):
+    """Rewrites the journal without torn/corrupt lines, optionally keeping only the newest records.
+
+    `transform`, if given, is applied to every kept record (e.g. to move outputs into blobs).
+
+    The rewrite goes through a temporary file and an atomic rename. Returns (kept, dropped).
+    """
+    if not os.path.exists(path):
+        return 0, 0
+    close_journal = _journals.get(os.path.abspath(path))
+    if close_journal is not None:
+        close_journal.close()  # Reopened lazily on the next append
+
+    total_lines = 0
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            total_lines += 1
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    if keep_last is not None:
+        events = events[-keep_last:] if keep_last > 0 else []
+
+    if transform is not None:
+        events = [transform(event) for event in events]
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    remove_index(path)  # Offsets changed; the dashboard's history index is rebuilt on demand
+    return len(events), total_lines - len(events)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Execution journal maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = subparsers.add_parser("compact", help="Drop corrupt lines and optionally old records")
+    compact_parser.add_argument("journal", nargs="?", default=os.path.join("logs", EXECUTION_LOG_JOURNAL))
+    compact_parser.add_argument("--keep-last", type=int, default=None,
+                                help="Only keep the N most recent records")
+
+    migrate_parser = subparsers.add_parser("migrate", help="Import a legacy execution_log.json list")
+    migrate_parser.add_argument("legacy", nargs="?", default=EXECUTION_LOG_JSON)
+    migrate_parser.add_argument("journal", nargs="?", default=os.path.join("logs", EXECUTION_LOG_JOURNAL))
+
+    args = parser.parse_args()
+    if args.command == "compact":
+        kept, dropped = compact_journal(args.journal, args.keep_last)
+        print(f"🧹 Compacted {args.journal}: kept {kept} records, dropped {dropped}.")
+    elif args.command == "migrate":
+        # Same treatment as live events: large outputs go to the blob store next to the journal
+        from blob_store import blob_dir_for, get_blob_store
+        blob_store = get_blob_store(blob_dir_for(args.journal))
+        count = migrate_legacy_log(args.legacy, args.journal,
+                                   lambda event: get_journal(args.journal).append(blob_store.externalize(event)))
+        print(f"📦 Migrated {count} records from {args.legacy} to {args.journal}.")
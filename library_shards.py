@@ -0,0 +1,167 @@
+# library_shards.py
+# TTP libraries split into shards: `--ttp-set` / `--base-library` may name a directory of JSON
+# library files (searched recursively) or a glob such as "libraries/*.json" instead of one big
+# ttp_library.json. Every shard has its own parse cache under .cache/shards/, keyed on the shard's
+# size and mtime, so editing one shard only reparses that shard; stale shards are parsed in
+# parallel in a process pool when there is enough to parse. The shards are merged in path order
+# into one library, and a TTP ID defined in more than one shard is reported (first one wins).
+import glob
+import hashlib
+import json
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from attack_index import CACHE_DIR, file_sha256
+from utils import file_signature
+
+SHARD_CACHE_DIR = os.path.join(CACHE_DIR, "shards")
+SHARD_CACHE_FORMAT_VERSION = 1
+SHARD_PATTERN = "*.json"
+GLOB_CHARS = "*?["
+PARALLEL_MIN_SHARDS = 2                 # Stale shards needed before a process pool is worth starting...
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024    # ...and how much JSON they must add up to
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def is_sharded_library(spec):
+    """True for a directory or glob of library shards (as opposed to a single library file)."""
+    if os.path.isfile(spec):
+        return False  # A library file whose name happens to contain glob characters
+    return os.path.isdir(spec) or any(char in spec for char in GLOB_CHARS)
+
+
+def shard_paths(spec):
+    """Shard files of a library directory or glob, sorted by path."""
+    if os.path.isdir(spec):
+        paths = glob.glob(os.path.join(glob.escape(spec), "**", SHARD_PATTERN), recursive=True)
+    else:
+        paths = glob.glob(spec, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def library_signature(spec):
+    """Cache key for a library: the file's (size, mtime), or one entry per shard for a sharded library."""
+    if not is_sharded_library(spec):
+        return file_signature(spec)
+    return tuple((path, file_signature(path)) for path in shard_paths(spec))
+
+
+def library_exists(spec):
+    return bool(shard_paths(spec)) if is_sharded_library(spec) else os.path.exists(spec)
+
+
+def library_sha256(spec):
+    """Content hash of a library file, or of all shards (names and contents) of a sharded library."""
+    if not is_sharded_library(spec):
+        return file_sha256(spec)
+    digest = hashlib.sha256()
+    for path in shard_paths(spec):
+        digest.update(path.encode('utf-8') + b"\0" + file_sha256(path).encode('ascii'))
+    return digest.hexdigest()
+
+
+def shard_cache_path(path, cache_dir=SHARD_CACHE_DIR):
+    path_key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{os.path.basename(path)}.{path_key}.pickle")
+
+
+def _read_shard_cache(path, signature):
+    try:
+        with open(shard_cache_path(path), 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if (not isinstance(cached, dict) or cached.get("version") != SHARD_CACHE_FORMAT_VERSION
+            or cached.get("signature") != signature):
+        return None
+    return cached["ttps"]
+
+
+def _write_shard_cache(path, signature, ttps):
+    cache_path = shard_cache_path(path)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"version": SHARD_CACHE_FORMAT_VERSION, "signature": signature, "ttps": ttps},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)  # Atomic: concurrent loaders never see a partial cache
+    except OSError as e:
+        print(f"⚠️ Warning: Could not write shard cache {cache_path}: {e}")
+
+
+def _parse_shard(path):
+    """Parses one shard; runs in a pool worker. Returns (ttps, error message)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        return None, f"could not decode JSON: {e}"
+    except OSError as e:
+        return None, str(e)
+    if not isinstance(data, list):
+        return None, "unexpected format, expected a JSON list"
+    return data, None
+
+
+class ShardedLibrary:
+    """Result of loading a sharded library: the merged TTPs plus what went wrong on the way."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.ttps = []
+        self.shards = []        # Shard paths, in merge order
+        self.parsed = []        # Shards that had to be (re)parsed, i.e. weren't cached
+        self.errors = []        # (shard path, message)
+        self.duplicates = []    # (TTP ID, shard that defined it first, shard whose copy was dropped)
+
+    def problems(self):
+        """Human-readable warnings for errors and duplicate IDs."""
+        messages = [f"Shard {path} skipped: {message}" for path, message in self.errors]
+        messages += [f"Duplicate TTP ID '{ttp_id}' in {duplicate} ignored "
+                     f"(already defined {'earlier in the same shard' if first == duplicate else f'in {first}'})"
+                     for ttp_id, first, duplicate in self.duplicates]
+        return messages
+
+
+def load_library_shards(spec, workers=DEFAULT_WORKERS):
+    """Loads and merges every shard of a library directory/glob, reparsing only changed shards."""
+    library = ShardedLibrary(spec)
+    library.shards = shard_paths(spec)
+    signatures = {path: file_signature(path) for path in library.shards}
+    contents = {}
+    stale = []
+    for path in library.shards:
+        ttps = _read_shard_cache(path, signatures[path])
+        if ttps is None:
+            stale.append(path)
+        else:
+            contents[path] = ttps
+
+    stale_bytes = sum(signatures[path][0] for path in stale if signatures[path])
+    if workers > 1 and len(stale) >= PARALLEL_MIN_SHARDS and stale_bytes >= PARALLEL_MIN_BYTES:
+        with ProcessPoolExecutor(max_workers=min(workers, len(stale))) as pool:
+            results = list(pool.map(_parse_shard, stale))
+    else:
+        results = [_parse_shard(path) for path in stale]
+    for path, (ttps, error) in zip(stale, results):
+        if error is not None:
+            library.errors.append((path, error))
+            continue
+        contents[path] = ttps
+        library.parsed.append(path)
+        _write_shard_cache(path, signatures[path], ttps)
+
+    defined_in = {}
+    for path in library.shards:
+        for ttp in contents.get(path, ()):
+            ttp_id = ttp.get("id") if isinstance(ttp, dict) else None
+            if ttp_id is not None:
+                # Every repeat is dropped, whether it is in another shard or in the same one
+                if ttp_id in defined_in:
+                    library.duplicates.append((ttp_id, defined_in[ttp_id], path))
+                    continue
+                defined_in[ttp_id] = path
+            library.ttps.append(ttp)
+    return library
@@ -0,0 +1,181 @@
+# log_rotation.py
+# Keeps the logs directory bounded. Run logs (threat_bot_<ts>.log, its demo <tool>.log files and
+# the controller/agent logs of distributed.py) are
+#   - rolled over to <file>.1, <file>.2, ... by the RunLogger once a file exceeds a size limit,
+#   - gzip-compressed once their run has finished,
+#   - deleted after a retention period and/or when the directory exceeds a total size (opt-in).
+# A run counts as finished only when it left a marker: threat_bot.py's <base>.metrics.json or the
+# <base>.closed file distributed.py writes. Runs without one (still running, crashed, killed) are
+# never compressed or deleted, however old they are.
+# The journal (execution_log.jsonl + .idx), the SQLite store, latest.json and the metrics files
+# are never compressed. The dashboard reads .gz logs transparently (log_tail.py).
+#
+#   python log_rotation.py --log-dir logs --retention-days 14 --max-total-mb 500
+import argparse
+import glob
+import gzip
+import os
+import re
+import shutil
+import time
+
+DEFAULT_MAX_LOG_BYTES = 100 * 1024 * 1024   # Per-file rollover size
+DEFAULT_RETENTION_DAYS = None               # Deleting runs is opt-in (--log-retention-days / --retention-days)
+GZIP_SUFFIX = ".gz"
+
+# <run base>.<rest>, where the base ends with the run's timestamp (agent IDs may contain dots)
+RUN_FILE_RE = re.compile(r"^((?:threat_bot|controller|agent)_.*\d{8}_\d{6})\.(.+)$")
+# Text logs that may be rolled over and compressed: .log, .log.N, optionally already .gz
+LOG_FILE_RE = re.compile(r"\.log(?:\.\d+)?(?:\.gz)?$")
+FINISHED_MARKERS = (".metrics.json",        # Written by threat_bot.py when a run finishes
+                    ".closed")              # Written by mark_run_closed() for runs without metrics
+
+
+def is_log_file(name):
+    return bool(RUN_FILE_RE.match(os.path.basename(name))) and bool(LOG_FILE_RE.search(name))
+
+
+def mark_run_closed(base_log_filename):
+    """Marks a run as finished so rotation may compress (and, if enabled, expire) its logs."""
+    try:
+        with open(base_log_filename + FINISHED_MARKERS[1], 'w', encoding='utf-8'):
+            pass
+    except OSError as e:
+        print(f"⚠️ Warning: Could not mark run {base_log_filename} as closed: {e}")
+
+
+def roll_over(path):
+    """Renames a full log file to the next free <path>.N and returns the new name."""
+    n = 1
+    while os.path.exists(f"{path}.{n}") or os.path.exists(f"{path}.{n}{GZIP_SUFFIX}"):
+        n += 1
+    segment = f"{path}.{n}"
+    os.replace(path, segment)
+    return segment
+
+
+def compress_file(path):
+    """gzips `path` to `path.gz` (keeping its mtime) and removes the original. Returns the new path."""
+    gz_path = path + GZIP_SUFFIX
+    tmp_path = f"{gz_path}.{os.getpid()}.tmp"
+    try:
+        with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        shutil.copystat(path, tmp_path)  # Retention works off the original mtime
+        os.replace(tmp_path, gz_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.remove(path)
+    return gz_path
+
+
+def open_log(path):
+    """Opens a run log for reading text, decompressing .gz files on the fly."""
+    if path.endswith(GZIP_SUFFIX):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def list_runs(log_dir):
+    """Runs found in `log_dir`, newest first: [{"base", "files", "mtime", "bytes", "finished"}]."""
+    runs = {}
+    try:
+        entries = list(os.scandir(log_dir))
+    except OSError:
+        return []
+    for entry in entries:
+        match = RUN_FILE_RE.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue  # Removed while scanning
+        run = runs.setdefault(match.group(1), {"base": match.group(1), "files": [], "mtime": 0.0,
+                                               "bytes": 0, "finished": False})
+        run["files"].append(entry.path)
+        run["mtime"] = max(run["mtime"], stat.st_mtime)
+        run["bytes"] += stat.st_size
+        if entry.name.endswith(FINISHED_MARKERS):
+            run["finished"] = True
+    return sorted(runs.values(), key=lambda r: (r["mtime"], r["base"]), reverse=True)
+
+
+def run_log_files(log_dir, base):
+    """Log files of one run (plain, rolled-over and compressed), sorted by name."""
+    pattern = os.path.join(log_dir, glob.escape(base) + ".*")
+    return sorted(p for p in glob.glob(pattern) if LOG_FILE_RE.search(p))
+
+
+def _remove_run(run):
+    freed = 0
+    for path in run["files"]:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except OSError as e:
+            print(f"⚠️ Warning: Could not remove old log {path}: {e}")
+    return freed
+
+
+def rotate_logs(log_dir, keep_bases=(), retention_days=DEFAULT_RETENTION_DAYS, max_total_bytes=None, now=None):
+    """Compresses finished runs' logs and applies the retention policy (if any).
+
+    Runs in `keep_bases` (e.g. the current run) and runs without a finished marker are left
+    alone; they still count towards `max_total_bytes`. Returns a stats dict.
+    """
+    now = time.time() if now is None else now
+    stats = {"compressed": 0, "deleted_runs": 0, "freed_bytes": 0}
+    kept = []
+    unfinished_bytes = 0
+    for run in list_runs(log_dir):
+        if run["base"] in keep_bases or not run["finished"]:
+            unfinished_bytes += run["bytes"]
+            continue
+        if retention_days and now - run["mtime"] > retention_days * 86400:
+            stats["freed_bytes"] += _remove_run(run)
+            stats["deleted_runs"] += 1
+            continue
+        for i, path in enumerate(run["files"]):
+            if not is_log_file(path) or path.endswith(GZIP_SUFFIX):
+                continue
+            try:
+                before = os.path.getsize(path)
+                gz_path = compress_file(path)
+                after = os.path.getsize(gz_path)
+            except OSError as e:
+                print(f"⚠️ Warning: Could not compress log {path}: {e}")
+                continue
+            run["files"][i] = gz_path
+            run["bytes"] += after - before
+            stats["freed_bytes"] += before - after
+            stats["compressed"] += 1
+        kept.append(run)
+
+    if max_total_bytes:
+        total = unfinished_bytes + sum(run["bytes"] for run in kept)
+        for run in reversed(kept):  # Oldest first
+            if total <= max_total_bytes:
+                break
+            stats["freed_bytes"] += _remove_run(run)
+            stats["deleted_runs"] += 1
+            total -= run["bytes"]
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress finished run logs and apply the retention policy")
+    parser.add_argument("--log-dir", default="logs", help="Directory with the run logs")
+    parser.add_argument("--retention-days", type=float, default=DEFAULT_RETENTION_DAYS,
+                        help="Delete finished runs older than this many days (default: keep forever)")
+    parser.add_argument("--max-total-mb", type=float, default=0,
+                        help="Delete the oldest finished runs while run logs exceed this size (0 = no limit)")
+    args = parser.parse_args()
+
+    result = rotate_logs(args.log_dir, retention_days=args.retention_days,
+                         max_total_bytes=int(args.max_total_mb * 1024 * 1024) or None)
+    print(f"🗜️ Compressed {result['compressed']} log(s), deleted {result['deleted_runs']} run(s), "
+          f"freed {result['freed_bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,108 @@
+# log_tail.py
+# Cheap access to the end of (possibly huge) run logs, plus the "latest run" pointer that
+# threat_bot.py maintains so the dashboard doesn't have to scan the logs directory.
+# Rotated .gz logs are read transparently (they no longer change, so they are decompressed once).
+import json
+import os
+from collections import deque
+from datetime import datetime
+
+from log_rotation import GZIP_SUFFIX, open_log
+
+LATEST_RUN_POINTER = "latest.json"
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def tail_lines(path, n, block_size=TAIL_BLOCK_SIZE):
+    """Returns the last n lines of a file by reading backwards from the end in blocks."""
+    if n <= 0:
+        return []
+    if path.endswith(GZIP_SUFFIX):
+        # No seeking in gzip streams: decompress front to back, keeping only the last n lines
+        with open_log(path) as f:
+            return [line.rstrip("\r\n") for line in deque(f, maxlen=n)]
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        # n lines need n+1 newlines unless we reach the start of the file
+        while position > 0 and data.count(b"\n") <= n:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    return lines[-n:]
+
+
+class IncrementalTail:
+    """Remembers a byte offset per file so each refresh only reads newly appended bytes."""
+
+    def __init__(self, max_lines):
+        self.max_lines = max_lines
+        self._state = {}  # path -> [offset, deque of lines, partial trailing line]
+
+    def read(self, path):
+        """Returns the last max_lines lines of `path`, reading only what was appended since last time."""
+        size = os.path.getsize(path)
+        state = self._state.get(path)
+        if path.endswith(GZIP_SUFFIX):
+            # Compressed logs are immutable: read once, then serve from memory
+            if state is None or state[0] != size:
+                state = self._state[path] = [size, deque(tail_lines(path, self.max_lines)), ""]
+            return list(state[1])
+        if state is None or size < state[0]:
+            # First look at this file, or it was truncated/replaced: start from the end
+            lines = deque(tail_lines(path, self.max_lines), maxlen=self.max_lines)
+            partial = ""
+            with open(path, 'rb') as f:
+                f.seek(max(0, size - 1))
+                if size and f.read(1) != b"\n" and lines:
+                    partial = lines.pop()  # Unterminated last line may still be growing
+            self._state[path] = [size, lines, partial]
+            return list(lines) + ([partial] if partial else [])
+
+        offset, lines, partial = state
+        if size > offset:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read(size - offset)
+            text = partial + chunk.decode('utf-8', errors='replace')
+            new_lines = text.split("\n")
+            partial = new_lines.pop()
+            lines.extend(line.rstrip("\r") for line in new_lines)
+            state[0], state[2] = size, partial
+        return list(lines) + ([partial] if partial else [])
+
+    def forget_missing(self):
+        """Drops state for files that no longer exist (e.g. rotated away)."""
+        for path in [p for p in self._state if not os.path.exists(p)]:
+            del self._state[path]
+
+
+def write_latest_pointer(log_dir, base_filename, files):
+    """Atomically records the latest run's base name and log files in <log_dir>/latest.json."""
+    pointer_path = os.path.join(log_dir, LATEST_RUN_POINTER)
+    tmp_path = f"{pointer_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "base": os.path.basename(base_filename),
+                "files": [os.path.basename(p) for p in files],
+                "updated": datetime.now().isoformat(),
+            }, f)
+        os.replace(tmp_path, pointer_path)
+    except OSError as e:
+        print(f"⚠️ Warning: Could not update latest-run pointer {pointer_path}: {e}")
+
+
+def read_latest_pointer(log_dir):
+    """Returns (base_filename, [log file paths]) of the latest run, or (None, []) if unknown."""
+    pointer_path = os.path.join(log_dir, LATEST_RUN_POINTER)
+    try:
+        with open(pointer_path, 'r', encoding='utf-8') as f:
+            pointer = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None, []
+    files = [os.path.join(log_dir, name) for name in pointer.get("files", [])]
+    return pointer.get("base"), files
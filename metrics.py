@@ -0,0 +1,185 @@
+# metrics.py
+# Lightweight per-phase timing for threat_bot.py runs.
+# Code paths wrap their work in `span("phase")` (or call `record`) and the times are summed
+# per phase for the current run. At the end of a run the summary is written next to the run
+# logs as JSON (read by the dashboard) and in Prometheus text exposition format; it can also
+# be served live on a local HTTP endpoint with --metrics-port.
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_JSON_SUFFIX = ".metrics.json"
+METRICS_PROM_SUFFIX = ".metrics.prom"
+METRICS_PREFIX = "threat_bot"
+
+# Phases in the order they usually happen, for display
+PHASES = ["load", "resolve_scenario", "filter", "select", "enrich",
+          "spawn", "wait", "log", "demo_logs"]
+
+
+class RunMetrics:
+    """Per-phase count / total / max seconds for one run. Safe to share between threads."""
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.started = time.time()
+        self._start_monotonic = time.monotonic()
+        self._lock = threading.Lock()
+        self._phases = {}  # phase -> [count, total seconds, max seconds]
+        self._counters = {}
+
+    def record(self, phase, seconds):
+        with self._lock:
+            stats = self._phases.get(phase)
+            if stats is None:
+                self._phases[phase] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+
+    @contextmanager
+    def span(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def increment(self, name, labels=None, amount=1):
+        """Counts e.g. executed steps per status."""
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def summary(self):
+        with self._lock:
+            phases = {phase: {"count": c, "total_seconds": round(t, 6), "max_seconds": round(m, 6)}
+                      for phase, (c, t, m) in self._phases.items()}
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self._counters.items()]
+        order = {phase: i for i, phase in enumerate(PHASES)}
+        return {
+            "run_id": self.run_id,
+            "started": self.started,
+            "duration_seconds": round(time.monotonic() - self._start_monotonic, 6),
+            "phases": dict(sorted(phases.items(), key=lambda item: order.get(item[0], len(order)))),
+            "counters": counters,
+        }
+
+    def to_prometheus(self):
+        """The summary in Prometheus text exposition format."""
+        summary = self.summary()
+        run = _label_value(summary["run_id"] or "")
+        lines = [
+            f"# HELP {METRICS_PREFIX}_phase_seconds_total Time spent per run phase.",
+            f"# TYPE {METRICS_PREFIX}_phase_seconds_total counter",
+        ]
+        for phase, stats in summary["phases"].items():
+            lines.append(f'{METRICS_PREFIX}_phase_seconds_total{{run="{run}",phase="{_label_value(phase)}"}} {stats["total_seconds"]}')
+        lines += [
+            f"# HELP {METRICS_PREFIX}_phase_count_total Spans recorded per run phase.",
+            f"# TYPE {METRICS_PREFIX}_phase_count_total counter",
+        ]
+        for phase, stats in summary["phases"].items():
+            lines.append(f'{METRICS_PREFIX}_phase_count_total{{run="{run}",phase="{_label_value(phase)}"}} {stats["count"]}')
+        lines += [
+            f"# HELP {METRICS_PREFIX}_phase_max_seconds Longest single span per run phase.",
+            f"# TYPE {METRICS_PREFIX}_phase_max_seconds gauge",
+        ]
+        for phase, stats in summary["phases"].items():
+            lines.append(f'{METRICS_PREFIX}_phase_max_seconds{{run="{run}",phase="{_label_value(phase)}"}} {stats["max_seconds"]}')
+        for name in sorted({c["name"] for c in summary["counters"]}):
+            lines += [f"# TYPE {METRICS_PREFIX}_{name}_total counter"]
+            for counter in summary["counters"]:
+                if counter["name"] == name:
+                    labels = "".join(f',{k}="{_label_value(v)}"' for k, v in sorted(counter["labels"].items()))
+                    lines.append(f'{METRICS_PREFIX}_{name}_total{{run="{run}"{labels}}} {counter["value"]}')
+        lines += [
+            f"# HELP {METRICS_PREFIX}_run_duration_seconds Wall-clock time of the run so far.",
+            f"# TYPE {METRICS_PREFIX}_run_duration_seconds gauge",
+            f'{METRICS_PREFIX}_run_duration_seconds{{run="{run}"}} {summary["duration_seconds"]}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_files(self, base_log_filename):
+        """Writes <base>.metrics.json and <base>.metrics.prom atomically. Returns both paths."""
+        paths = []
+        for suffix, content in ((METRICS_JSON_SUFFIX, json.dumps(self.summary(), indent=2)),
+                                (METRICS_PROM_SUFFIX, self.to_prometheus())):
+            path = base_log_filename + suffix
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                paths.append(path)
+            except OSError as e:
+                print(f"⚠️ Warning: Could not write metrics file {path}: {e}")
+        return paths
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# --- Current run ---
+_current = RunMetrics()
+
+
+def start_run(run_id):
+    """Starts a fresh metrics collection for a new run and returns it."""
+    global _current
+    _current = RunMetrics(run_id)
+    return _current
+
+
+def current_metrics():
+    return _current
+
+
+def span(phase):
+    """Times a block into the current run's metrics: `with span("load"): ...`."""
+    return _current.span(phase)
+
+
+def record(phase, seconds):
+    _current.record(phase, seconds)
+
+
+def read_metrics_summary(base_log_filename):
+    """Loads <base>.metrics.json written by a run, or None if missing/unreadable."""
+    try:
+        with open(base_log_filename + METRICS_JSON_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+# --- HTTP endpoint ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = _current.to_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the console output
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serves the current run's metrics on http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
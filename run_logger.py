@@ -0,0 +1,156 @@
+# run_logger.py
+# Buffered writer for the per-run text logs (threat_bot_<ts>.log and the demo <tool>.log files).
+# Instead of open/append/close per line, lines are queued in memory and written through
+# persistent file handles by a background flush thread every `flush_interval` seconds.
+# With `max_file_bytes` set, a file that grows past it is rolled over to <file>.N and gzipped.
+import atexit
+import os
+import signal
+import sys
+import threading
+
+from log_rotation import compress_file, roll_over
+
+DEFAULT_FLUSH_INTERVAL = 0.5          # Seconds between background flushes
+MAX_BUFFERED_BYTES = 1024 * 1024      # Flush early when this much output is queued
+
+
+class RunLogger:
+    """Process-wide, thread-safe buffered log writer keeping one open handle per file."""
+
+    def __init__(self, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.max_file_bytes = None         # Roll files over past this size (None = never)
+        self._buffers = {}                 # path -> list of pending lines
+        self._buffered_bytes = 0
+        self._handles = {}                 # path -> open file
+        self._sizes = {}                   # path -> bytes in the current file (with max_file_bytes)
+        self._known_paths = set()          # Every path written to (handles open lazily on flush)
+        self._lock = threading.Lock()      # Guards _buffers (held only briefly by writers)
+        self._io_lock = threading.Lock()   # Serializes flushes so per-file order is preserved
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name="run-log-flusher", daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def write(self, path, text):
+        """Queues one line for `path`. Never touches the disk on the caller's thread."""
+        line = text + '\n'
+        with self._lock:
+            self._buffers.setdefault(path, []).append(line)
+            self._known_paths.add(path)
+            self._buffered_bytes += len(line)
+            if self._thread is None:
+                self._ensure_thread()
+            if self._buffered_bytes >= MAX_BUFFERED_BYTES:
+                self._wake.set()
+
+    def _handle(self, path):
+        handle = self._handles.get(path)
+        if handle is None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handle = open(path, 'a', encoding='utf-8')
+            self._handles[path] = handle
+            self._sizes[path] = handle.tell()
+        return handle
+
+    def _roll_over(self, path):
+        self._handles.pop(path).close()
+        self._sizes.pop(path, None)
+        try:
+            segment = roll_over(path)
+        except OSError as e:
+            print(f"❌ Error rotating log file {path}: {e}", file=sys.stderr)
+            return
+        # The segment is closed for good. Compressed here (usually on the flush thread) rather
+        # than in a daemon thread that could die at exit and leave a half-written .gz behind
+        try:
+            compress_file(segment)
+        except OSError as e:
+            print(f"⚠️ Warning: Could not compress log segment {segment}: {e}", file=sys.stderr)
+
+    def flush(self):
+        """Writes everything queued so far."""
+        with self._io_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, {}
+                self._buffered_bytes = 0
+            for path, lines in buffers.items():
+                try:
+                    handle = self._handle(path)
+                    handle.writelines(lines)
+                    handle.flush()  # Make lines visible to the dashboard's tail
+                    if self.max_file_bytes:
+                        self._sizes[path] += sum(len(line) for line in lines)
+                        if self._sizes[path] >= self.max_file_bytes:
+                            self._roll_over(path)
+                except OSError as e:
+                    print(f"❌ Error writing log file {path}: {e}", file=sys.stderr)
+
+    def close_files(self, prefix):
+        """Flushes and closes every handle whose path starts with `prefix` (e.g. a finished run)."""
+        self.flush()
+        with self._io_lock:
+            for path in [p for p in self._handles if p.startswith(prefix)]:
+                self._handles.pop(path).close()
+                self._sizes.pop(path, None)
+        with self._lock:
+            self._known_paths = {p for p in self._known_paths if not p.startswith(prefix)}
+
+    def paths_with_prefix(self, prefix):
+        """Sorted paths written to so far whose name starts with `prefix` (one run's logs)."""
+        with self._lock:
+            return sorted(p for p in self._known_paths if p.startswith(prefix))
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self.flush()
+        with self._io_lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+
+
+_run_logger = RunLogger()
+atexit.register(_run_logger.close)
+
+
+def get_run_logger():
+    return _run_logger
+
+
+def install_signal_handlers(on_terminate=None):
+    """Turns SIGTERM/SIGHUP into SystemExit so buffered log lines are flushed on the way out.
+
+    `on_terminate` is called first (e.g. to kill running commands) and must not take locks:
+    the handler runs on the main thread between bytecodes, possibly while that thread holds
+    one. The flush itself happens in the atexit hook once the stack has unwound. SIGINT
+    already raises KeyboardInterrupt. Only takes effect on the main thread and leaves
+    custom handlers installed by others alone.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def handle_termination(signum, frame):
+        if on_terminate is not None:
+            on_terminate()
+        # Exit through SystemExit so finally blocks and atexit hooks (log flush, journal fsync) still run
+        sys.exit(128 + signum)
+
+    for name in ("SIGTERM", "SIGHUP"):
+        signum = getattr(signal, name, None)
+        if signum is not None and signal.getsignal(signum) in (signal.SIG_DFL, None):
+            signal.signal(signum, handle_termination)
@@ -0,0 +1,206 @@
+# run_manager.py
+# Job registry for threat_bot.py runs launched from the dashboard.
+# Each run is started in its own process group with a progress pipe: threat_bot.py writes one
+# JSON object per line to it (see ProgressReporter) and a watcher thread folds those into the
+# job's state. The registry enforces a concurrency limit and can cancel a run's whole group.
+import json
+import os
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+DEFAULT_MAX_CONCURRENT_RUNS = 2
+DEFAULT_JOB_OUTPUT_DIR = os.path.join("logs", "jobs")
+CANCEL_GRACE_PERIOD = 10   # Seconds between SIGTERM and SIGKILL when cancelling
+MAX_FINISHED_JOBS = 50     # Finished jobs kept in the registry for display
+RECENT_STEPS = 20          # Per-job step results kept for display
+
+# Job states
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class RunLimitError(Exception):
+    """Raised when starting a run would exceed the concurrency limit."""
+
+
+class ProgressReporter:
+    """Writes progress events as JSON lines to a file descriptor (a no-op without one)."""
+
+    def __init__(self, fd=None):
+        self._lock = threading.Lock()
+        self._stream = None
+        if fd is not None:
+            try:
+                self._stream = os.fdopen(fd, 'w', encoding='utf-8', buffering=1)
+            except OSError as e:
+                print(f"⚠️ Warning: Progress reporting disabled, fd {fd} is not usable: {e}")
+
+    def emit(self, event, **fields):
+        if self._stream is None:
+            return
+        line = json.dumps({"event": event, "time": time.time(), **fields}) + "\n"
+        with self._lock:
+            try:
+                self._stream.write(line)
+            except (OSError, ValueError):
+                self._stream = None  # Reader went away; keep running without progress
+
+
+class Job:
+    """State of one launched run, updated from its progress events."""
+
+    def __init__(self, command, output_path):
+        self.job_id = uuid.uuid4().hex[:8]
+        self.command = command
+        self.output_path = output_path
+        self.started = datetime.now()
+        self.finished = None
+        self.pid = None
+        self.state = RUNNING
+        self.returncode = None
+        self.total = None         # Steps in the plan, once known
+        self.completed = 0
+        self.failed_steps = 0
+        self.current = []         # TTP IDs executing right now
+        self.steps = deque(maxlen=RECENT_STEPS)
+        self.cancel_requested = False
+        self.process = None
+
+    @property
+    def active(self):
+        return self.state == RUNNING
+
+    def apply(self, event):
+        kind = event.get("event")
+        if kind == "plan":
+            self.total = event.get("total")
+        elif kind == "step_started":
+            self.current.append(event.get("id"))
+        elif kind == "step_finished":
+            if event.get("id") in self.current:
+                self.current.remove(event.get("id"))
+            self.completed += 1
+            if not event.get("ok"):
+                self.failed_steps += 1
+            self.steps.append(event)
+
+
+class RunManager:
+    """Launches, tracks and cancels threat_bot.py runs. Safe to share between threads."""
+
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT_RUNS, output_dir=DEFAULT_JOB_OUTPUT_DIR):
+        self.max_concurrent = max_concurrent
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def start(self, command):
+        """Starts `command` (a threat_bot.py argv) with a progress pipe. Returns its Job."""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.active)
+            if running >= self.max_concurrent:
+                raise RunLimitError(f"{running} runs already active (limit {self.max_concurrent})")
+            os.makedirs(self.output_dir, exist_ok=True)
+            job = Job(list(command), None)
+            job.output_path = os.path.join(self.output_dir, f"{job.job_id}.out")
+
+            read_fd = write_fd = None
+            popen_kwargs = {}
+            if os.name == 'nt':
+                # No fd inheritance by number on Windows: the job is tracked without step progress
+                popen_kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+            else:
+                read_fd, write_fd = os.pipe()
+                popen_kwargs["pass_fds"] = (write_fd,)
+                popen_kwargs["start_new_session"] = True  # Cancel hits the bot and its commands
+                job.command += ["--progress-fd", str(write_fd)]
+            try:
+                with open(job.output_path, 'wb') as output:
+                    # Unbuffered so the console output file fills as the run progresses
+                    job.process = subprocess.Popen(job.command, stdout=output, stderr=subprocess.STDOUT,
+                                                   stdin=subprocess.DEVNULL,
+                                                   env=dict(os.environ, PYTHONUNBUFFERED="1"), **popen_kwargs)
+            except Exception:
+                if read_fd is not None:
+                    os.close(read_fd)
+                    os.close(write_fd)
+                raise
+            finally:
+                if write_fd is not None and job.process is not None:
+                    os.close(write_fd)  # Only the child keeps the write end; EOF means it exited
+            job.pid = job.process.pid
+            self._jobs[job.job_id] = job
+            self._prune_finished()
+
+        threading.Thread(target=self._watch, args=(job, read_fd),
+                         name=f"run-{job.job_id}", daemon=True).start()
+        return job
+
+    def _watch(self, job, read_fd):
+        if read_fd is not None:
+            with os.fdopen(read_fd, 'r', encoding='utf-8', errors='replace') as progress:
+                for line in progress:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    with self._lock:
+                        job.apply(event)
+        returncode = job.process.wait()
+        with self._lock:
+            job.returncode = returncode
+            job.finished = datetime.now()
+            job.current = []
+            if job.cancel_requested:
+                job.state = CANCELLED
+            else:
+                job.state = SUCCEEDED if returncode == 0 else FAILED
+
+    def cancel(self, job_id):
+        """Terminates a running job's process group (SIGKILL after a grace period)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.cancel_requested = True
+        # SIGTERM lets threat_bot.py kill its own commands and flush its logs first
+        _signal_group(job.process, signal.SIGTERM)
+        timer = threading.Timer(CANCEL_GRACE_PERIOD, self._force_kill, args=(job,))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _force_kill(self, job):
+        if job.process.poll() is None:
+            _signal_group(job.process, getattr(signal, "SIGKILL", signal.SIGTERM))
+
+    def jobs(self):
+        """All tracked jobs, newest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.started, reverse=True)
+
+    def active_jobs(self):
+        return [job for job in self.jobs() if job.active]
+
+    def _prune_finished(self):
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.started)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.job_id]
+
+
+def _signal_group(process, signum):
+    try:
+        if os.name == 'nt':
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signum)  # pid == pgid thanks to start_new_session
+    except OSError:
+        pass
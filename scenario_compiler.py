@@ -0,0 +1,155 @@
+# scenario_compiler.py
+# Compiles attack_scenarios.json against a base TTP library into ready-to-run plans.
+# Every scenario is parsed, its TTP IDs are resolved and its compatible plan is computed per
+# target OS once; the result is cached on disk keyed on both files (size/mtime, then sha256),
+# so a scenario run starts straight from the compiled plan and missing IDs are reported up front.
+import hashlib
+import json
+import os
+import pickle
+
+from attack_index import CACHE_DIR, file_sha256
+from compiled_library import CompiledLibrary, normalize_platforms, platforms_match
+from library_shards import library_exists, library_sha256, library_signature
+from execution_engine import build_scenario_plan, prune_plan
+from utils import file_signature
+
+SCENARIO_CACHE_FORMAT_VERSION = 1
+TARGET_OSES = ("windows", "linux", "darwin")  # platform.system().lower() values compiled ahead of time
+
+
+class CompiledScenario:
+    """One scenario resolved against the base library."""
+    __slots__ = ("name", "steps", "error", "missing", "plans")
+
+    def __init__(self, name, definition, library, target_oses=TARGET_OSES):
+        self.name = name
+        self.steps = []
+        self.error = None
+        self.missing = []
+        self.plans = {}
+        try:
+            # Ordered list, parallel stages or explicit dependency graph
+            self.steps = build_scenario_plan(definition)
+        except ValueError as e:
+            self.error = str(e)
+            return
+        for step in self.steps:
+            compiled = library.get(step.ttp_id)
+            if compiled is None:
+                if step.ttp_id not in self.missing:
+                    self.missing.append(step.ttp_id)
+            else:
+                step.ttp = compiled.ttp
+        for current_os in target_oses:
+            self.plans[current_os] = self._plan_for(current_os)
+
+    def _plan_for(self, current_os):
+        runnable = set()
+        incompatible = []
+        for step in self.steps:
+            if step.ttp is None:
+                continue
+            if platforms_match(normalize_platforms(step.ttp), current_os):
+                runnable.add(step.key)
+            else:
+                incompatible.append(step)
+        # Skipped steps are removed without breaking the ordering of the remaining ones
+        return prune_plan(self.steps, runnable), incompatible
+
+    def plan_for(self, current_os):
+        """Returns (plan steps, incompatible steps) for an OS, compiling it if it wasn't a target."""
+        plan = self.plans.get(current_os)
+        if plan is None:
+            plan = self.plans[current_os] = self._plan_for(current_os)
+        return plan
+
+
+class CompiledScenarios:
+    """All scenarios of a scenario file, compiled against one base library."""
+
+    def __init__(self, scenario_file, base_library, scenarios, library_size):
+        self.scenario_file = scenario_file
+        self.base_library = base_library
+        self.scenarios = scenarios  # name -> CompiledScenario, in file order
+        self.library_size = library_size
+
+    def get(self, name):
+        return self.scenarios.get(name)
+
+
+def compile_scenarios(scenario_file, base_library, load_library, target_oses=TARGET_OSES):
+    """Parses the scenario file and resolves every scenario against the base library.
+
+    `load_library(path)` returns the library's TTP list (threat_bot.load_ttps).
+    Raises FileNotFoundError / json.JSONDecodeError for the scenario file and ValueError if
+    it isn't a JSON object.
+    """
+    with open(scenario_file, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+    if not isinstance(definitions, dict):
+        raise ValueError(f"{scenario_file} is not a valid scenario format (expected dictionary)")
+    library = CompiledLibrary(load_library(base_library))
+    scenarios = {name: CompiledScenario(name, definition, library, target_oses)
+                 for name, definition in definitions.items()}
+    return CompiledScenarios(scenario_file, base_library, scenarios, len(library))
+
+
+def scenario_cache_path(scenario_file, base_library, cache_dir=CACHE_DIR):
+    """Location of the compiled plans for one (scenario file, base library) pair."""
+    pair_key = hashlib.sha1(
+        f"{os.path.abspath(scenario_file)}\0{os.path.abspath(base_library)}".encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{os.path.basename(scenario_file)}.{pair_key}.plans.pickle")
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, ImportError):
+        return None
+    if not isinstance(cached, dict) or cached.get("version") != SCENARIO_CACHE_FORMAT_VERSION:
+        return None
+    return cached
+
+
+def _write_cache(cache_path, cached):
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)  # Atomic: readers never see half-written plans
+    except OSError as e:
+        print(f"⚠️ Warning: Could not write scenario plan cache {cache_path}: {e}")
+
+
+def load_compiled_scenarios(scenario_file, base_library, load_library, cache_dir=CACHE_DIR):
+    """Compiled scenarios for a scenario file + base library, from the on-disk cache when both are unchanged."""
+    scenario_stat = file_signature(scenario_file)
+    if scenario_stat is None or not library_exists(base_library):
+        # Nothing to key the cache on; compile so a missing file or missing IDs are still reported
+        return compile_scenarios(scenario_file, base_library, load_library)
+
+    # A sharded base library (directory/glob) is keyed on every shard
+    stats = (scenario_stat, library_signature(base_library))
+    cache_path = scenario_cache_path(scenario_file, base_library, cache_dir)
+    cached = _read_cache(cache_path)
+    if cached is not None and cached["stats"] == stats:
+        return cached["compiled"]
+
+    digests = (file_sha256(scenario_file), library_sha256(base_library))
+    if cached is not None and cached["sha256"] == digests:
+        cached["stats"] = stats  # Touched but unchanged (e.g. a fresh checkout): re-stamp only
+        _write_cache(cache_path, cached)
+        return cached["compiled"]
+
+    compiled = compile_scenarios(scenario_file, base_library, load_library)
+    if compiled.library_size:
+        _write_cache(cache_path, {
+            "version": SCENARIO_CACHE_FORMAT_VERSION,
+            "stats": stats,
+            "sha256": digests,
+            "compiled": compiled,
+        })
+    return compiled
@@ -0,0 +1,132 @@
+# stix_reader.py
+# Incremental reader for STIX 2.x bundles such as attack_dataset.json.
+# Objects in the bundle's "objects" array are decoded one at a time from a small sliding
+# buffer, so peak memory scales with the objects a caller keeps, not with the whole file.
+import json
+import re
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Keys kept for attack-pattern objects unless a caller asks for something else
+ATTACK_PATTERN_FIELDS = (
+    "type", "id", "name", "description", "x_mitre_platforms", "kill_chain_phases",
+    "external_references", "revoked", "x_mitre_deprecated", "x_mitre_is_subtechnique",
+)
+
+_WHITESPACE = " \t\n\r"
+_BUNDLE_HEADER = re.compile(r'"type"\s*:\s*"bundle"')
+_decoder = json.JSONDecoder()
+
+
+class _BufferedJSONStream:
+    """Sliding text buffer over a file that decodes one JSON value at a time."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop everything already consumed so the buffer never holds more than ~one object
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed STIX bundle: expected '{char}', found '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value, reading more of the file as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue  # Value spans the chunk boundary
+                raise
+            # A bare number at the end of the buffer may be cut off mid-digit
+            if end == len(self.buf) and not isinstance(obj, (dict, list, str)) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def is_stix_bundle(filepath):
+    """Cheap check (first few KB only) whether a JSON file is a STIX bundle."""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            head = f.read(4096)
+    except (OSError, UnicodeDecodeError):
+        return False
+    return head.lstrip().startswith("{") and bool(_BUNDLE_HEADER.search(head))
+
+
+def iter_stix_objects(filepath, types=None, fields=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields objects from a STIX bundle one at a time.
+
+    types:  optional iterable of STIX types to keep (e.g. {"attack-pattern"}).
+    fields: optional iterable of keys to project each kept object onto.
+    """
+    types = frozenset(types) if types is not None else None
+    fields = tuple(fields) if fields is not None else None
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stream = _BufferedJSONStream(f, chunk_size)
+        stream.expect("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.expect(":")
+            if key == "objects":
+                stream.expect("[")
+                if stream.peek() == "]":
+                    stream.pos += 1
+                else:
+                    while True:
+                        obj = stream.value()
+                        if isinstance(obj, dict) and (types is None or obj.get("type") in types):
+                            if fields is not None:
+                                obj = {k: obj[k] for k in fields if k in obj}
+                            yield obj
+                        separator = stream.peek()
+                        stream.pos += 1
+                        if separator == "]":
+                            break
+                        if separator != ",":
+                            raise ValueError(f"Malformed STIX bundle: unexpected '{separator or 'EOF'}' in 'objects'")
+            else:
+                stream.value()  # Bundle metadata (type, id, spec_version), not needed
+            separator = stream.peek()
+            stream.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Malformed STIX bundle: unexpected '{separator or 'EOF'}'")
+
+
+def load_attack_patterns(filepath, fields=ATTACK_PATTERN_FIELDS):
+    """Returns the attack-pattern objects of a bundle, projected onto `fields` (None keeps all keys)."""
+    return list(iter_stix_objects(filepath, types=("attack-pattern",), fields=fields))
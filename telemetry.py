@@ -0,0 +1,318 @@
+# telemetry.py
+# Streaming synthetic telemetry for SIEM load testing, built on the TTPs' `expected_logs`.
+# Each expected log line is compiled once into a template: timestamps, process GUIDs, PIDs,
+# IPs and source ports become fields. Every "incident" (one TTP's full set of lines) gets fresh
+# values shared across its lines, so e.g. the ProcessGuid of a process-create event matches the
+# one in its network-connection event. Lines are generated in batches and paced to a target rate.
+#
+#   python telemetry.py --rate 20000 --duration 60 --output-dir logs/telemetry
+#   python telemetry.py --rate 50000 --duration 30 --output tcp://127.0.0.1:5140
+import argparse
+import os
+import random
+import re
+import socket
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import threat_bot
+
+DEFAULT_RATE = 1000            # Events (lines) per second; 0 = as fast as possible
+DEFAULT_DURATION = 10          # Seconds
+DEFAULT_REPORT_INTERVAL = 5    # Seconds between throughput reports
+TICK_SECONDS = 0.01            # Pacing granularity; each tick writes one batch
+MAX_BATCH = 50000              # Upper bound on lines generated per tick
+FILE_BUFFER_SIZE = 1024 * 1024
+UDP_MAX_DATAGRAM = 8192
+
+# Field patterns, applied in order. Each match becomes a template field; identical original
+# values within one TTP map to the same field, so correlated lines stay correlated.
+_GUID_RE = r"\{[0-9a-fA-Fxy]{8}-[0-9a-fA-Fxy]{4}-[0-9a-fA-Fxy]{4}-[0-9a-fA-Fxy]{4}-[0-9a-fA-Fxy]{12}\}"
+FIELD_PATTERNS = [
+    ("utc", re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}\.\d{3}Z")),
+    ("epoch", re.compile(r"\b1\d{9}\.\d{3,6}\b")),
+    ("guid", re.compile(_GUID_RE)),
+    ("pid", re.compile(r"(?<=ProcessId: )\d+|(?<=\bpid[=:])\d+|(?<=\bPID[=:] )\d+")),
+    ("sport", re.compile(r"(?<=SourcePort: )\d+|(?<=\bsrc_port[=:])\d+|(?<=\bid\.orig_p[=:])\d+")),
+    ("ip", re.compile(r"\b(?:\d{1,3}\.){3}\d{1,3}\b")),
+]
+# Per-batch fields: the same for every line of a tick
+_TIME_FIELDS = ("utc", "epoch")
+
+
+def _new_guid(rng, _original):
+    value = f"{rng.getrandbits(128):032X}"
+    return f"{{{value[:8]}-{value[8:12]}-{value[12:16]}-{value[16:20]}-{value[20:]}}}"
+
+
+def _new_pid(rng, _original):
+    return str(rng.randrange(1000, 65536, 4))  # Windows PIDs are multiples of 4
+
+
+def _new_port(rng, _original):
+    return str(rng.randint(49152, 65535))  # Ephemeral range; destination ports stay as written
+
+
+def _new_ip(rng, original):
+    # Keep the network (first three octets) so internal/external addressing still makes sense
+    return f"{original.rsplit('.', 1)[0]}.{rng.randint(1, 254)}"
+
+
+FIELD_GENERATORS = {"guid": _new_guid, "pid": _new_pid, "sport": _new_port, "ip": _new_ip}
+
+
+class TemplateSet:
+    """One TTP's expected_logs compiled into format templates plus its per-incident fields."""
+    __slots__ = ("ttp_id", "lines", "fields")
+
+    def __init__(self, ttp_id, expected_logs):
+        self.ttp_id = ttp_id
+        self.lines = []    # [(tool, format template)]
+        self.fields = []   # [(field name, generator, original value)]
+        names = {}
+        for tool, log_lines in expected_logs.items():
+            for line in log_lines or ():
+                if isinstance(line, str) and line:
+                    self.lines.append((tool, self._compile(line, names)))
+
+    def _compile(self, line, names):
+        spans = []
+        for kind, pattern in FIELD_PATTERNS:
+            for match in pattern.finditer(line):
+                start, end = match.span()
+                if any(start < s_end and s_start < end for s_start, s_end, _ in spans):
+                    continue  # Already part of an earlier field (e.g. the IP-like part of a timestamp)
+                if kind in _TIME_FIELDS:
+                    name = kind
+                else:
+                    key = (kind, match.group())
+                    name = names.get(key)
+                    if name is None:
+                        name = names[key] = f"{kind}{len(names)}"
+                        self.fields.append((name, FIELD_GENERATORS[kind], match.group()))
+                spans.append((start, end, name))
+        spans.sort()
+        parts = []
+        position = 0
+        for start, end, name in spans:
+            parts.append(_escape(line[position:start]))
+            parts.append(f"{{{name}}}")
+            position = end
+        parts.append(_escape(line[position:]))
+        return "".join(parts)
+
+    def render(self, rng, values):
+        """Lines of one incident as [(tool, line)]. `values` holds the batch's time fields."""
+        for name, generator, original in self.fields:
+            values[name] = generator(rng, original)
+        return [(tool, template.format_map(values)) for tool, template in self.lines]
+
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def compile_templates(ttps, ttp_ids=None):
+    """TemplateSets for every TTP with non-empty expected_logs (optionally only `ttp_ids`)."""
+    templates = []
+    for ttp in ttps:
+        if not isinstance(ttp, dict) or not isinstance(ttp.get("expected_logs"), dict):
+            continue
+        if ttp_ids and ttp.get("id") not in ttp_ids:
+            continue
+        template_set = TemplateSet(ttp.get("id", "N/A"), ttp["expected_logs"])
+        if template_set.lines:
+            templates.append(template_set)
+    return templates
+
+
+# --- Sinks ---
+
+class FileSink:
+    """<base>.<tool>.log per tool, like execute_ttp's demo logs, with large write buffers."""
+
+    def __init__(self, base_filename):
+        self.base_filename = base_filename
+        self._handles = {}
+
+    def write(self, tool, text):
+        handle = self._handles.get(tool)
+        if handle is None:
+            handle = self._handles[tool] = open(f"{self.base_filename}.{tool}.log", 'a',
+                                                encoding='utf-8', buffering=FILE_BUFFER_SIZE)
+        handle.write(text)
+
+    def paths(self):
+        return [handle.name for handle in self._handles.values()]
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+
+
+class SocketSink:
+    """tcp://host:port (newline-delimited stream) or udp://host:port (one datagram per line)."""
+
+    def __init__(self, url):
+        scheme, _, address = url.partition("://")
+        host, _, port = address.rpartition(":")
+        self.address = (host or "127.0.0.1", int(port))
+        self.udp = scheme == "udp"
+        if self.udp:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.sock = socket.create_connection(self.address)
+
+    def write(self, _tool, text):
+        if self.udp:
+            for line in text.splitlines():
+                self.sock.sendto(line.encode('utf-8')[:UDP_MAX_DATAGRAM], self.address)
+        else:
+            self.sock.sendall(text.encode('utf-8'))
+
+    def paths(self):
+        return [f"{'udp' if self.udp else 'tcp'}://{self.address[0]}:{self.address[1]}"]
+
+    def close(self):
+        self.sock.close()
+
+
+def open_sink(output, output_dir):
+    if output and "://" in output:
+        return SocketSink(output)
+    if output:
+        base = output
+    else:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        base = os.path.join(output_dir, f"telemetry_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    return FileSink(base)
+
+
+# --- Generator ---
+
+def _time_values(now):
+    return {
+        "utc": now.strftime("%Y-%m-%d %H:%M:%S.") + f"{now.microsecond // 1000:03d}Z",
+        "epoch": f"{now.timestamp():.5f}",
+    }
+
+
+def generate(templates, sink, rate=DEFAULT_RATE, duration=DEFAULT_DURATION,
+             report_interval=DEFAULT_REPORT_INTERVAL, seed=None, max_events=None):
+    """Writes templated lines to `sink` at `rate` lines/second for `duration` seconds.
+
+    Returns a stats dict (events, bytes, seconds, achieved rate, per-tool counts).
+    """
+    rng = random.Random(seed)
+    per_tool = {}
+    sent = 0
+    sent_bytes = 0
+    started = time.perf_counter()
+    next_report = started + report_interval if report_interval else None
+    last_report_count = 0
+
+    while True:
+        now = time.perf_counter()
+        elapsed = now - started
+        if (duration and elapsed >= duration) or (max_events and sent >= max_events):
+            break
+        due = int(rate * elapsed) - sent if rate else MAX_BATCH
+        if max_events:
+            due = min(due, max_events - sent)
+        if due <= 0:
+            time.sleep(min(TICK_SECONDS, max(0.0, (sent + 1) / rate - elapsed)))
+            continue
+        due = min(due, MAX_BATCH)
+
+        # One batch: shared timestamp values, then whole incidents until the batch is full
+        values = _time_values(datetime.now(timezone.utc))
+        prefix = f"[{datetime.now().isoformat()}] "  # Same prefix as execute_ttp's demo logs
+        batch = {}
+        generated = 0
+        while generated < due:
+            for tool, line in rng.choice(templates).render(rng, values):
+                batch.setdefault(tool, []).append(prefix + line)
+                generated += 1
+        for tool, lines in batch.items():
+            text = "\n".join(lines) + "\n"
+            sink.write(tool, text)
+            per_tool[tool] = per_tool.get(tool, 0) + len(lines)
+            sent_bytes += len(text)
+        sent += generated
+
+        if next_report is not None and now >= next_report:
+            interval_rate = (sent - last_report_count) / report_interval
+            print(f"📈 {sent:,} events in {elapsed:.1f}s ({interval_rate:,.0f}/s over the last {report_interval}s)")
+            last_report_count = sent
+            next_report += report_interval
+
+    seconds = time.perf_counter() - started
+    return {
+        "events": sent,
+        "bytes": sent_bytes,
+        "seconds": round(seconds, 3),
+        "target_rate": rate,
+        "achieved_rate": round(sent / seconds, 1) if seconds > 0 else None,
+        "per_tool": per_tool,
+    }
+
+
+def main(args):
+    try:
+        ttps = threat_bot.load_ttps(args.ttp_set)
+    except Exception as e:
+        print(f"❌ Error loading TTPs from {args.ttp_set}: {e}")
+        return 1
+    templates = compile_templates(ttps, set(args.ttp_ids) if args.ttp_ids else None)
+    if not templates:
+        print(f"❌ No TTPs with expected_logs found in {args.ttp_set}.")
+        return 1
+    field_count = sum(len(t.fields) for t in templates)
+    print(f"🧩 Compiled {sum(len(t.lines) for t in templates)} log templates from {len(templates)} TTPs "
+          f"({field_count} randomized fields).")
+
+    try:
+        sink = open_sink(args.output, args.output_dir)
+    except OSError as e:
+        print(f"❌ Could not open output {args.output or args.output_dir}: {e}")
+        return 1
+    target = f"{args.rate:,}/s" if args.rate else "unlimited rate"
+    print(f"🚀 Generating telemetry at {target} for {args.duration}s...")
+    try:
+        stats = generate(templates, sink, args.rate, args.duration, args.report_interval,
+                         args.seed, args.max_events)
+    except (KeyboardInterrupt, BrokenPipeError, ConnectionError) as e:
+        print(f"⚠️ Stopped: {e or 'interrupted'}")
+        return 1
+    finally:
+        sink.close()
+
+    print(f"✅ {stats['events']:,} events ({stats['bytes'] / 1e6:.1f} MB) in {stats['seconds']}s: "
+          f"{stats['achieved_rate']:,}/s achieved")
+    for tool, count in sorted(stats["per_tool"].items()):
+        print(f"   {tool}: {count:,}")
+    print(f"📁 Output: {', '.join(sink.paths())}")
+    if args.rate and stats["achieved_rate"] and stats["achieved_rate"] < args.rate * 0.95 and not args.max_events:
+        print(f"⚠️ Generator could not keep up with the target rate of {args.rate:,}/s.")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic telemetry generator for SIEM load testing")
+    parser.add_argument("--ttp-set", default="ttp_library.json", help="TTP library whose expected_logs are used")
+    parser.add_argument("--ttp-ids", nargs="+", help="Only use these TTP IDs")
+    parser.add_argument("--rate", type=int, default=DEFAULT_RATE, help="Target events per second (0 = unlimited)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds to generate for")
+    parser.add_argument("--max-events", type=int, default=None, help="Stop after this many events")
+    parser.add_argument("--output-dir", default=os.path.join(threat_bot.LOG_DIR, "telemetry"),
+                        help="Directory for per-tool log files (telemetry_<timestamp>.<tool>.log)")
+    parser.add_argument("--output", default=None,
+                        help="File base name (<output>.<tool>.log) or tcp://HOST:PORT / udp://HOST:PORT")
+    parser.add_argument("--report-interval", type=float, default=DEFAULT_REPORT_INTERVAL,
+                        help="Seconds between throughput reports (0 = final summary only)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible output")
+
+    args = parser.parse_args()
+    exit(main(args))
@@ -0,0 +1,79 @@
+import os
+import time
+
+from blob_store import BlobStore, blob_dir_for, collect_garbage, resolve_output
+from journal import ExecutionJournal
+
+BIG = "line of command output\n" * 200
+
+
+def make_store(tmp_path):
+    journal_path = str(tmp_path / "execution_log.jsonl")
+    return journal_path, BlobStore(blob_dir_for(journal_path))
+
+
+def test_externalize_and_resolve(tmp_path):
+    _, store = make_store(tmp_path)
+    event = {"id": "T1", "output": BIG, "error": "short"}
+    slim = store.externalize(event)
+    assert slim["output"] is None and slim["error"] == "short"
+    assert slim["output_ref"]["bytes"] == len(BIG.encode('utf-8'))
+    assert resolve_output(slim, "output", store) == BIG
+    assert resolve_output(slim, "error", store) == "short"
+    assert event["output"] == BIG  # The caller's event is left alone
+
+
+def test_identical_outputs_share_one_blob(tmp_path):
+    _, store = make_store(tmp_path)
+    first, second = store.put(BIG), store.put(BIG)
+    assert first == second
+    assert sum(len(files) for _, _, files in os.walk(store.root)) == 1
+
+
+def test_missing_blob_is_flagged(tmp_path):
+    _, store = make_store(tmp_path)
+    slim = store.externalize({"output": BIG})
+    os.remove(store._existing_path(slim["output_ref"]["sha256"]))
+    text = resolve_output(slim, "output", store)
+    assert text.startswith(BIG[:50]) and "missing" in text
+
+
+def test_put_rewrites_a_blob_deleted_behind_its_back(tmp_path):
+    _, store = make_store(tmp_path)
+    digest = store.put(BIG)["sha256"]
+    os.remove(store._existing_path(digest))
+    store.put(BIG)
+    assert store.get(digest) == BIG
+
+
+def test_collect_garbage(tmp_path):
+    journal_path, store = make_store(tmp_path)
+    journal = ExecutionJournal(journal_path)
+    slim = store.externalize({"id": "kept", "output": BIG})
+    journal.append(slim)
+    referenced = slim["output_ref"]["sha256"]
+    journal.close()
+    old_unreferenced = store.put("old " + BIG)["sha256"]
+    fresh_unreferenced = store.put("fresh " + BIG)["sha256"]
+    long_ago = time.time() - 7200
+    for digest in (old_unreferenced, referenced):
+        os.utime(store._existing_path(digest), (long_ago, long_ago))
+
+    deleted, freed = collect_garbage(journal_path, grace_seconds=3600)
+    assert deleted == 1 and freed > 0
+    assert store.get(old_unreferenced) is None
+    assert store.get(fresh_unreferenced) is not None  # Inside the grace period
+    assert store.get(referenced) == BIG
+
+
+def test_reusing_an_old_blob_protects_it_from_gc(tmp_path):
+    journal_path, store = make_store(tmp_path)
+    ExecutionJournal(journal_path).close()
+    digest = store.put(BIG)["sha256"]
+    path = store._existing_path(digest)
+    long_ago = time.time() - 7200
+    os.utime(path, (long_ago, long_ago))
+
+    store.put(BIG)  # A writer reuses the blob; its record isn't in the journal yet
+    assert collect_garbage(journal_path, grace_seconds=3600) == (0, 0)
+    assert store.get(digest) == BIG
@@ -0,0 +1,114 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from distributed import (AuthenticationError, Controller, _agent_handshake, _mac, _proof, _send,
+                         _session_key, _verify_mac)
+
+TOKEN = "s3cret"
+HELLO = {"type": "hello", "agent_id": "agent-1", "os": "linux", "hostname": "test", "capacity": 1}
+
+
+@pytest.fixture
+def controller():
+    controller = Controller("127.0.0.1:0", TOKEN)
+    controller.start()
+    yield controller
+    controller.close()
+
+
+def connect(port):
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    reader = sock.makefile('r', encoding='utf-8', newline='\n')
+    writer = sock.makefile('w', encoding='utf-8', newline='\n')
+    return sock, reader, writer, threading.Lock()
+
+
+def wait_for_agents(controller, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(controller.pool.agents()) != count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return len(controller.pool.agents())
+
+
+def test_mutual_handshake_and_signed_messages(controller):
+    sock, reader, writer, lock = connect(controller.port)
+    try:
+        key = _agent_handshake(reader, writer, lock, TOKEN, HELLO)
+        welcome = json.loads(reader.readline())
+        assert welcome["type"] == "welcome"
+        assert _verify_mac(key, welcome)
+        assert wait_for_agents(controller, 1) == 1
+    finally:
+        sock.close()
+
+
+def test_agent_with_wrong_token_rejects_the_controller(controller):
+    sock, reader, writer, lock = connect(controller.port)
+    try:
+        with pytest.raises(AuthenticationError):
+            _agent_handshake(reader, writer, lock, "wrong", HELLO)
+    finally:
+        sock.close()
+    assert wait_for_agents(controller, 0) == 0
+
+
+def test_controller_rejects_a_bad_agent_proof(controller):
+    sock, reader, writer, lock = connect(controller.port)
+    try:
+        _send(writer, lock, dict(HELLO, nonce="a" * 32))
+        challenge = json.loads(reader.readline())
+        # The controller proved the token...
+        assert challenge["proof"] == _proof(TOKEN, "controller", "a" * 32, challenge["nonce"])
+        # ...but an agent that can't prove it back (here: replaying the controller's proof) is refused
+        _send(writer, lock, {"type": "auth", "proof": challenge["proof"]})
+        reply = json.loads(reader.readline())
+        assert reply == {"type": "error", "message": "invalid token"}
+    finally:
+        sock.close()
+    assert wait_for_agents(controller, 0) == 0
+
+
+def test_token_is_never_sent(controller):
+    sock, reader, writer, lock = connect(controller.port)
+    try:
+        _send(writer, lock, dict(HELLO, nonce="b" * 32))
+        line = reader.readline()
+        assert TOKEN not in line
+    finally:
+        sock.close()
+
+
+def test_rogue_controller_without_the_token_is_refused():
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+
+    def rogue():
+        conn, _ = server.accept()
+        with conn:
+            conn.makefile('r').readline()
+            # Skips the challenge and sends a command straight away
+            conn.sendall(b'{"type":"task","task_id":1,"ttp":{"command":"id"}}\n')
+            time.sleep(0.2)
+
+    threading.Thread(target=rogue, daemon=True).start()
+    sock, reader, writer, lock = connect(port)
+    try:
+        with pytest.raises(AuthenticationError):
+            _agent_handshake(reader, writer, lock, TOKEN, HELLO)
+    finally:
+        sock.close()
+        server.close()
+
+
+def test_tampered_messages_fail_the_mac():
+    key = _session_key(TOKEN, "agent-nonce", "controller-nonce")
+    task = {"type": "task", "task_id": 3, "ttp": {"command": "whoami"}, "dry_run": True}
+    signed = dict(task, mac=_mac(key, task))
+    assert _verify_mac(key, signed)
+    assert not _verify_mac(key, dict(signed, dry_run=False))
+    assert not _verify_mac(key, task)
+    assert not _verify_mac(_session_key(TOKEN, "agent-nonce", "other"), signed)
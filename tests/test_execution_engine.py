@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from execution_engine import (PlanStep, build_independent_plan, build_scenario_plan, prune_plan,
+                              run_plan, topological_order)
+
+
+def keys(steps):
+    return [s.key for s in steps]
+
+
+def test_chain_with_parallel_stage():
+    steps = build_scenario_plan(["T1033", ["T1046", "T1018"], "T1071"])
+    deps = {s.key: set(s.depends_on) for s in steps}
+    assert deps == {"T1033": set(), "T1046": {"T1033"}, "T1018": {"T1033"}, "T1071": {"T1046", "T1018"}}
+
+
+def test_repeated_ttp_gets_unique_keys():
+    assert keys(build_scenario_plan(["T1007", "T1007", "T1007"])) == ["T1007", "T1007#2", "T1007#3"]
+
+
+def test_graph_format_with_labels():
+    steps = build_scenario_plan({"steps": [
+        {"id": "T1033", "step": "owner"},
+        {"id": "T1046"},
+        {"id": "T1071", "depends_on": ["owner", "T1046"]},
+    ]})
+    assert [s.ttp_id for s in steps] == ["T1033", "T1046", "T1071"]
+    assert steps[2].depends_on == ("owner", "T1046")
+
+
+@pytest.mark.parametrize("scenario", [
+    "T1007",
+    [["T1007", 5]],
+    [[]],
+    {"steps": [{"step": "no-id"}]},
+    {"steps": [{"id": "T1"}, {"id": "T1"}]},
+])
+def test_invalid_scenarios_are_rejected(scenario):
+    with pytest.raises(ValueError):
+        build_scenario_plan(scenario)
+
+
+def test_unknown_dependency():
+    with pytest.raises(ValueError, match="unknown step 'missing'"):
+        topological_order([PlanStep("a", "T1", ["missing"])])
+
+
+def test_dependency_cycle():
+    steps = [PlanStep("a", "T1", ["c"]), PlanStep("b", "T2", ["a"]), PlanStep("c", "T3", ["b"]),
+             PlanStep("d", "T4")]
+    with pytest.raises(ValueError, match="cycle between steps: a, b, c$"):
+        topological_order(steps)
+
+
+def test_topological_order_is_stable():
+    steps = [PlanStep("late", "T1", ["early"]), PlanStep("free", "T2"), PlanStep("early", "T3")]
+    assert keys(topological_order(steps)) == ["free", "early", "late"]
+
+
+def test_prune_plan_rewires_dependents():
+    steps = build_scenario_plan(["A", "B", "C"])
+    pruned = prune_plan(steps, {"A", "C"})
+    assert keys(pruned) == ["A", "C"]
+    assert pruned[1].depends_on == ("A",)
+
+
+def test_run_plan_sequential_order():
+    seen = []
+    results = run_plan(build_scenario_plan(["A", ["B", "C"], "D"]),
+                       lambda step, position: seen.append((position, step.key)) or True)
+    assert seen == [(1, "A"), (2, "B"), (3, "C"), (4, "D")]
+    assert results == {"A": True, "B": True, "C": True, "D": True}
+
+
+def test_run_plan_parallel_honors_dependencies():
+    finished = {}
+    lock = threading.Lock()
+
+    def run_step(step, position):
+        with lock:
+            assert all(dep in finished for dep in step.depends_on), step.key
+        time.sleep(0.01)
+        with lock:
+            finished[step.key] = time.monotonic()
+        return True
+
+    steps = build_scenario_plan({"steps": [
+        {"id": "A"}, {"id": "B"}, {"id": "C", "depends_on": ["A"]},
+        {"id": "D", "depends_on": ["B", "C"]}, {"id": "E"},
+    ]})
+    assert run_plan(steps, run_step, workers=3) == {k: True for k in "ABCDE"}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_raising_step_counts_as_failed(workers):
+    def run_step(step, position):
+        if step.key == "B":
+            raise RuntimeError("boom")
+        return True
+
+    results = run_plan(build_scenario_plan(["A", "B", "C"]), run_step, workers)
+    assert results == {"A": True, "B": False, "C": True}
+
+
+def test_run_plan_keeps_at_most_workers_in_flight():
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def run_step(step, position):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return True
+
+    run_plan(build_independent_plan([{"id": f"T{i}"} for i in range(12)]), run_step, workers=3)
+    assert peak <= 3
+
+
+def test_interrupted_run_starts_no_queued_steps():
+    started = []
+    release = threading.Event()
+
+    def run_step(step, position):
+        started.append(step.key)
+        if len(started) == 1:
+            raise KeyboardInterrupt  # Stands in for SystemExit from the SIGTERM handler
+        release.wait(1)
+        return True
+
+    # KeyboardInterrupt is a BaseException, so it escapes the worker and the runner
+    with pytest.raises(KeyboardInterrupt):
+        run_plan(build_independent_plan([{"id": f"T{i}"} for i in range(12)]), run_step, workers=3)
+    release.set()
+    assert len(started) <= 3
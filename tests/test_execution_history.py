@@ -0,0 +1,128 @@
+import json
+import random
+from datetime import datetime
+
+import pytest
+
+from execution_history import STATUS_CATEGORIES, ExecutionHistory
+from journal import ExecutionJournal, compact_journal
+
+BASE = datetime(2026, 1, 1).timestamp()
+STATUSES = ["Success", "Failed (Code: 1)", "Failed (Timeout)", "DryRun", "Skipped (Incompatible)",
+            "Campaign (Completed)"]
+LONG_PREFIX = "campaign:" + "x" * 70
+
+
+def write_journal(path, events):
+    with open(path, 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def make_events(count, seed=7):
+    rng = random.Random(seed)
+    ids = ["T1007", "T1059", "T1059.001", LONG_PREFIX + "A", LONG_PREFIX + "B"]
+    # Shuffled timestamps: remote agents and migrated records don't append in time order
+    return [{"n": n, "id": rng.choice(ids), "status": rng.choice(STATUSES),
+             "timestamp": datetime.fromtimestamp(BASE + rng.uniform(0, 20 * 86400)).isoformat()}
+            for n in range(count)]
+
+
+def expected(events, status=None, ttp_id=None, since=None, until=None):
+    matches = []
+    for event in reversed(events):
+        timestamp = datetime.fromisoformat(event["timestamp"]).timestamp()
+        if ((since is None or timestamp >= since) and (until is None or timestamp <= until)
+                and (status is None or event["status"].startswith(status))
+                and (ttp_id is None or event["id"] == ttp_id)):
+            matches.append(event["n"])
+    return matches
+
+
+@pytest.fixture
+def journal(tmp_path):
+    path = str(tmp_path / "execution_log.jsonl")
+    events = make_events(600)
+    write_journal(path, events)
+    return path, events
+
+
+def test_unfiltered_pages_newest_first(journal):
+    path, events = journal
+    history = ExecutionHistory(path)
+    page, total, has_next = history.page(2, 25)
+    assert total == len(events)
+    assert has_next
+    assert [e["n"] for e in page] == list(range(len(events) - 26, len(events) - 51, -1))
+    last_page, _, has_next = history.page(24, 25)
+    assert [e["n"] for e in last_page] == list(range(24, -1, -1))
+    assert not has_next
+
+
+@pytest.mark.parametrize("status", STATUS_CATEGORIES)
+def test_status_filter(journal, status):
+    path, events = journal
+    want = expected(events, status=status)
+    page, total, has_next = ExecutionHistory(path).page(1, 10, status=status)
+    assert total is None
+    assert [e["n"] for e in page] == want[:10]
+    assert has_next == (len(want) > 10)
+
+
+def test_since_filter_finds_out_of_order_records(journal):
+    path, events = journal
+    since = BASE + 15 * 86400
+    history = ExecutionHistory(path)
+    want = expected(events, since=since)
+    got = []
+    for number in range(1, 100):
+        page, _, has_next = history.page(number, 7, since=since)
+        got += [e["n"] for e in page]
+        if not has_next:
+            break
+    assert got == want
+
+
+def test_combined_filters_and_paging(journal):
+    path, events = journal
+    query = {"status": "Failed", "ttp_id": "T1059", "since": BASE + 2 * 86400, "until": BASE + 12 * 86400}
+    want = expected(events, **query)
+    assert want
+    page, _, _ = ExecutionHistory(path).page(2, 3, **query)
+    assert [e["n"] for e in page] == want[3:6]
+
+
+def test_long_ids_sharing_a_prefix_are_told_apart(journal):
+    path, events = journal
+    for ttp_id in (LONG_PREFIX + "A", LONG_PREFIX + "B"):
+        page, _, _ = ExecutionHistory(path).page(1, 1000, ttp_id=ttp_id)
+        assert [e["n"] for e in page] == expected(events, ttp_id=ttp_id)
+
+
+def test_unknown_id_matches_nothing(journal):
+    path, _ = journal
+    assert ExecutionHistory(path).page(1, 10, ttp_id="T0000") == ([], None, False)
+
+
+def test_appended_and_compacted_records_are_picked_up(journal):
+    path, events = journal
+    history = ExecutionHistory(path)
+    assert history.page(1, 5, ttp_id="T9999")[0] == []
+    new = {"n": len(events), "id": "T9999", "status": "Success", "timestamp": datetime.now().isoformat()}
+    write_journal(path, [new])
+    assert [e["n"] for e in history.page(1, 5, ttp_id="T9999")[0]] == [new["n"]]
+
+    compact_journal(path, keep_last=10)  # New inode: index and posting lists are rebuilt
+    page, total, _ = history.page(1, 100)
+    assert total == 10
+    assert [e["n"] for e in history.page(1, 5, ttp_id="T9999")[0]] == [new["n"]]
+
+
+def test_torn_last_line_is_not_indexed(tmp_path):
+    path = str(tmp_path / "execution_log.jsonl")
+    ExecutionJournal(path).append({"id": "T1", "status": "Success", "timestamp": datetime.now().isoformat()})
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "T2", "status": "Succ')
+    page, total, _ = ExecutionHistory(path).page(1, 10)
+    assert total == 1
+    assert [e["id"] for e in page] == ["T1"]
@@ -0,0 +1,70 @@
+import json
+import os
+
+from journal import ExecutionJournal, compact_journal, migrate_legacy_log, read_events
+
+
+def test_round_trip_offsets_and_unicode(tmp_path):
+    path = str(tmp_path / "logs" / "execution_log.jsonl")
+    journal = ExecutionJournal(path)
+    events = [{"id": "T1059", "status": "Success", "output": "naïve ✓"}, {"id": "T1007", "status": "DryRun"}]
+    offsets = [journal.append(event) for event in events]
+    journal.close()
+
+    assert list(read_events(path)) == events
+    with open(path, 'rb') as f:
+        data = f.read()
+    for event, (start, end) in zip(events, offsets):
+        assert json.loads(data[start:end]) == event
+    assert offsets[0][1] == offsets[1][0]
+
+
+def test_torn_line_is_skipped_and_not_glued_to_the_next_record(tmp_path):
+    path = str(tmp_path / "execution_log.jsonl")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"id": "T1"}\n{"id": "T2", "sta')
+    journal = ExecutionJournal(path)
+    journal.append({"id": "T3"})
+    journal.close()
+    assert [e["id"] for e in read_events(path)] == ["T1", "T3"]
+
+
+def test_legacy_json_list_is_readable(tmp_path):
+    path = str(tmp_path / "execution_log.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([{"id": "T1"}, {"id": "T2"}], f)
+    assert [e["id"] for e in read_events(path)] == ["T1", "T2"]
+
+
+def test_compact_keeps_newest_and_transforms(tmp_path):
+    path = str(tmp_path / "execution_log.jsonl")
+    journal = ExecutionJournal(path)
+    for n in range(5):
+        journal.append({"n": n})
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("not json\n")
+
+    kept, dropped = compact_journal(path, keep_last=2, transform=lambda e: dict(e, seen=True))
+    assert (kept, dropped) == (2, 4)
+    assert list(read_events(path)) == [{"n": 3, "seen": True}, {"n": 4, "seen": True}]
+
+
+def test_migrate_legacy_log_uses_store_event_once(tmp_path):
+    legacy = str(tmp_path / "execution_log.json")
+    path = str(tmp_path / "execution_log.jsonl")
+    with open(legacy, 'w', encoding='utf-8') as f:
+        json.dump([{"id": "T1"}, {"id": "T2"}], f)
+    stored = []
+    journal = ExecutionJournal(path)
+
+    def store_event(event):
+        stored.append(event["id"])
+        journal.append(dict(event, migrated=True))
+
+    assert migrate_legacy_log(legacy, path, store_event) == 2
+    journal.close()
+    assert stored == ["T1", "T2"]
+    assert [e.get("migrated") for e in read_events(path)] == [True, True]
+    assert not os.path.exists(legacy) and os.path.exists(legacy + ".migrated")
+    assert migrate_legacy_log(legacy, path) == 0
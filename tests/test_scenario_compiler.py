@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from scenario_compiler import compile_scenarios, load_compiled_scenarios
+
+LIBRARY = [
+    {"id": "T1007", "name": "Service discovery", "platform": ["windows", "linux"], "command": "x"},
+    {"id": "T1059", "name": "Command interpreter", "platform": "windows", "command": "x"},
+    {"id": "T1033", "name": "Owner discovery", "platform": ["windows", "linux", "darwin"], "command": "x"},
+]
+SCENARIOS = {
+    "Chain": ["T1007", "T1059", "T1033"],
+    "Missing": ["T1007", "T9999"],
+    "Broken": {"steps": [{"id": "T1007", "depends_on": ["nowhere"]}]},
+}
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return str(path)
+
+
+@pytest.fixture
+def files(tmp_path):
+    return (write_json(tmp_path / "attack_scenarios.json", SCENARIOS),
+            write_json(tmp_path / "ttp_library.json", LIBRARY))
+
+
+def load_library(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_scenarios_are_resolved_against_the_library(files):
+    compiled = compile_scenarios(*files, load_library)
+    assert list(compiled.scenarios) == ["Chain", "Missing", "Broken"]
+    chain = compiled.get("Chain")
+    assert chain.error is None and chain.missing == []
+    assert [s.ttp["name"] for s in chain.steps] == ["Service discovery", "Command interpreter", "Owner discovery"]
+    assert compiled.get("Missing").missing == ["T9999"]
+    assert "unknown step 'nowhere'" in compiled.get("Broken").error
+
+
+def test_incompatible_steps_are_pruned_without_breaking_order(files):
+    plan, incompatible = compile_scenarios(*files, load_library).get("Chain").plan_for("linux")
+    assert [s.key for s in plan] == ["T1007", "T1033"]
+    assert plan[1].depends_on == ("T1007",)  # Re-wired past the Windows-only T1059
+    assert [s.key for s in incompatible] == ["T1059"]
+
+
+def test_invalid_scenario_file(tmp_path, files):
+    not_a_dict = write_json(tmp_path / "list.json", ["T1007"])
+    with pytest.raises(ValueError):
+        compile_scenarios(not_a_dict, files[1], load_library)
+    with pytest.raises(FileNotFoundError):
+        load_compiled_scenarios(str(tmp_path / "nope.json"), files[1], load_library, str(tmp_path / "cache"))
+
+
+def test_cache_is_reused_until_a_file_changes(tmp_path, files):
+    scenario_file, library_file = files
+    cache_dir = str(tmp_path / "cache")
+    loads = []
+
+    def counting_load(path):
+        loads.append(path)
+        return load_library(path)
+
+    first = load_compiled_scenarios(scenario_file, library_file, counting_load, cache_dir)
+    second = load_compiled_scenarios(scenario_file, library_file, counting_load, cache_dir)
+    assert len(loads) == 1
+    assert list(second.scenarios) == list(first.scenarios)
+
+    write_json(scenario_file, {"Only": ["T1033"]})
+    assert list(load_compiled_scenarios(scenario_file, library_file, counting_load, cache_dir).scenarios) == ["Only"]
+    assert len(loads) == 2
@@ -1,45 +1,64 @@
 import json
-import random
-import subprocess
 import argparse
 import platform as plat
 import os
+import re
+import threading
+import time
 import datetime
 from pathlib import Path
 from datetime import datetime
 
-EXECUTION_LOG_JSON = "execution_log.json"
+from attack_index import AttackEnricher, load_attack_index
+from stix_reader import is_stix_bundle
+from command_runner import DEFAULT_TIMEOUT, kill_active_commands, run_command
+from execution_engine import build_independent_plan, run_plan
+from run_logger import DEFAULT_FLUSH_INTERVAL, get_run_logger, install_signal_handlers
+from log_tail import write_latest_pointer
+from log_rotation import DEFAULT_MAX_LOG_BYTES, DEFAULT_RETENTION_DAYS, rotate_logs
+from attack_coverage import get_coverage
+from blob_store import blob_dir_for, get_blob_store
+from journal import EXECUTION_LOG_JSON, EXECUTION_LOG_JOURNAL, get_journal, migrate_legacy_log
+from execution_store import EXECUTION_STORE_DB, get_execution_store
+from run_manager import ProgressReporter
+from metrics import current_metrics, record, serve_metrics, span, start_run
+from compiled_library import CompiledLibrary, normalize_platforms, platforms_match
+from scenario_compiler import TARGET_OSES, load_compiled_scenarios
+from library_shards import is_sharded_library, library_signature, load_library_shards
+from utils import file_signature
+
 ATTACK_DATASET_FILE = "attack_dataset.json" # Define constant for the filename
 
-# Function to log structured event data to a JSON file
-# Reads the whole file, appends, and writes back to ensure valid JSON list format
-def log_structured_event(event_data):
-    data = []
+# Function to log structured event data to the append-only execution journal
+# Each event is one JSON line; nothing already written is re-read or rewritten
+def log_structured_event(event_data, execution_log_path=None):
+    journal_path = execution_log_path or os.path.join(LOG_DIR, EXECUTION_LOG_JOURNAL)
+    with span("log"):
+        store_event(event_data, journal_path)
+    current_metrics().increment("events", {"status": str(event_data.get("status", "Unknown")).split(" (", 1)[0]})
+
+# Writes one record everywhere it belongs (blob store, journal, coverage, SQLite); also used
+# to import legacy records, which must not count as this run's events
+def store_event(event_data, journal_path):
     try:
-        # Try to read existing data if file exists and is not empty
-        if os.path.exists(EXECUTION_LOG_JSON) and os.path.getsize(EXECUTION_LOG_JSON) > 0:
-            with open(EXECUTION_LOG_JSON, 'r', encoding='utf-8') as f:
-                try:
-                    data = json.load(f)
-                    if not isinstance(data, list): # Ensure it's a list
-                       print(f"⚠️ Warning: {EXECUTION_LOG_JSON} does not contain a JSON list. Resetting.")
-                       data = []
-                except json.JSONDecodeError:
-                    # Handle case where file is corrupted or not valid JSON
-                    print(f"⚠️ Warning: Could not decode JSON from {EXECUTION_LOG_JSON}. Resetting.")
-                    data = [] # Start fresh if file is corrupt
-        
-        # Append the new event
-        data.append(event_data)
-
-        # Write the entire list back
-        # Ensure the logs directory exists first (should normally exist, but good practice)
-        Path(LOG_DIR).mkdir(exist_ok=True) 
-        with open(EXECUTION_LOG_JSON, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2) # Use indent for readability
-
+        # Large outputs go to the content-addressed blob store; the record keeps hash, size and preview
+        event_data = get_blob_store(blob_dir_for(journal_path)).externalize(event_data)
+    except Exception as e:
+        print(f"⚠️ Warning: Could not store output blobs for {journal_path}; keeping them inline: {e}")
+    try:
+        start, end = get_journal(journal_path).append(event_data)
+        # ATT&CK coverage summary next to the journal, updated per event instead of by rescans
+        get_coverage(journal_path).add(event_data, start, end)
     except Exception as e:
-        print(f"❌ Error logging structured event to {EXECUTION_LOG_JSON}: {e}")
+        print(f"❌ Error logging structured event to {journal_path}: {e}")
+    # Optional indexed copy in SQLite (--sqlite-store); the journal stays the source of truth
+    if execution_store is not None:
+        try:
+            execution_store.add(event_data)
+        except Exception as e:
+            print(f"❌ Error logging structured event to {execution_store.path}: {e}")
+
+execution_store = None # Set by main() when --sqlite-store is given
 
 LOG_DIR = "logs"
 
@@ -48,19 +67,27 @@ LOG_DIR = "logs"
 def load_ttps(filepath):
     """Loads TTP definitions from a JSON file, handling different formats."""
     try:
+        # A directory or glob of library shards is merged into one library
+        if is_sharded_library(filepath):
+            library = load_library_shards(filepath)
+            if not library.shards:
+                print(f"❌ Error: No library shards found at {filepath}")
+            for problem in library.problems():
+                print(f"⚠️ Warning: {problem}")
+            return library.ttps
+        # Handle specific structure of MITRE ATT&CK dataset
+        # Use the constant ATTACK_DATASET_FILE defined earlier
+        if filepath == ATTACK_DATASET_FILE or is_stix_bundle(filepath):
+            try:
+                # Attack-patterns come precompiled from the index cache
+                return load_attack_index(filepath)["attack_patterns"]
+            except ValueError as e:
+                print(f"❌ Error: {e}")
+                return []
         with open(filepath, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            # Handle specific structure of MITRE ATT&CK dataset
-            # Use the constant ATTACK_DATASET_FILE defined earlier
-            if filepath == ATTACK_DATASET_FILE: 
-                if isinstance(data, dict) and isinstance(data.get("objects"), list):
-                    # Filter for attack-patterns only
-                    return [obj for obj in data["objects"] if obj.get("type") == "attack-pattern"]
-                else:
-                    print(f"❌ Error: Unexpected format in {ATTACK_DATASET_FILE}. Expected dict with 'objects' list.")
-                    return []
             # Assume other files contain a list of TTPs directly
-            elif isinstance(data, list):
+            if isinstance(data, list):
                 return data
             else:
                  print(f"❌ Error: Unexpected format in {filepath}. Expected a JSON list.")
@@ -76,32 +103,17 @@ def load_ttps(filepath):
         print(f"❌ An unexpected error occurred loading {filepath}: {e}")
         return []
 
-def load_attack_mapping(dataset='attack_dataset.json'):
-    try:
-        with open(dataset, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        id_to_technique = {}
-        for obj in data['objects']:
-            if obj.get('type') == 'attack-pattern' and 'external_references' in obj:
-                for ref in obj['external_references']:
-                    if ref.get('source_name') == 'mitre-attack' and 'external_id' in ref:
-                        ext_id = ref['external_id']
-                        id_to_technique[ext_id] = {
-                            'name': obj.get('name'),
-                            'description': obj.get('description', ''),
-                            'tactic': obj.get('kill_chain_phases', [{}])[0].get('phase_name', 'unknown'),
-                            'url': ref.get('url', '')
-                        }
-        return id_to_technique
-
-    except Exception as e:
-        print(f"❌ Failed to load MITRE ATT&CK mapping: {e}")
-        return {}
-
+# Lines are queued and written in batches through persistent handles by the run logger
 def log_to_file(logfile, text):
-    with open(logfile, 'a', encoding='utf-8') as f:
-        f.write(text + '\n')
+    get_run_logger().write(logfile, text)
+
+def ttp_timeout(ttp):
+    """Per-TTP command timeout in seconds ("timeout" in the library), falling back to the default."""
+    timeout = ttp.get("timeout", DEFAULT_TIMEOUT)
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+        print(f"⚠️ Warning: Invalid timeout {timeout!r} for TTP {ttp.get('id', 'N/A')}. Using {DEFAULT_TIMEOUT}s.")
+        return DEFAULT_TIMEOUT
+    return timeout
 
 def os_banner():
     os_name = plat.system()
@@ -117,14 +129,39 @@ def os_banner():
     return f"OS: {os_name}, Host: {hostname}, Arch: {arch}, Ver: {version}"
 
 #the logfile will change because logfile=logfile inside main
-def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None, base_log_filename=None, execution_log_path=None): 
+def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None, base_log_filename=None, execution_log_path=None, on_event=None): 
     ttp_id = ttp.get("id", "N/A")
     ttp_name = ttp.get("name", "Unknown TTP")
     command = ttp.get("command", "")
     ttp_platform = ttp.get("platform", "N/A")
     current_os = plat.system().lower()
+    # Lets structured events be grouped per run and per host OS (e.g. in the SQLite store)
+    run_fields = {
+        "run_id": os.path.basename(base_log_filename) if base_log_filename else None,
+        "host_os": current_os,
+    }
     log_entry_prefix = f"[{datetime.now().isoformat()}] TTP: {ttp_id} ({ttp_name})"
 
+    # Structured events go to the journal; on_event also receives them (e.g. an agent reporting back)
+    def emit_event(event):
+        log_structured_event(event, execution_log_path)
+        if on_event is not None:
+            on_event(event)
+
+    # ATT&CK enrichment for the structured event; the enricher only loads the dataset
+    # if the TTP itself doesn't carry tactic/technique/url
+    if isinstance(attack_map, dict):
+        attack_map = AttackEnricher(mapping=attack_map)
+    if attack_map is not None:
+        with span("enrich"): # Includes loading the ATT&CK index on first use
+            mitre_fields = attack_map.enrich(ttp)
+    else:
+        mitre_fields = {
+            "mitre_tactic": ttp.get("mitre_tactic", "N/A"),
+            "mitre_technique": ttp.get("mitre_technique", "N/A"),
+            "mitre_url": ttp.get("mitre_url", "N/A"),
+        }
+
     print(f"\n{'='*10} Executing TTP: {ttp_id} - {ttp_name} {'='*10}")
     print(f"Command: {command}")
     print(f"Platform: {ttp_platform}")
@@ -137,7 +174,7 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
         msg = f"Skipping TTP {ttp_id}: Platform mismatch (requires '{ttp_platform}', host is '{current_os}')"
         print(f"⚠️ {msg}")
         log_to_file(logfile, f"{log_entry_prefix} - {msg}")
-        log_structured_event({
+        emit_event({
             "timestamp": datetime.now().isoformat(),
             "status": "Skipped (Platform)",
             "id": ttp_id,
@@ -148,8 +185,8 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
             "output": None,
             "error": None,
             "exit_code": None,
-            "mitre_tactic": ttp.get("mitre_tactic", "N/A"),
-            "mitre_technique": ttp.get("mitre_technique", "N/A")
+            **mitre_fields,
+            **run_fields
         })
         print("-" * 30)
         return True # Skipped is not a failure
@@ -158,7 +195,7 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
         msg = f"Skipping TTP {ttp_id}: No command defined."
         print(f"⚠️ {msg}")
         log_to_file(logfile, f"{log_entry_prefix} - {msg}")
-        log_structured_event({
+        emit_event({
             "timestamp": datetime.now().isoformat(),
             "status": "Skipped (No Command)",
             "id": ttp_id,
@@ -169,8 +206,8 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
             "output": None,
             "error": None,
             "exit_code": None,
-            "mitre_tactic": ttp.get("mitre_tactic", "N/A"),
-            "mitre_technique": ttp.get("mitre_technique", "N/A")
+            **mitre_fields,
+            **run_fields
         })
         print("-" * 30)
         return True # Skipped is not a failure
@@ -181,53 +218,48 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
     result = None # Initialize
 
     if not dry_run:
-        print(f"⚡ Executing... (~60s timeout)")
+        timeout = ttp_timeout(ttp)
+        print(f"⚡ Executing... (~{timeout:g}s timeout)")
         log_to_file(logfile, f"{log_entry_prefix} - Executing...")
+
+        # Output is streamed to the run log line by line as it arrives
+        def stream_line(stream_name, line):
+            log_to_file(logfile, f"[{datetime.now().isoformat()}] TTP: {ttp_id} [{stream_name}] {line}")
+
         try:
-            # Execute command with timeout, explicit encoding, and error handling
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                shell=True,
-                timeout=60,
-                encoding='utf-8', # Specify encoding
-                errors='ignore'   # Ignore decoding errors
-            )
-            log_to_file(logfile, f"{log_entry_prefix} - Exit Code: {result.returncode}") # Log exit code first
-
-            # Log stdout if it exists
-            if result.stdout:
-                stdout_content = result.stdout.strip()
-                if stdout_content: # Ensure stripped content is not empty
-                    log_to_file(logfile, f"{log_entry_prefix} - Stdout:\n--- Start STDOUT ---\n{stdout_content}\n--- End STDOUT ---")
-            
-            # Log stderr if it exists
-            if result.stderr:
-                stderr_content = result.stderr.strip()
-                if stderr_content: # Ensure stripped content is not empty
-                    log_to_file(logfile, f"{log_entry_prefix} - Stderr:\n--- Start STDERR ---\n{stderr_content}\n--- End STDERR ---")
-
-            # Determine final status based ONLY on return code
-            if result.returncode == 0:
-                execution_status = "Success"
-                print(f"   -> Status: ✅ {execution_status}") # Print simple status
+            # Execute command with a per-TTP timeout; only a bounded head/tail of output is kept
+            result = run_command(command, timeout=timeout, on_line=stream_line)
+            record("spawn", result.spawn_duration)
+            record("wait", result.duration - result.spawn_duration)
+            if result.truncated:
+                log_to_file(logfile, f"{log_entry_prefix} - Output truncated in structured log (stdout {result.stdout_bytes} bytes, stderr {result.stderr_bytes} bytes)")
+
+            stdout_content = result.stdout.strip() or None
+            stderr_content = result.stderr.strip() or None
+
+            if result.timed_out:
+                execution_status = "Failed (Timeout)"
+                error_msg = f"{log_entry_prefix} - Error: Command timed out after {timeout:g} seconds. Process group killed."
+                print(f"   -> Status: ❌ {execution_status}")
+                log_to_file(logfile, error_msg)
+                log_to_file(logfile, f"{log_entry_prefix} - Status: {execution_status}") # Log status on timeout too
+                # For structured log, keep whatever stderr arrived before the kill
+                stderr_content = "TimeoutExpired" + (f"\n{stderr_content}" if stderr_content else "")
             else:
-                execution_status = f"Failed (Code: {result.returncode})"
-                print(f"   -> Status: ❌ {execution_status}") # Print simple status
-                # Optionally print stderr snippet to console only on failure
-                if stderr_content:
-                    print(f"      Stderr: {stderr_content[:200]}{'...' if len(stderr_content) > 200 else ''}")
-            
-            log_to_file(logfile, f"{log_entry_prefix} - Status: {execution_status}")
-
-        except subprocess.TimeoutExpired:
-            execution_status = "Failed (Timeout)"
-            error_msg = f"{log_entry_prefix} - Error: Command timed out after 60 seconds."
-            print(f"   -> Status: ❌ {execution_status}")
-            log_to_file(logfile, error_msg)
-            log_to_file(logfile, f"{log_entry_prefix} - Status: {execution_status}") # Log status on timeout too
-            stderr_content = "TimeoutExpired" # For structured log
+                log_to_file(logfile, f"{log_entry_prefix} - Exit Code: {result.returncode}")
+
+                # Determine final status based ONLY on return code
+                if result.returncode == 0:
+                    execution_status = "Success"
+                    print(f"   -> Status: ✅ {execution_status}") # Print simple status
+                else:
+                    execution_status = f"Failed (Code: {result.returncode})"
+                    print(f"   -> Status: ❌ {execution_status}") # Print simple status
+                    # Optionally print stderr snippet to console only on failure
+                    if stderr_content:
+                        print(f"      Stderr: {stderr_content[:200]}{'...' if len(stderr_content) > 200 else ''}")
+
+                log_to_file(logfile, f"{log_entry_prefix} - Status: {execution_status}")
 
         except Exception as e:
             execution_status = "Failed (Exception)"
@@ -244,29 +276,29 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
         execution_status = "DryRun"
 
     # --- Demo Log Generation ---
+    demo_started = time.perf_counter()
     if base_log_filename and 'expected_logs' in ttp:
         print("📄 Generating demo logs...")
         log_to_file(logfile, f"{log_entry_prefix} - Generating demo logs.")
         for tool, log_lines in ttp['expected_logs'].items():
             if log_lines: # Only create/log if there are expected lines for the tool
-                demo_log_path = os.path.join(LOG_DIR, f"{base_log_filename}.{tool}.log")
+                # base_log_filename already includes the log directory
+                demo_log_path = f"{base_log_filename}.{tool}.log"
                 log_to_file(logfile, f"{log_entry_prefix} - Writing {len(log_lines)} lines to {demo_log_path}")
                 try:
-                    # Ensure the logs directory exists (should be created by main, but safe to double-check)
-                    Path(LOG_DIR).mkdir(exist_ok=True)
-                    with open(demo_log_path, 'a', encoding='utf-8') as demo_f:
-                        for line in log_lines:
-                            # Add a timestamp prefix to make demo logs slightly more dynamic
-                            timestamped_line = f"[{datetime.now().isoformat()}] {line}"
-                            demo_f.write(timestamped_line + '\n')
+                    for line in log_lines:
+                        # Add a timestamp prefix to make demo logs slightly more dynamic
+                        timestamped_line = f"[{datetime.now().isoformat()}] {line}"
+                        log_to_file(demo_log_path, timestamped_line)
                     print(f"   -> Demo logs written to {os.path.basename(demo_log_path)}")
                 except Exception as e:
                     error_msg = f"Failed to write demo log {demo_log_path}: {e}"
                     print(f"   ❌ Error: {error_msg}")
                     log_to_file(logfile, f"{log_entry_prefix} - Error: {error_msg}")
+        record("demo_logs", time.perf_counter() - demo_started)
 
     # --- Structured Logging ---
-    log_structured_event({
+    emit_event({
         "timestamp": datetime.now().isoformat(),
         "status": execution_status,
         "id": ttp.get("id", "N/A"),
@@ -276,9 +308,10 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
         "platform": ttp_platform,
         "output": stdout_content if execution_status == "Success" else None,
         "error": stderr_content if execution_status not in ["Success", "DryRun"] else None,
-        "exit_code": result.returncode if result else None,
-        "mitre_tactic": ttp.get("mitre_tactic", "N/A"),
-        "mitre_technique": ttp.get("mitre_technique", "N/A")
+        "exit_code": result.returncode if result and not result.timed_out else None,  # None = timed out/not run
+        "duration_seconds": round(result.duration, 3) if result else None,
+        **mitre_fields,
+        **run_fields
     })
 
     print("-" * 30) # Separator in console output
@@ -286,188 +319,332 @@ def execute_ttp(ttp, dry_run=False, logfile="threat_log.json", attack_map=None,
     return execution_status in ["Success", "DryRun"] # Return True for Success or DryRun
 
 
+# Loaded libraries, compiled scenarios and ATT&CK enrichers, keyed on their files' (size, mtime).
+# A one-shot run uses each once; the daemon (--daemon) keeps them warm across runs and they are
+# reloaded as soon as a file changes.
+_warm_cache = {}
+
+def _warm(key, signature, build):
+    cached = _warm_cache.get(key)
+    if cached is None or cached[0] != signature:
+        cached = _warm_cache[key] = (signature, build())
+    return cached[1]
+
+def load_compiled_library(filepath):
+    """CompiledLibrary for a TTP library or STIX bundle, reused while the file is unchanged."""
+    return _warm(("library", os.path.abspath(filepath)), library_signature(filepath),
+                 lambda: CompiledLibrary(load_ttps(filepath)))
+
+def load_scenarios_warm(scenario_file, base_library):
+    """Compiled scenarios for a scenario file + base library, reused while both are unchanged."""
+    return _warm(("scenarios", os.path.abspath(scenario_file), os.path.abspath(base_library)),
+                 (file_signature(scenario_file), library_signature(base_library)),
+                 lambda: load_compiled_scenarios(scenario_file, base_library, load_ttps))
+
+def get_attack_enricher(dataset=ATTACK_DATASET_FILE):
+    return _warm(("enricher", os.path.abspath(dataset)), file_signature(dataset), lambda: AttackEnricher(dataset))
+
+def warm_resources(args):
+    """Loads what a run with these arguments needs, so later runs in this process start warm."""
+    if args.ttp_set.startswith("scenario:"):
+        load_scenarios_warm(args.scenario_file, args.base_library)
+    else:
+        load_compiled_library(args.ttp_set)
+    if not args.no_enrich:
+        get_attack_enricher(ATTACK_DATASET_FILE).preload()
+
 # Check TTP compatibility with the current OS
-# Updated to check MITRE's 'x_mitre_platforms' if 'platform' is missing
+# Checks MITRE's 'x_mitre_platforms' if 'platform' is missing; TTPs without platform info are incompatible
 def is_compatible(ttp, current_os):
     """Checks if a TTP is compatible with the current OS."""
-    # Check standard 'platform' key first
-    platform_info = ttp.get('platform') 
-    
-    # If standard key missing, check MITRE's 'x_mitre_platforms'
-    if platform_info is None: 
-        platform_info = ttp.get('x_mitre_platforms')
-
-    # If still no platform info, assume incompatible or handle as 'all'? 
-    # For now, let's be strict: requires platform info.
-    if platform_info is None:
-        # Optional: Print a warning if needed for debugging
-        # print(f"❓ Warning: No platform info found for TTP {ttp.get('id', ttp.get('name', 'Unknown'))}. Assuming incompatible.")
-        return False
-
-    # Normalize to list if it's a string
-    if isinstance(platform_info, str):
-        platforms = [platform_info.lower()]
-    elif isinstance(platform_info, list):
-        # Ensure all elements in the list are strings before lowercasing
-        platforms = [p.lower() for p in platform_info if isinstance(p, str)]
-    else:
-         # Optional: Print a warning for unexpected format
-         # print(f"❓ Warning: Unexpected platform format for TTP {ttp.get('id', ttp.get('name', 'Unknown'))}: {platform_info}. Assuming incompatible.")
-         return False # Unexpected format
+    return platforms_match(normalize_platforms(ttp), current_os)
 
-    # Check for 'all' compatibility first
-    if 'all' in platforms:
-        return True
-        
-    # Map common OS names for broader compatibility (e.g., 'windows' should match 'windows')
-    # MITRE uses: Linux, macOS, Windows, Azure AD, Office 365, SaaS, IaaS, Google Workspace, PRE, Network, Containers
-    os_mapping = {
-        'windows': 'windows',
-        'linux': 'linux',
-        'darwin': 'macos' # Map macOS from plat.system() to MITRE's term
-        # Add other mappings if needed (e.g., 'freebsd': 'linux' if desired)
-    }
-    mapped_os = os_mapping.get(current_os) 
+# Bulk check of every scenario against the base library (--validate-scenarios)
+def validate_scenarios(scenario_file, base_library):
+    """Prints a per-scenario report. Returns the number of scenarios with problems."""
+    print(f"🔍 Validating scenarios in {scenario_file} against {base_library}")
+    try:
+        compiled_scenarios = load_compiled_scenarios(scenario_file, base_library, load_ttps)
+    except FileNotFoundError:
+        print(f"❌ Error: Scenario file '{scenario_file}' not found.")
+        return 1
+    except json.JSONDecodeError:
+        print(f"❌ Error: Could not decode JSON from scenario file '{scenario_file}'.")
+        return 1
+    except Exception as e:
+        print(f"❌ Error loading scenario file '{scenario_file}': {e}")
+        return 1
+    if not compiled_scenarios.library_size:
+        print(f"❌ Error: Could not load base TTP library from '{base_library}'.")
+        return 1
+
+    problems = 0
+    for name, scenario in compiled_scenarios.scenarios.items():
+        if scenario.error:
+            problems += 1
+            print(f"❌ {name}: invalid: {scenario.error}")
+            continue
+        coverage = ", ".join(f"{target_os} {len(scenario.plan_for(target_os)[0])}/{len(scenario.steps)}"
+                             for target_os in TARGET_OSES)
+        if scenario.missing:
+            problems += 1
+            print(f"⚠️ {name}: {len(scenario.steps)} steps, not in base library: {', '.join(scenario.missing)} (runnable: {coverage})")
+        else:
+            print(f"✅ {name}: {len(scenario.steps)} steps (runnable: {coverage})")
+    print(f"📋 {len(compiled_scenarios.scenarios)} scenarios checked, {problems} with problems.")
+    return problems
+
+# Base path (without extension) of a new run's log files: <log dir>/threat_bot_[<label>_]<timestamp>
+def new_run_base(args):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # A run label (e.g. the campaign job name) keeps scheduled runs' logs apart and recognizable
+    label = re.sub(r"[^A-Za-z0-9_.-]+", "-", args.run_label).strip("-") if args.run_label else ""
+    return os.path.join(args.log_dir, f"threat_bot_{label}_{timestamp}" if label else f"threat_bot_{timestamp}")
 
-    # Check if the mapped OS is directly listed in the platforms
-    if mapped_os and mapped_os in platforms:
-        return True
-        
-    # Optional: Add checks for broader categories based on the mapped OS
-    # Example: If running on Linux, also allow TTPs marked 'Network' or 'Containers'?
-    # if mapped_os == 'linux' and ('network' in platforms or 'containers' in platforms):
-    #     return True
-        
-    return False # Not compatible if no specific or broad match found
 
 # The core execution logic, now accepting the parsed arguments object
-def main(args):
-    attack_map = load_attack_mapping() # Load MITRE mapping if needed
+# (and optionally the run's base filename, so in-process callers know the run ID up front)
+def main(args, base_log_filename=None):
+    global execution_store
+    # Nothing may carry over from an earlier in-process run (campaign scheduler, daemon)
+    execution_store = None
+    # Lazy ATT&CK enrichment: nothing is loaded until the first TTP needs a lookup
+    attack_map = None if args.no_enrich else get_attack_enricher(ATTACK_DATASET_FILE)
     current_os = plat.system().lower()
+    # Step progress for the dashboard's run manager (no-op unless --progress-fd is given)
+    progress = ProgressReporter(args.progress_fd)
 
     # --- Setup Logging ---
+    get_run_logger().flush_interval = args.log_flush_interval
+    get_run_logger().max_file_bytes = args.log_max_bytes or None
     # Use args.log_dir from the parsed arguments
     Path(args.log_dir).mkdir(parents=True, exist_ok=True) 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    base_log_filename = os.path.join(args.log_dir, f"threat_bot_{timestamp}")
+    base_log_filename = base_log_filename or new_run_base(args)
     log_filename = f"{base_log_filename}.log" # Main execution log
+    # Per-phase timings for this run, written next to the logs when it finishes
+    run_metrics = start_run(os.path.basename(base_log_filename))
+    if args.metrics_port:
+        try:
+            serve_metrics(args.metrics_port)
+            print(f"📈 Serving live metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"⚠️ Warning: Could not serve metrics on port {args.metrics_port}: {e}")
     # Construct execution log path relative to log_dir
-    execution_log_path = os.path.join(args.log_dir, EXECUTION_LOG_JSON) 
+    execution_log_path = os.path.join(args.log_dir, EXECUTION_LOG_JOURNAL)
+    # One-time import of the old JSON-list logs (cwd and log_dir) into the journal
+    for legacy_path in dict.fromkeys([EXECUTION_LOG_JSON, os.path.join(args.log_dir, EXECUTION_LOG_JSON)]):
+        migrated = migrate_legacy_log(legacy_path, execution_log_path,
+                                      lambda event: store_event(event, execution_log_path))
+        if migrated:
+            print(f"📦 Migrated {migrated} records from legacy {legacy_path} into {execution_log_path}")
+
+    # Pointer used by the dashboard to find this run without scanning the logs directory
+    write_latest_pointer(args.log_dir, base_log_filename, [log_filename])
+    pointer_files = [log_filename]
+    pointer_lock = threading.Lock()
+
+    def refresh_latest_pointer():
+        # Demo logs appear as TTPs run; rewrite the pointer only when the file set changed
+        nonlocal pointer_files
+        files = sorted(set([log_filename] + get_run_logger().paths_with_prefix(base_log_filename)))
+        with pointer_lock:
+            if files != pointer_files:
+                pointer_files = files
+                write_latest_pointer(args.log_dir, base_log_filename, files)
 
     print(f"📝 Logging execution details to: {log_filename}")
     print(f"📊 Structured execution log: {execution_log_path}")
+    if args.sqlite_store:
+        store_path = os.path.join(args.log_dir, EXECUTION_STORE_DB)
+        execution_store = get_execution_store(store_path)
+        print(f"🗄️ SQLite execution store: {store_path}")
 
     # --- Execution Logic ---
-    ttps_to_run = []
+    plan = [] # PlanSteps (TTP + dependencies) to execute
 
     # Use args.ttp_set, args.scenario_file, args.base_library etc. from here on
     if args.ttp_set.startswith("scenario:"):
         scenario_name = args.ttp_set.split(":", 1)[1]
         print(f"🚀 Running Scenario: {scenario_name}")
-        # Load the scenario definitions
+        # Scenarios are compiled against the base library once per version of the two files
+        print(f"📖 Loading base TTP definitions from: {args.base_library}")
+        resolve_started = time.perf_counter()
         try:
-            # Use args.scenario_file
-            with open(args.scenario_file, 'r', encoding='utf-8') as f:
-                all_scenarios = json.load(f)
-            scenario_ttp_ids = all_scenarios.get(scenario_name)
-            if not scenario_ttp_ids:
-                print(f"❌ Error: Scenario '{scenario_name}' not found in {args.scenario_file}")
-                exit(1) # Exit if scenario not found
-            if not isinstance(scenario_ttp_ids, list):
-                 print(f"❌ Error: Scenario '{scenario_name}' in {args.scenario_file} is not a list of TTP IDs.")
-                 exit(1)
-
+            compiled_scenarios = load_scenarios_warm(args.scenario_file, args.base_library)
         except FileNotFoundError:
             print(f"❌ Error: Scenario file '{args.scenario_file}' not found.")
-            exit(1)
+            return 1
         except json.JSONDecodeError:
             print(f"❌ Error: Could not decode JSON from scenario file '{args.scenario_file}'.")
-            exit(1)
+            return 1
         except Exception as e:
             print(f"❌ Error loading scenario file '{args.scenario_file}': {e}")
-            exit(1)
-            
-        # Load the base TTP library to get full definitions
-        # Use args.base_library
-        print(f"📖 Loading base TTP definitions from: {args.base_library}")
-        base_ttps = load_ttps(args.base_library)
-        if not base_ttps:
+            return 1
+        record("resolve_scenario", time.perf_counter() - resolve_started)
+
+        scenario = compiled_scenarios.get(scenario_name)
+        if scenario is None:
+            print(f"❌ Error: Scenario '{scenario_name}' not found in {args.scenario_file}")
+            return 1 # Exit if scenario not found
+        if scenario.error:
+            print(f"❌ Error: Scenario '{scenario_name}' in {args.scenario_file} is invalid: {scenario.error}")
+            return 1
+        if not compiled_scenarios.library_size:
             print(f"❌ Error: Could not load base TTP library from '{args.base_library}'. Cannot execute scenario.")
-            exit(1)
-            
-        ttp_dict = {ttp['id']: ttp for ttp in base_ttps}
-        print(f"📋 Scenario Steps (TTP IDs): {', '.join(scenario_ttp_ids)}")
-        for ttp_id in scenario_ttp_ids:
-            ttp = ttp_dict.get(ttp_id)
-            if ttp:
-                if is_compatible(ttp, current_os):
-                    ttps_to_run.append(ttp)
-                else:
-                    # Use args.base_library in warning message
-                    warning_msg = f"⚠️ Warning: TTP ID '{ttp_id}' ({ttp.get('name', 'N/A')}) from scenario '{scenario_name}' is not compatible with the current OS ({current_os}). Skipping step."
-                    print(warning_msg)
-                    log_to_file(log_filename, warning_msg) # Use log_filename
+            return 1
+
+        print(f"📋 Scenario Steps (TTP IDs): {', '.join(step.ttp_id for step in scenario.steps)}")
+        with span("filter"):
+            plan, incompatible_steps = scenario.plan_for(current_os)
+        incompatible_keys = {step.key for step in incompatible_steps}
+        for step in scenario.steps:
+            if step.ttp is None:
+                warning_msg = f"⚠️ Warning: TTP ID '{step.ttp_id}' from scenario '{scenario_name}' not found in base library '{args.base_library}'. Skipping step."
+            elif step.key in incompatible_keys:
+                warning_msg = f"⚠️ Warning: TTP ID '{step.ttp_id}' ({step.ttp.get('name', 'N/A')}) from scenario '{scenario_name}' is not compatible with the current OS ({current_os}). Skipping step."
             else:
-                 # Use args.base_library in warning message
-                warning_msg = f"⚠️ Warning: TTP ID '{ttp_id}' from scenario '{scenario_name}' not found in base library '{args.base_library}'. Skipping step."
-                print(warning_msg)
-                log_to_file(log_filename, warning_msg) # Use log_filename
-                
-        print(f"ℹ️ Running {len(ttps_to_run)} compatible steps from the scenario.")
+                continue
+            print(warning_msg)
+            log_to_file(log_filename, warning_msg) # Use log_filename
+        print(f"ℹ️ Running {len(plan)} compatible steps from the scenario.")
 
     else:
         # Standard execution: Load TTPs from the specified file (args.ttp_set)
         print(f"📖 Loading TTPs from: {args.ttp_set}")
-        all_ttps = load_ttps(args.ttp_set)
-        if not all_ttps:
+        with span("load"):
+            # Compiled into platform buckets, so filtering and selection only touch this OS's TTPs
+            library = load_compiled_library(args.ttp_set)
+        if not library:
              print(f"❌ No TTPs loaded from '{args.ttp_set}'. Exiting.")
-             exit(1)
+             return 1
 
-        compatible_ttps = [t for t in all_ttps if is_compatible(t, current_os)]
-        print(f"✅ Found {len(compatible_ttps)} TTPs compatible with {current_os} (out of {len(all_ttps)} total).")
+        with span("filter"):
+            compatible_ttps = library.compatible(current_os)
+        print(f"✅ Found {len(compatible_ttps)} TTPs compatible with {current_os} (out of {len(library)} total).")
         
         if not compatible_ttps:
              print(f"❌ No compatible TTPs found for the current OS ({current_os}) in '{args.ttp_set}'. Exiting.")
-             exit(1)
+             return 1
 
         # Select random TTPs based on args.iterations
         num_to_run = min(args.iterations, len(compatible_ttps))
         print(f"🎲 Selecting {num_to_run} random TTPs to run (using --iterations)..." if num_to_run > 0 else "🚫 No compatible TTPs to select randomly.")
         if num_to_run > 0:
-            ttps_to_run = random.sample(compatible_ttps, num_to_run)
+            # Random picks have no ordering constraints between them
+            with span("select"):
+                plan = build_independent_plan([r.ttp for r in library.sample(current_os, num_to_run)])
         else:
-            ttps_to_run = [] 
+            plan = []
 
 
     # --- Execute Selected TTPs ---
-    if not ttps_to_run:
+    progress.emit("plan", total=len(plan), log=log_filename)
+    if not plan:
         print("🚫 No TTPs selected or found to execute.")
     else:
-        print(f"\n--- Starting Threat Emulation ({len(ttps_to_run)} TTPs) ---")
-        for i, ttp in enumerate(ttps_to_run):
-            print(f"\n--- Executing Step {i+1}/{len(ttps_to_run)}: {ttp.get('id')} - {ttp.get('name')} ---")
-            # Pass args.dry_run directly from the parsed arguments
-            execute_ttp(ttp, args.dry_run, log_filename, attack_map, base_log_filename, execution_log_path) 
+        workers = max(1, args.workers)
+        print(f"\n--- Starting Threat Emulation ({len(plan)} TTPs, {workers} worker{'s' if workers > 1 else ''}) ---")
 
+        def run_step(step, position):
+            ttp = step.ttp
+            print(f"\n--- Executing Step {position}/{len(plan)}: {ttp.get('id')} - {ttp.get('name')} ---")
+            progress.emit("step_started", position=position, id=ttp.get('id'))
+            # Pass args.dry_run directly from the parsed arguments
+            result = execute_ttp(ttp, args.dry_run, log_filename, attack_map, base_log_filename, execution_log_path)
+            refresh_latest_pointer()
+            progress.emit("step_finished", position=position, id=ttp.get('id'), name=ttp.get('name'), ok=result)
+            return result
+
+        # Independent steps run concurrently with --workers > 1; dependencies keep chains ordered
+        run_plan(plan, run_step, workers)
+
+    # Flush and release this run's log handles (main log and demo logs)
+    get_run_logger().close_files(base_log_filename)
+    if execution_store is not None:
+        execution_store.flush()
+    get_coverage(execution_log_path).save()
+    metrics_files = run_metrics.write_files(base_log_filename)
+    if metrics_files:
+        print(f"📈 Phase metrics: {', '.join(metrics_files)}")
+    # Compress earlier finished runs and drop expired ones; this run stays readable as plain text
+    if not args.no_log_rotation:
+        rotation = rotate_logs(args.log_dir, keep_bases={os.path.basename(base_log_filename)},
+                               retention_days=args.log_retention_days,
+                               max_total_bytes=int(args.log_max_total_mb * 1024 * 1024) or None)
+        if rotation["compressed"] or rotation["deleted_runs"]:
+            print(f"🗜️ Log rotation: compressed {rotation['compressed']} log(s), removed {rotation['deleted_runs']} "
+                  f"old run(s), freed {rotation['freed_bytes'] / 1e6:.1f} MB")
+    progress.emit("finished")
     print("\n--- Threat Emulation Finished ---")
 
 
-# Main execution block - Now only parses args and calls main()
-if __name__ == "__main__":
+# Command-line arguments; also used by the daemon to parse the argv of each run request
+def build_arg_parser():
     parser = argparse.ArgumentParser(description="Threat Emulator Bot")
     parser.add_argument("--ttp-set", default="ttp_library.json",
-                        help="Path to TTP library JSON file OR scenario identifier (e.g., 'scenario:My Scenario')")
+                        help="Path to TTP library JSON file, a directory or glob of library shards, OR scenario identifier (e.g., 'scenario:My Scenario')")
     parser.add_argument("--iterations", type=int, default=1, # Default iterations used if not a scenario
                         help="Number of TTPs to execute randomly (ignored if a scenario is selected)")
     parser.add_argument("--dry-run", action="store_true",
                         help="Print commands instead of executing them")
     parser.add_argument("--log-dir", default=LOG_DIR, help="Directory for log files")
     parser.add_argument("--base-library", default="ttp_library.json", 
-                        help="Base TTP library used to look up TTP definitions for scenarios")
+                        help="Base TTP library (file, or directory/glob of shards) used to look up TTP definitions for scenarios")
     parser.add_argument("--scenario-file", default="attack_scenarios.json", 
                         help="Path to the attack scenario definition file")
+    parser.add_argument("--log-flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Seconds between background flushes of the run log files")
+    parser.add_argument("--log-max-bytes", type=int, default=DEFAULT_MAX_LOG_BYTES,
+                        help="Roll a run log over to <file>.N (gzipped) once it exceeds this size (0 = never)")
+    parser.add_argument("--log-retention-days", type=float, default=DEFAULT_RETENTION_DAYS,
+                        help="Delete finished runs' logs older than this many days after each run (default: keep forever)")
+    parser.add_argument("--log-max-total-mb", type=float, default=0,
+                        help="Delete the oldest run logs while the logs directory exceeds this size (0 = no limit)")
+    parser.add_argument("--no-log-rotation", action="store_true",
+                        help="Don't compress finished runs' logs or apply the retention policy after the run")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of TTPs to execute concurrently (scenario dependencies are still honored)")
+    parser.add_argument("--no-enrich", action="store_true",
+                        help="Don't look up MITRE ATT&CK tactic/technique/URL for structured events")
+    parser.add_argument("--progress-fd", type=int, default=None,
+                        help="File descriptor to write JSON progress events to (used by the dashboard's run manager)")
+    parser.add_argument("--validate-scenarios", action="store_true",
+                        help="Check every scenario in --scenario-file against --base-library and exit")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve live per-phase metrics (Prometheus format) on 127.0.0.1:PORT/metrics during the run")
+    parser.add_argument("--sqlite-store", action="store_true",
+                        help=f"Also record structured events in an indexed SQLite store (<log-dir>/{EXECUTION_STORE_DB})")
+    parser.add_argument("--run-label", default=None,
+                        help="Label added to this run's log file names (used by the campaign scheduler)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep libraries, scenarios and the ATT&CK mapping warm and serve run requests on a Unix socket")
+    parser.add_argument("--daemon-socket", default=None,
+                        help="Socket path for --daemon (default: $THREAT_BOT_SOCKET or <log-dir>/threat_bot.sock)")
+    return parser
+
+# Runs one parsed command line; returns the exit code
+def run(args, base_log_filename=None):
+    global execution_store
+    if args.validate_scenarios:
+        return 1 if validate_scenarios(args.scenario_file, args.base_library) else 0
+    # Kill running commands and flush buffered logs if the run is terminated
+    install_signal_handlers(on_terminate=kill_active_commands)
 
-    args = parser.parse_args()
-    
     # Call the main execution logic function with the parsed arguments
-    main(args)
+    run_logger = get_run_logger()
+    saved_settings = run_logger.flush_interval, run_logger.max_file_bytes
+    try:
+        return main(args, base_log_filename) or 0
+    finally:
+        # main() tunes the shared logger for this run only; in-process callers get their settings back
+        run_logger.flush_interval, run_logger.max_file_bytes = saved_settings
+        execution_store = None
+
+
+# Main execution block - Now only parses args and calls run()
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    if args.daemon:
+        from bot_daemon import serve
+        exit(serve(args.daemon_socket, args.log_dir))
+    exit(run(args))
@@ -0,0 +1,123 @@
+# ttp_search.py
+# In-memory search index over a loaded TTP library (or the ATT&CK attack-patterns).
+# Built once per library version; queries use a sorted token list for prefix matches and an
+# n-gram index over each entry's ID and name for substring matches, so neither scans the library.
+import re
+from bisect import bisect_left
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9._-]*")
+NGRAM_SIZE = 3  # Terms up to this long are looked up directly; longer ones intersect their n-grams
+
+
+def ttp_external_id(ttp):
+    """The TTP's technique ID: 'id' for library TTPs, the mitre-attack external_id for STIX objects."""
+    ttp_id = ttp.get('id')
+    if ttp_id and not str(ttp_id).startswith('attack-pattern--'):
+        return ttp_id
+    for ref in ttp.get('external_references', []):
+        if ref.get('source_name') == 'mitre-attack' and ref.get('external_id'):
+            return ref['external_id']
+    return ttp_id
+
+
+def ttp_platform_list(ttp):
+    platforms = ttp.get('platform') or ttp.get('x_mitre_platforms') or []
+    if isinstance(platforms, str):
+        return [platforms]
+    return [p for p in platforms if isinstance(p, str)]
+
+
+def _ngrams(text, sizes=range(1, NGRAM_SIZE + 1)):
+    return {text[i:i + n] for n in sizes for i in range(len(text) - n + 1)}
+
+
+def _tokens(*texts):
+    tokens = set()
+    for text in texts:
+        if text:
+            tokens.update(_TOKEN_RE.findall(text.lower()))
+    return tokens
+
+
+class TTPEntry:
+    """Pre-extracted display and search fields for one TTP."""
+    __slots__ = ("ttp", "ttp_id", "name", "tactic", "url", "platforms", "_key")
+
+    def __init__(self, ttp, attack_map):
+        self.ttp = ttp
+        self.ttp_id = ttp_external_id(ttp)
+        self.name = ttp.get('name', 'Unknown TTP')
+        enrich = attack_map.get(self.ttp_id) if (attack_map and self.ttp_id) else None
+        enrich = enrich or {}
+        self.tactic = ttp.get('tactic') or enrich.get('tactic')
+        self.url = ttp.get('url') or enrich.get('url')
+        self.platforms = ttp_platform_list(ttp)
+        # Substring matches are confirmed on this one lowercase string instead of re-walking the TTP
+        self._key = f"{(self.ttp_id or '').lower()}\x00{self.name.lower()}"
+
+
+class TTPSearchIndex:
+    """Search over ID, name, tactic, platform and description tokens.
+
+    Every whitespace-separated term of a query must match (AND). A term matches an entry if
+    it is a prefix of any of its tokens, or a substring of its ID or name.
+    """
+
+    def __init__(self, ttps, attack_map=None):
+        self.entries = [TTPEntry(ttp, attack_map) for ttp in ttps]
+        postings = {}
+        for i, entry in enumerate(self.entries):
+            for token in _tokens(entry.ttp_id, entry.name, entry.tactic,
+                                 " ".join(entry.platforms), entry.ttp.get('description')):
+                postings.setdefault(token, []).append(i)
+        self._tokens = sorted(postings)
+        self._postings = [postings[t] for t in self._tokens]
+        self._ngrams = {}  # 1..NGRAM_SIZE-character substrings of ID and name -> entry numbers
+        for i, entry in enumerate(self.entries):
+            for gram in _ngrams(entry._key):
+                self._ngrams.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefix_matches(self, term):
+        matches = set()
+        i = bisect_left(self._tokens, term)
+        while i < len(self._tokens) and self._tokens[i].startswith(term):
+            matches.update(self._postings[i])
+            i += 1
+        return matches
+
+    def _substring_matches(self, term):
+        if len(term) <= NGRAM_SIZE:
+            return set(self._ngrams.get(term, ()))
+        # Candidates contain every n-gram of the term; confirm the whole term on the few left
+        grams = sorted((self._ngrams.get(gram, ()) for gram in _ngrams(term, (NGRAM_SIZE,))), key=len)
+        candidates = set(grams[0])
+        for numbers in grams[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(numbers)
+        return {i for i in candidates if term in self.entries[i]._key}
+
+    def search(self, query):
+        """Returns matching entries in library order (all entries for an empty query)."""
+        terms = query.lower().split()
+        if not terms:
+            return self.entries
+        result = None
+        for term in terms:
+            matches = self._prefix_matches(term)
+            matches.update(self._substring_matches(term))
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+        return [self.entries[i] for i in sorted(result)]
+
+
+def paginate(items, page, page_size):
+    """Returns (page_items, page, page_count) with `page` (1-based) clamped to the valid range."""
+    page_count = max(1, -(-len(items) // page_size))
+    page = min(max(1, page), page_count)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, page_count
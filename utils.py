@@ -1,24 +1,20 @@
 # utils.py
-import json
+import os
 
-def load_attack_mapping(dataset='attack_dataset.json'):
+from attack_index import load_attack_index
+
+def file_signature(path):
+    """(size, mtime_ns) of a file, or None if it doesn't exist. Used as a cache key."""
     try:
-        with open(dataset, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
 
-        id_to_technique = {}
-        for obj in data['objects']:
-            if obj.get('type') == 'attack-pattern' and 'external_references' in obj:
-                for ref in obj['external_references']:
-                    if ref.get('source_name') == 'mitre-attack' and 'external_id' in ref:
-                        ext_id = ref['external_id']
-                        id_to_technique[ext_id] = {
-                            'name': obj.get('name'),
-                            'description': obj.get('description', ''),
-                            'tactic': obj.get('kill_chain_phases', [{}])[0].get('phase_name', 'unknown'),
-                            'url': ref.get('url', '')
-                        }
-        return id_to_technique
+def load_attack_mapping(dataset='attack_dataset.json'):
+    try:
+        # Served from the precompiled index; the bundle is only parsed when it changed
+        return load_attack_index(dataset)['mapping']
 
     except Exception as e:
         print(f"❌ Failed to load MITRE ATT&CK mapping: {e}")